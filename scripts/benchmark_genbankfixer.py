@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Time gbtext_clean on the files in tests/broken_genbank_files.
+
+Each file is parsed with the pyparsing grammar (parseGB) and with toJSON,
+which scans the common forms of each entry with regular expressions and
+only falls back to the grammar for the rest. The JSON from both is
+compared before timing.
+
+usage: python scripts/benchmark_genbankfixer.py [number of repeats]
+"""
+
+import glob
+import os
+import sys
+import timeit
+import warnings
+
+from pydna import genbankfixer
+
+directory = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "broken_genbank_files")
+
+
+def texts():
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        with open(path, encoding="utf-8") as f:
+            yield os.path.basename(path), f.read()
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    warnings.simplefilter("ignore")
+    totals = [0.0, 0.0]
+    for name, text in texts():
+        try:
+            expected = genbankfixer.parseGB(text)
+        except Exception as error:
+            print(f"{name[:40]:40} not parsed: {type(error).__name__}")
+            continue
+        assert genbankfixer.toJSON(text) == expected, name
+        seconds = [
+            min(timeit.repeat(lambda: function(text), number=1, repeat=repeat))
+            for function in (genbankfixer.parseGB, genbankfixer.toJSON)
+        ]
+        totals = [a + b for a, b in zip(totals, seconds)]
+        print(f"{name[:40]:40} pyparsing {seconds[0]:7.4f} s, toJSON {seconds[1]:7.4f} s")
+    print(f"{'total':40} pyparsing {totals[0]:7.4f} s, toJSON {totals[1]:7.4f} s")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Time parsing of a large annotated GenBank file.
+
+The file is written to a temporary directory. The parsers module from the
+working tree is compared with the version before features were taken over
+without a deep copy, copied here as parse_deepcopy.
+
+usage: python scripts/benchmark_parse_features.py [number of features]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from copy import deepcopy
+
+from Bio.SeqFeature import SeqFeature, SimpleLocation
+
+from pydna.dseqrecord import Dseqrecord
+from pydna.parsers import parse, _read_chunk, extract_from_text
+from pydna.genbankfile import GenbankFile
+
+
+def parse_deepcopy(path):
+    with open(path, encoding="utf-8") as f:
+        (chunk,) = extract_from_text(f.read())
+    parsed, fmt = _read_chunk(chunk)
+    nfs = [SeqFeature() for f in parsed.features]
+    for f, nf in zip(parsed.features, nfs):
+        nf.__dict__ = deepcopy(f.__dict__)
+    parsed.features = nfs
+    return [GenbankFile.from_SeqRecord(parsed, path=path)]
+
+
+def annotated_genbank(n, length=100_000):
+    random.seed(42)
+    record = Dseqrecord("".join(random.choice("acgt") for i in range(length)))
+    for i in range(n):
+        start = random.randrange(length - 2000)
+        feature = SeqFeature(SimpleLocation(start, start + random.randrange(100, 2000), random.choice((1, -1))))
+        feature.type = "CDS"
+        feature.qualifiers = {"label": [f"gene{i}"], "note": ["benchmark feature"], "product": [f"protein {i}"]}
+        record.features.append(feature)
+    return record.format("gb")
+
+
+def measure(function, path):
+    seconds = min(timeit.repeat(lambda: function(path), number=1, repeat=3))
+    tracemalloc.start()
+    function(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "annotated.gb")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(annotated_genbank(n))
+        assert parse(path)[0].format("gb") == parse_deepcopy(path)[0].format("gb")
+        for name, function in (("deep copy", parse_deepcopy), ("parse", parse)):
+            seconds, peak = measure(function, path)
+            print(f"{name:10} {n} features {seconds:6.2f} s, peak {peak:6.1f} MiB")
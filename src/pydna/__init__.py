@@ -173,6 +173,8 @@ default_ini = {
     "loglevel": str(_logging.WARNING),
     "primers": str(user_data_dir / "primers.md"),
     "assembly_limit": str(10),
+    "cache_max_size": str(2**30),
+    "cache_max_age": str(0),
 }
 
 # initiate a config parser instance
@@ -225,6 +227,8 @@ _logger.info(
     "Environmental variable pydna_assembly_limit = %s",
     _os.environ["pydna_assembly_limit"],
 )
+_logger.info("Environmental variable pydna_cache_max_size = %s", _os.environ["pydna_cache_max_size"])
+_logger.info("Environmental variable pydna_cache_max_age  = %s", _os.environ["pydna_cache_max_age"])
 
 # create cache directory if not present
 
@@ -357,6 +361,11 @@ def open_config_folder():
     These can be added separated by a comma to the cached_funcs entry
     in **pydna.ini** file or the pydna_cached_funcs environment variable.
 
+    Cached results are kept in the cache.sqlite file in the data_dir folder.
+    The cache_max_size entry is the size in bytes of the cache above which the
+    least recently used results are deleted, and cache_max_age the age in
+    seconds after which results are deleted. Zero means no limit.
+
     """
     return _open_folder(_os.environ["pydna_config_dir"])
 
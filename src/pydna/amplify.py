@@ -18,6 +18,7 @@ from pydna.utils import flatten as _flatten
 
 # from pydna.utils import memorize as _memorize
 from pydna.utils import rc as _rc
+from pydna.utils import circular_finditer as _circular_finditer
 from pydna.amplicon import Amplicon as _Amplicon
 from pydna.primer import Primer as _Primer
 from pydna.seqrecord import SeqRecord as _SeqRecord
@@ -55,7 +56,7 @@ _table = {  # IUPAC Ambiguity Codes for Nucleotide Degeneracy and U for Uracile
 }
 
 
-def _annealing_positions(primer, template, limit):
+def _annealing_positions(primer, template, limit, circular=False):
     """Finds the annealing position(s) for a primer on a template where the
     primer anneals perfectly with at least limit nucleotides in the 3' part.
     The primer is the lower strand in the figure below.
@@ -86,6 +87,9 @@ def _annealing_positions(primer, template, limit):
     limit : int = 15, optional
         footprint needs to be at least of length limit.
 
+    circular : bool, optional
+        If True, primers can anneal across the origin of the template.
+
     Returns
     -------
     describe : list of tuples (int, int)
@@ -104,18 +108,25 @@ def _annealing_positions(primer, template, limit):
     # Make regex pattern that reflects extended IUPAC DNA code
     head = "".join(_table[key] for key in head)
 
-    positions = [m.start() for m in _re.finditer(f"(?={head})", template, _re.I)]
+    pattern = _re.compile(f"(?={head})", _re.I)
+
+    if not circular:
+        matches = ((0, m) for m in pattern.finditer(template))
+    elif len(primer) > len(template):
+        matches = ((0, m) for m in pattern.finditer(template + template) if m.start() < len(template))
+    else:
+        # Primers annealing across the origin are found in a short region around it
+        matches = _circular_finditer(pattern, template, len(primer))
 
-    if positions:
-        tail = prc[limit:].lower()
-        length = len(tail)
-        results = []
-        for match_start in positions:
-            tm = template[match_start + limit : match_start + limit + length].lower()
-            footprint = len(list(_itertools.takewhile(lambda x: x[0] == x[1], zip(tail, tm))))
-            results.append((match_start, footprint + limit))
-        return results
-    return []
+    tail = prc[limit:].lower()
+    length = len(tail)
+    results = []
+    for offset, m in matches:
+        # The tail is compared with the text where the match was found
+        tm = m.string[m.start() + limit : m.start() + limit + length].lower()
+        footprint = len(list(_itertools.takewhile(lambda x: x[0] == x[1], zip(tail, tm))))
+        results.append((offset + m.start(), footprint + limit))
+    return results
 
 
 # class _Memoize(type):
@@ -215,7 +226,11 @@ class Anneal(object):  # ), metaclass=_Memoize):
 
         """
         self.primers = primers
-        self.template = _copy.deepcopy(template)
+        if isinstance(template, _Dseqrecord):
+            # The features of the template are copied when they are first used
+            self.template = template._derived(_copy.copy(template.seq), template._feature_store())
+        else:
+            self.template = _copy.deepcopy(template)
 
         self.limit = limit
         self.kwargs = kwargs
@@ -228,12 +243,9 @@ class Anneal(object):  # ), metaclass=_Memoize):
         twl = len(self.template.seq.watson)
         tcl = len(self.template.seq.crick)
 
-        if self.template.circular:
-            tw = self.template.seq.watson + self.template.seq.watson
-            tc = self.template.seq.crick + self.template.seq.crick
-        else:
-            tw = self.template.seq.watson
-            tc = self.template.seq.crick
+        tw = self.template.seq.watson
+        tc = self.template.seq.crick
+        circular = self.template.circular
 
         for p in self.primers:
             self.forward_primers.extend(
@@ -244,7 +256,7 @@ class Anneal(object):  # ), metaclass=_Memoize):
                         position=tcl - pos - min(self.template.seq.ovhg, 0),
                         footprint=fp,
                     )
-                    for pos, fp in _annealing_positions(str(p.seq), tc, self.limit)
+                    for pos, fp in _annealing_positions(str(p.seq), tc, self.limit, circular)
                     if pos < tcl
                 )
             )
@@ -256,7 +268,7 @@ class Anneal(object):  # ), metaclass=_Memoize):
                         position=pos + max(0, self.template.seq.ovhg),
                         footprint=fp,
                     )
-                    for pos, fp in _annealing_positions(str(p.seq), tw, self.limit)
+                    for pos, fp in _annealing_positions(str(p.seq), tw, self.limit, circular)
                     if pos < twl
                 )
             )
@@ -47,6 +47,8 @@ from Bio.SeqFeature import ExactPosition as _ExactPosition
 from Bio.SeqFeature import SimpleLocation as _SimpleLocation
 from Bio.SeqFeature import CompoundLocation as _CompoundLocation
 from pydna.utils import rc as _rc
+from pydna.utils import copy_feature as _copy_feature
+from pydna.feature_index import FeatureIndex as _FeatureIndex
 
 # from pydna.utils import memorize as _memorize
 from pydna._pretty import pretty_str as _pretty_str
@@ -56,7 +58,6 @@ from pydna.common_sub_strings import common_sub_strings
 # from pydna.common_sub_strings import terminal_overlap
 from pydna.dseqrecord import Dseqrecord as _Dseqrecord
 import networkx as _nx
-from copy import deepcopy as _deepcopy
 import itertools as _itertools
 import logging as _logging
 
@@ -67,6 +68,11 @@ from pydna.threading_timer_decorator_exit import exit_after
 _module_logger = _logging.getLogger("pydna." + __name__)
 
 
+def _features_inside(fragment, start, stop):
+    """Features of a fragment inside start:stop, in order (PRIVATE)."""
+    return [fragment["features"][i] for i in fragment["feature_index"].inside(start, stop)]
+
+
 class Assembly(object):  # , metaclass=_Memoize):
     """Assembly of a list of linear DNA fragments into linear or circular
     constructs. The Assembly is meant to replace the Assembly method as it
@@ -123,6 +129,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                     "mixed": str(f.seq),
                     "name": f.name,
                     "features": f.features,
+                    "feature_index": _FeatureIndex(ft.location for ft in f.features),
                     "nodes": [],
                 }
             )
@@ -137,6 +144,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                     "mixed": str(frc.seq),
                     "name": frc.name,
                     "features": frc.features,
+                    "feature_index": _FeatureIndex(ft.location for ft in frc.features),
                     "nodes": [],
                 },
             )
@@ -239,11 +247,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                 length2,
                 node2,
             ) in _itertools.combinations(f["nodes"], 2):
-                feats = [
-                    ft
-                    for ft in f["features"]
-                    if start1 <= ft.location.start and start2 + G.nodes[node2]["length"] >= ft.location.end
-                ]
+                feats = _features_inside(f, start1, start2 + G.nodes[node2]["length"])
 
                 # for feat in feats:
                 #     feat.location += -start1
@@ -279,7 +283,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                 "begin",
                 node,
                 piece=slice(0, start),
-                features=[f for f in firstfragment["features"] if start + length >= f.location.end],
+                features=_features_inside(firstfragment, 0, start + length),
                 seq=firstfragment["mixed"],
                 name=firstfragment["name"],
             )
@@ -292,7 +296,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                 "begin_rc",
                 node,
                 piece=slice(0, start),
-                features=[f for f in firstfragmentrc["features"] if start + length >= f.location.end],
+                features=_features_inside(firstfragmentrc, 0, start + length),
                 seq=firstfragmentrc["mixed"],
                 name=firstfragmentrc["name"],
             )
@@ -304,7 +308,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                 node,
                 "end",
                 piece=slice(start, len(lastfragment["mixed"])),
-                features=[f for f in lastfragment["features"] if start <= f.location.start],
+                features=_features_inside(lastfragment, start, len(lastfragment["mixed"])),
                 seq=lastfragment["mixed"],
                 name=lastfragment["name"],
             )
@@ -317,7 +321,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                 node,
                 "end_rc",
                 piece=slice(start, len(lastfragmentrc["mixed"])),
-                features=[f for f in lastfragmentrc["features"] if start <= f.location.start],
+                features=_features_inside(lastfragmentrc, start, len(lastfragmentrc["mixed"])),
                 seq=lastfragmentrc["mixed"],
                 name=lastfragmentrc["name"],
             )
@@ -364,9 +368,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                 edgefeatures = []
                 offset = 0
                 for u, v, e in edges:
-                    feats = _deepcopy(e["features"])
-                    for f in feats:
-                        f.location += offset - e["piece"].start
+                    feats = [_copy_feature(f, f.location + (offset - e["piece"].start)) for f in e["features"]]
                     edgefeatures.extend(feats)
                     offset += e["piece"].stop - e["piece"].start
 
@@ -432,9 +434,7 @@ class Assembly(object):  # , metaclass=_Memoize):
                 offset = 0
 
                 for u, v, e in edges:
-                    feats = _deepcopy(e["features"])
-                    for feat in feats:
-                        feat.location += offset
+                    feats = [_copy_feature(feat, feat.location + offset) for feat in e["features"]]
                     edgefeatures.extend(feats)
                     offset += e["piece"].stop - e["piece"].start
                     for f in edgefeatures:
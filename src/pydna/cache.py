@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""A persistent cache in an SQLite database, used by :func:`pydna.utils.memorize`.
+
+Values are pickled and stored under string keys in a database in WAL mode,
+so that many processes can read the cache while one of them writes to it.
+Each process keeps its own connection open and a small in-memory layer with
+the most recently used values.
+
+Entries older than max_age seconds are not returned and are deleted when
+new entries are stored. When the pickled values take more than max_size
+bytes, the least recently used entries are deleted.
+
+>>> import os, tempfile
+>>> from pydna.cache import Cache
+>>> path = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+>>> cache = Cache(path, max_size=1000)
+>>> cache["key"] = [1, 2, 3]
+>>> cache["key"]
+[1, 2, 3]
+>>> "other" in cache
+False
+>>> len(cache)
+1
+>>> cache.close()
+"""
+
+import os as _os
+import pickle as _pickle
+import sqlite3 as _sqlite3
+import threading as _threading
+import time as _time
+from collections import OrderedDict as _OrderedDict
+
+_caches = {}
+
+# seconds between updates of the access time of an entry that is read
+_accessed_resolution = 60.0
+
+
+class Cache(object):
+    """Mapping from strings to pickled values in an SQLite database.
+
+    Parameters
+    ----------
+    path : str
+        Path to the database file, which is created if missing.
+    max_size : int, optional
+        Maximum total size in bytes of the pickled values, no limit if None or 0.
+    max_age : float, optional
+        Maximum age in seconds of entries, no limit if None or 0.
+    lru_size : int, optional
+        Number of values kept in memory by each process.
+    timeout : float, optional
+        Seconds to wait for another process that writes to the database.
+
+    Notes
+    -----
+    Values in the in-memory layer are kept pickled, so each lookup returns a
+    new object, as when the value is read from the database. Entries deleted
+    by another process can still be returned from the in-memory layer of
+    this process until they are pushed out of it or become too old.
+    """
+
+    def __init__(self, path, max_size=None, max_age=None, lru_size=128, timeout=30.0):
+        self.path = path
+        self.max_size = max_size or None
+        self.max_age = max_age or None
+        self.lru_size = lru_size
+        self.timeout = timeout
+        self._lru = _OrderedDict()
+        self._lock = _threading.RLock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        """Open connection for this process (PRIVATE)."""
+        if self._connection is None or self._pid != _os.getpid():
+            # a connection inherited from a parent process can not be used
+            connection = _sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            self._connection, self._pid = connection, _os.getpid()
+            self._lru.clear()
+        return self._connection
+
+    def _expired(self, created, now):
+        return self.max_age is not None and now - created > self.max_age
+
+    def _remember(self, key, created, accessed, value):
+        self._lru[key] = (created, accessed, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _blob(self, key):
+        """Pickled value for key, or None (PRIVATE)."""
+        now = _time.time()
+        with self._lock:
+            connection = self._connect()
+            if key in self._lru:
+                created, accessed, value = self._lru.pop(key)
+            else:
+                row = connection.execute("SELECT created, accessed, value FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                created, accessed, value = row
+            if self._expired(created, now):
+                return None
+            if now - accessed > _accessed_resolution:
+                connection.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+                accessed = now
+            self._remember(key, created, accessed, value)
+            return value
+
+    def __getitem__(self, key):
+        value = self._blob(key)
+        if value is None:
+            raise KeyError(key)
+        return _pickle.loads(value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return self._blob(key) is not None
+
+    def __setitem__(self, key, value):
+        value = _pickle.dumps(value, protocol=_pickle.HIGHEST_PROTOCOL)
+        now = _time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                evicted = self._evict(connection, now)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            if key not in evicted:
+                self._remember(key, now, now, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            self._lru.pop(key, None)
+            if not self._connect().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount:
+                raise KeyError(key)
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _evict(self, connection, now):
+        """Delete old entries, then the least recently used ones above max_size,
+        returns the deleted keys (PRIVATE)."""
+        evicted = []
+        if self.max_age is not None:
+            rows = connection.execute("SELECT key FROM cache WHERE created < ?", (now - self.max_age,)).fetchall()
+            connection.executemany("DELETE FROM cache WHERE key = ?", rows)
+            evicted.extend(key for key, in rows)
+        if self.max_size is not None:
+            (total,) = connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+            rows = []
+            if total > self.max_size:
+                for key, size in connection.execute("SELECT key, size FROM cache ORDER BY accessed"):
+                    rows.append((key,))
+                    total -= size
+                    if total <= self.max_size:
+                        break
+            connection.executemany("DELETE FROM cache WHERE key = ?", rows)
+            evicted.extend(key for key, in rows)
+        for key in evicted:
+            self._lru.pop(key, None)
+        return evicted
+
+    def evict(self):
+        """Delete entries that are too old or above the size limit."""
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            self._evict(connection, _time.time())
+            connection.execute("COMMIT")
+
+    def clear(self):
+        """Delete all entries."""
+        with self._lock:
+            self._connect().execute("DELETE FROM cache")
+            self._lru.clear()
+
+    def close(self):
+        """Close the connection of this process."""
+        with self._lock:
+            if self._connection is not None and self._pid == _os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._lru.clear()
+
+    def __repr__(self):
+        return f"Cache({self.path!r})"
+
+
+def cache(path):
+    """The Cache for the database at path, shared within the process.
+
+    The size and age limits are read from the pydna_cache_max_size (bytes)
+    and pydna_cache_max_age (seconds) environment variables, where 0 means
+    no limit.
+    """
+    path = _os.path.abspath(path)
+    max_size = int(float(_os.getenv("pydna_cache_max_size", 0) or 0))
+    max_age = float(_os.getenv("pydna_cache_max_age", 0) or 0)
+    try:
+        result = _caches[path]
+    except KeyError:
+        result = _caches[path] = Cache(path)
+    result.max_size, result.max_age = max_size or None, max_age or None
+    return result
+
+
+if __name__ == "__main__":
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
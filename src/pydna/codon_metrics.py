@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Codon usage metrics for many coding sequences at once.
+
+The functions in this module compute the same values as the cai, rarecodons
+and express methods of :class:`pydna.seq.Seq`, but for a list of sequences
+at a time. The sequences are encoded as arrays of integer codons (0-63, in
+the order of the CODONS list) and counted into a table with one row per
+sequence and one column per codon. The metrics are computed from this table
+with NumPy, using the weights in :mod:`pydna.codon`.
+
+Sequences can be strings or objects with a seq attribute. Bases after the
+last complete codon are ignored.
+
+>>> from pydna.codon_metrics import cai, rare_codon_counts
+>>> seqs = ["ATGCGACGGTAA", "atgagaagataa"]
+>>> cai(seqs).tolist()
+[0.226, 1.0]
+>>> rare_codon_counts(seqs)
+array([[1, 1, 0, 0, 0, 0],
+       [0, 0, 0, 0, 0, 0]])
+"""
+
+import itertools as _itertools
+
+import numpy as _np
+from Bio.Data import CodonTable as _CodonTable
+from Bio.SeqUtils import seq3 as _seq3
+
+from pydna._pretty import PrettyTable as _PrettyTable
+from pydna.codon import n_end as _n_end
+from pydna.codon import rare_codons as _rare_codons
+from pydna.codon import start as _start
+from pydna.codon import stop as _stop
+from pydna.codon import weights as _weights
+
+# The codons in the order of their integer codes
+CODONS = ["".join(codon) for codon in _itertools.product("TCAG", repeat=3)]
+
+# Integer code of each byte; codons with other characters than ACGT get code 64
+_BASES = _np.full(256, 4, dtype=_np.int64)
+for _i, _base in enumerate(b"TCAG"):
+    _BASES[_base] = _BASES[_base + 32] = _i
+_CODES = {codon: i for i, codon in enumerate(CODONS)}
+
+_GC = _np.zeros(256, dtype=bool)
+_GC[list(b"CGScgs")] = True
+_AT = _np.zeros(256, dtype=bool)
+_AT[list(b"ATWatw")] = True
+
+
+def _string(seq):
+    """Upper case string of a sequence (PRIVATE)."""
+    return str(getattr(seq, "seq", seq)).upper()
+
+
+def _encode(data):
+    """Integer codes of the codons in an array of bytes (PRIVATE)."""
+    bases = _BASES[data[: len(data) // 3 * 3]].reshape(-1, 3)
+    codes = bases[:, 0] * 16 + bases[:, 1] * 4 + bases[:, 2]
+    codes[(bases == 4).any(axis=1)] = 64
+    return codes
+
+
+def encode(seq):
+    """Array of the integer codes of the codons of a sequence, 64 for codons with other characters than ACGT.
+
+    >>> from pydna.codon_metrics import CODONS, encode
+    >>> [CODONS[i] for i in encode("atgtaa")]
+    ['ATG', 'TAA']
+    """
+    return _encode(_np.frombuffer(_string(seq).encode("ascii"), dtype=_np.uint8))
+
+
+def _counts(strings):
+    """Codon table with a column for codons with other characters than ACGT (PRIVATE)."""
+    # All sequences are encoded at once, without the bases after the last codon
+    codes = _encode(_np.frombuffer(b"".join(s[: len(s) // 3 * 3].encode("ascii") for s in strings), dtype=_np.uint8))
+    rows = _np.repeat(_np.arange(len(strings)), [len(s) // 3 for s in strings])
+    return _np.bincount(rows * 65 + codes, minlength=len(strings) * 65).reshape(len(strings), 65)
+
+
+def codon_counts(seqs):
+    """Table of the number of each codon, with one row per sequence and one column for each of CODONS."""
+    return _counts([_string(s) for s in seqs])[:, :64]
+
+
+def _cai(counts, organism, weights, genetic_code=11):
+    """CAI of the sequences in a codon table from _counts (PRIVATE)."""
+    table = _CodonTable.unambiguous_dna_by_id[genetic_code]
+    synonyms = {}
+    for codon, amino_acid in table.forward_table.items():
+        synonyms.setdefault(amino_acid, []).append(codon)
+    log_weights = _np.zeros(65)
+    used = _np.zeros(65, dtype=bool)
+    missing = _np.ones(65, dtype=bool)
+    for codon, code in _CODES.items():
+        amino_acid = table.forward_table.get(codon)
+        if amino_acid and len(synonyms[amino_acid]) == 1:
+            # Codons without synonyms are not used, like ATG and TGG
+            missing[code] = False
+        elif codon in weights[organism]:
+            used[code] = True
+            missing[code] = False
+            with _np.errstate(divide="ignore"):
+                log_weights[code] = _np.log(weights[organism][codon])
+        elif codon in table.stop_codons:
+            missing[code] = False
+    bad = counts[:, missing].any(axis=1)
+    if bad.any():
+        raise KeyError(f"Missing weight for a codon in sequence {_np.flatnonzero(bad)[0]}.")
+    with _np.errstate(divide="ignore", invalid="ignore"):
+        return _np.exp(counts @ _np.where(used, log_weights, 0) / (counts @ used))
+
+
+def cai(seqs, organism="sce", weights=_weights):
+    """Codon adaptation index of each sequence, rounded like :func:`pydna.utils.cai`.
+
+    Codons without synonyms (ATG and TGG) are not used and stop codons are
+    only used if they have weights. A ValueError is raised for sequences that
+    are empty or have a length that is not a multiple of three, and a
+    KeyError if a sequence has a codon without a weight.
+    """
+    strings = [_string(s) for s in seqs]
+    for i, s in enumerate(strings):
+        if not s or len(s) % 3:
+            raise ValueError(f"Sequence {i} is empty or its length is not divisible by three.")
+    return _np.round(_cai(_counts(strings), organism, weights), 3)
+
+
+def rare_codon_counts(seqs, organism="sce"):
+    """Number of each rare codon of pydna.codon.rare_codons[organism], with one row per sequence."""
+    return codon_counts(seqs)[:, [_CODES[codon] for codon in _rare_codons[organism]]]
+
+
+def gc(seqs):
+    """GC fraction of each sequence, like Bio.SeqUtils.gc_fraction, rounded to three decimals."""
+    strings = [str(getattr(s, "seq", s)).encode("ascii") for s in seqs]
+    rows = _np.repeat(_np.arange(len(strings)), [len(s) for s in strings])
+    data = _np.frombuffer(b"".join(strings), dtype=_np.uint8)
+    gc = _np.bincount(rows, weights=_GC[data], minlength=len(strings))
+    at = _np.bincount(rows, weights=_AT[data], minlength=len(strings))
+    with _np.errstate(invalid="ignore"):
+        return _np.round(_np.where(gc + at > 0, gc / (gc + at), 0), 3)
+
+
+def express(seqs, organism="sce", weights=_weights):
+    """Table with the columns of :meth:`pydna.seq.Seq.express` and one row per sequence."""
+    strings = [_string(s) for s in seqs]
+    counts = _counts(strings)
+    rare = counts[:, [_CODES[codon] for codon in _rare_codons[organism]]]
+    total = counts.sum(axis=1)
+    cais = _np.round(_cai(counts, organism, weights), 3)
+    gcs = gc(strings)
+    x = _PrettyTable(["cds", "len", "cai", "gc", "sta", "stp", "n-end"] + _rare_codons[organism] + ["rare"])
+    forward_table = _CodonTable.unambiguous_dna_by_id[1].forward_table
+    for i, s in enumerate(strings):
+        row = [f"{s[:3]}...{s[-3:]}", len(s) / 3, float(cais[i]), float(gcs[i])]
+        row.append(_start[organism].get(s[:3]))
+        row.append(_stop[organism].get(s[-3:]))
+        row.append(_n_end[organism].get(_seq3(forward_table.get(s[3:6], "*"))))
+        row.extend(int(n) for n in rare[i])
+        row.append(round(int(rare[i].sum()) / int(total[i]), 3))
+        x.add_row(row)
+    return x
+
+
+if __name__ == "__main__":
+    import os as _os
+
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Binary files with collections of Dseqrecords.
+
+A collection file keeps many Dseqrecords in columns: one array holds all
+sequences one after the other, with an array of offsets, and other arrays
+hold the overhangs and topology of each sequence. The SEGUIDs are kept
+sorted, so that a sequence is found by binary search. The features of
+all records are kept in a table with one row per feature, where the
+location parts, types and qualifiers are also columns. Texts like ids
+and names are stored as utf-8, and annotations and qualifiers as JSON.
+
+The file starts with a version number and a JSON header with the position
+of each column in the file. :class:`Collection` maps the file into memory,
+so that records are read one at a time by index or SEGUID without reading
+the whole file.
+
+The sequence of each record is stored with the overhangs of both strands,
+so the crick strand is always the complement of the watson strand.
+Fuzzy positions of features other than before (<) and after (>) positions
+are stored as exact positions. Annotations that cannot be stored as JSON,
+like references, are left out.
+
+>>> import os, tempfile
+>>> from pydna.dseqrecord import Dseqrecord
+>>> from pydna.collection import Collection, write_collection
+>>> path = os.path.join(tempfile.mkdtemp(), "parts.pydna")
+>>> write_collection([Dseqrecord("aaaccc", id="a"), Dseqrecord("gggttt", circular=True, id="b")], path)
+>>> with Collection(path) as collection:
+...     print(len(collection), collection[0].id, collection["cdseguid=Ajxrrxhk7yRJax8xCi0RMn-Yixk"].id)
+2 a b
+"""
+
+import json as _json
+import mmap as _mmap
+import struct as _struct
+
+import numpy as _np
+from Bio.SeqFeature import AfterPosition as _AfterPosition
+from Bio.SeqFeature import BeforePosition as _BeforePosition
+from Bio.SeqFeature import CompoundLocation as _CompoundLocation
+from Bio.SeqFeature import ExactPosition as _ExactPosition
+from Bio.SeqFeature import SeqFeature as _SeqFeature
+from Bio.SeqFeature import SimpleLocation as _SimpleLocation
+
+from pydna.dseq import Dseq as _Dseq
+from pydna.dseqrecord import Dseqrecord as _Dseqrecord
+from pydna.utils import rc as _rc
+
+MAGIC = b"PYDNACOL"
+VERSION = 1
+
+# magic, version and length of the JSON header
+_prefix = _struct.Struct("<8sIQ")
+
+# strand of a location part without strand
+_no_strand = 127
+_operators = [None, "join", "order"]
+# Kinds of positions kept in the part_positions column, other positions are stored as exact
+_positions = [_ExactPosition, _BeforePosition, _AfterPosition]
+
+
+def _position_code(position):
+    return _positions.index(type(position)) if type(position) in _positions else 0
+
+
+def _json_text(value):
+    return _json.dumps(value, default=str, ensure_ascii=False)
+
+
+def _json_annotations(annotations):
+    """JSON text of the annotations that can be stored as JSON (PRIVATE)."""
+    kept = {}
+    for key, value in annotations.items():
+        try:
+            _json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        kept[key] = value
+    return _json_text(kept)
+
+
+def _text_column(strings):
+    """Concatenated utf-8 encoded strings and their offsets (PRIVATE)."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = _np.zeros(len(encoded) + 1, dtype=_np.int64)
+    _np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return _np.frombuffer(b"".join(encoded), dtype=_np.uint8), offsets
+
+
+def _columns(records):
+    """Dictionary of the column arrays for records and the list of feature types (PRIVATE)."""
+    sequences, crick_ovhg, watson_ovhg, circular, seguids = [], [], [], [], []
+    ids, names, descriptions, dbxrefs, annotations = [], [], [], [], []
+    feature_counts, types, operators, qualifiers = [], [], [], []
+    part_counts, starts, ends, strands, positions = [], [], [], [], []
+    type_ids = {}
+    for record in records:
+        seq = record.seq
+        sequences.append(str(seq))
+        crick_ovhg.append(seq.ovhg)
+        watson_ovhg.append(seq.watson_ovhg())
+        circular.append(seq.circular)
+        # Empty sequences have no SEGUID
+        seguids.append(seq.seguid() if len(seq) else "")
+        ids.append(record.id)
+        names.append(record.name)
+        descriptions.append(record.description)
+        dbxrefs.append(_json_text(record.dbxrefs))
+        annotations.append(_json_annotations(record.annotations))
+        feature_counts.append(len(record.features))
+        for feature in record.features:
+            types.append(type_ids.setdefault(feature.type, len(type_ids)))
+            operators.append(_operators.index(getattr(feature.location, "operator", None)))
+            qualifiers.append(_json_text(feature.qualifiers))
+            try:
+                for part in feature.location.parts:
+                    starts.append(int(part.start))
+                    ends.append(int(part.end))
+                    strands.append(_no_strand if part.strand is None else part.strand)
+                    positions.append(_position_code(part.start) + 3 * _position_code(part.end))
+            except (TypeError, ValueError):
+                raise ValueError(f"Feature {feature.type} of {record.id} has unknown positions.")
+            part_counts.append(len(feature.location.parts))
+
+    columns = {}
+    columns["sequence"], columns["sequence_offsets"] = _text_column(sequences)
+    columns["crick_ovhg"] = _np.array(crick_ovhg, dtype=_np.int64)
+    columns["watson_ovhg"] = _np.array(watson_ovhg, dtype=_np.int64)
+    columns["circular"] = _np.array(circular, dtype=_np.bool_)
+    seguids = _np.array(seguids, dtype=_np.bytes_)
+    columns["seguid_order"] = _np.argsort(seguids, kind="stable")
+    columns["seguid"] = seguids[columns["seguid_order"]]
+    for name, strings in (
+        ("id", ids),
+        ("name", names),
+        ("description", descriptions),
+        ("dbxrefs", dbxrefs),
+        ("annotations", annotations),
+    ):
+        columns[name], columns[f"{name}_offsets"] = _text_column(strings)
+    columns["feature_offsets"] = _np.concatenate(([0], _np.cumsum(feature_counts, dtype=_np.int64)))
+    columns["feature_type"] = _np.array(types, dtype=_np.int32)
+    columns["feature_operator"] = _np.array(operators, dtype=_np.int8)
+    columns["qualifiers"], columns["qualifiers_offsets"] = _text_column(qualifiers)
+    columns["part_offsets"] = _np.concatenate(([0], _np.cumsum(part_counts, dtype=_np.int64)))
+    columns["part_start"] = _np.array(starts, dtype=_np.int64)
+    columns["part_end"] = _np.array(ends, dtype=_np.int64)
+    columns["part_strand"] = _np.array(strands, dtype=_np.int8)
+    columns["part_positions"] = _np.array(positions, dtype=_np.int8)
+    return columns, list(type_ids)
+
+
+def write_collection(records, path):
+    """Write the Dseqrecords to a collection file, see :class:`Collection`."""
+    records = list(records)
+    columns, types = _columns(records)
+    layout = {}
+    position = 0
+    for name, array in columns.items():
+        layout[name] = [array.dtype.str, position, len(array)]
+        position += -(-array.nbytes // 8) * 8
+    header = _json_text({"count": len(records), "feature_types": types, "columns": layout}).encode("utf-8")
+    header += b" " * (-(len(header) + _prefix.size) % 8)
+    start = _prefix.size + len(header)
+    with open(path, "wb") as f:
+        f.write(_prefix.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, array in columns.items():
+            f.seek(start + layout[name][1])
+            f.write(array.tobytes())
+        f.truncate(start + position)
+
+
+def _dseq(sequence, crick_ovhg, watson_ovhg, circular):
+    """Dseq from the full sequence and the overhangs of the strands (PRIVATE)."""
+    if not crick_ovhg and not watson_ovhg:
+        return _Dseq.from_string(sequence, circular=circular)
+    watson = sequence[max(0, crick_ovhg) : len(sequence) - max(0, -watson_ovhg)]
+    crick = _rc(sequence)[max(0, watson_ovhg) : len(sequence) - max(0, -crick_ovhg)]
+    return _Dseq(watson, crick, ovhg=crick_ovhg)
+
+
+class Collection:
+    """Dseqrecords in a collection file written by :func:`write_collection`.
+
+    Records are made when they are accessed, by index or by SEGUID. The
+    file is memory mapped until the collection is closed.
+
+    Parameters
+    ----------
+    path : str or path
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+        magic, version, size = _prefix.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a collection file.")
+        if version > VERSION:
+            self.close()
+            raise ValueError(f"{path} has version {version}, this version of pydna reads version {VERSION}.")
+        header = _json.loads(bytes(self._mmap[_prefix.size : _prefix.size + size]))
+        start = _prefix.size + size
+        self._count = header["count"]
+        self._types = header["feature_types"]
+        self._columns = {
+            name: _np.frombuffer(self._mmap, dtype=dtype, count=count, offset=start + offset)
+            for name, (dtype, offset, count) in header["columns"].items()
+        }
+
+    def close(self):
+        """Release the memory mapped file."""
+        self._columns = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Arrays that are still used keep the file mapped until they are released
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return f"Collection({self.path}, {len(self)} records)"
+
+    def _text(self, name, i):
+        """String i of a text column (PRIVATE)."""
+        offsets = self._columns[f"{name}_offsets"]
+        return self._columns[name][offsets[i] : offsets[i + 1]].tobytes().decode("utf-8")
+
+    def seguids(self):
+        """List of the SEGUIDs of the sequences, in order."""
+        seguids = _np.empty_like(self._columns["seguid"])
+        seguids[self._columns["seguid_order"]] = self._columns["seguid"]
+        return [s.decode("ascii") for s in seguids.tolist()]
+
+    def index(self, seguid):
+        """Index of the first record with a SEGUID, a KeyError is raised if there is none."""
+        seguids, order = self._columns["seguid"], self._columns["seguid_order"]
+        key = seguid.encode("ascii")
+        i = _np.searchsorted(seguids, key) if len(order) else 0
+        if i == len(order) or seguids[i] != key:
+            raise KeyError(seguid)
+        return int(order[i])
+
+    def _feature(self, i):
+        """The SeqFeature in row i of the feature table (PRIVATE)."""
+        columns = self._columns
+        parts = []
+        for j in range(columns["part_offsets"][i], columns["part_offsets"][i + 1]):
+            strand = int(columns["part_strand"][j])
+            end, start = divmod(int(columns["part_positions"][j]), 3)
+            parts.append(
+                _SimpleLocation(
+                    _positions[start](int(columns["part_start"][j])),
+                    _positions[end](int(columns["part_end"][j])),
+                    None if strand == _no_strand else strand,
+                )
+            )
+        operator = _operators[columns["feature_operator"][i]]
+        location = _CompoundLocation(parts, operator) if len(parts) > 1 else parts[0]
+        return _SeqFeature(
+            location, type=self._types[columns["feature_type"][i]], qualifiers=_json.loads(self._text("qualifiers", i))
+        )
+
+    def __getitem__(self, key):
+        """The Dseqrecord at an index or with a SEGUID, or a list of Dseqrecords for a slice."""
+        if isinstance(key, slice):
+            return [self[i] for i in range(self._count)[key]]
+        i = self.index(key) if isinstance(key, str) else range(self._count)[key]
+        columns = self._columns
+        seq = _dseq(
+            self._text("sequence", i),
+            int(columns["crick_ovhg"][i]),
+            int(columns["watson_ovhg"][i]),
+            bool(columns["circular"][i]),
+        )
+        features = [self._feature(j) for j in range(columns["feature_offsets"][i], columns["feature_offsets"][i + 1])]
+        record = _Dseqrecord(
+            seq,
+            id=self._text("id", i),
+            name=self._text("name", i),
+            description=self._text("description", i),
+            dbxrefs=_json.loads(self._text("dbxrefs", i)),
+            features=features,
+        )
+        # Set after __init__, which turns annotations into strings
+        record.annotations = _json.loads(self._text("annotations", i))
+        return record
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+
+def read_collection(path):
+    """List of all Dseqrecords in a collection file."""
+    with Collection(path) as collection:
+        return list(collection)
+
+
+if __name__ == "__main__":
+    import os as _os
+
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
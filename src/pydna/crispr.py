@@ -17,6 +17,7 @@ The Dseq class support the notion of circular and linear DNA topology.
 from abc import ABC, abstractmethod
 import re
 from pydna.utils import rc
+from pydna.utils import circular_finditer
 
 
 class _cas(ABC):
@@ -87,16 +88,19 @@ class cas9(_cas):
         """docstring."""
         dna = str(dna).upper()
         if linear:
-            dna = dna
+            matches = ((0, mobj) for mobj in self.compsite.finditer(dna))
         else:
-            dna = dna + dna[1 : self.size]
+            # Sites spanning the origin are found in a short region around it
+            matches = circular_finditer(self.compsite, dna, len(self.protospacer) + len(self.pam))
         results = []
-        for mobj in self.compsite.finditer(dna):
+        for offset, mobj in matches:
             w, c = mobj.groups()
             if w:
-                results.append(mobj.start("watson") + 1 + self.fst5)
+                results.append(offset + mobj.start("watson") + 1 + self.fst5)
             if c:
-                results.append(mobj.start("crick") + len(self.pam) + 1 - self.fst3)
+                results.append(offset + mobj.start("crick") + len(self.pam) + 1 - self.fst3)
+        if not linear and dna:
+            results = [(position - 1) % len(dna) + 1 for position in results]
         return results
 
     def __str__(self):
@@ -21,6 +21,8 @@ import re as _re
 import sys as _sys
 import math as _math
 
+import numpy as _np
+
 from pydna.seq import Seq as _Seq
 from Bio.Seq import _translate_str
 
@@ -31,10 +33,14 @@ from seguid import cdseguid as _cdseguid
 from pydna.utils import rc as _rc
 from pydna.utils import flatten as _flatten
 from pydna.utils import cuts_overlap as _cuts_overlap
+from pydna.utils import circular_find as _circular_find
 
 from pydna.common_sub_strings import common_sub_strings as _common_sub_strings
 from Bio.Restriction import RestrictionBatch as _RestrictionBatch
 from Bio.Restriction import CommOnly
+from Bio.Restriction.Restriction import FormattedSeq as _FormattedSeq
+from Bio.Restriction.Restriction import RestrictionType as _RestrictionType
+from pydna.restriction_scanner import scanner as _scanner
 
 from typing import Tuple
 
@@ -294,6 +300,9 @@ class Dseq(_Seq):
 
     trunc = 30
 
+    # Lazily derived state is kept out of __dict__
+    __slots__ = ("_crick", "_cache")
+
     def __init__(
         self,
         watson,
@@ -305,14 +314,13 @@ class Dseq(_Seq):
     ):
         if crick is None:
             if ovhg is None:
-                crick = _rc(watson)
+                # The crick strand is derived from watson on first access
                 ovhg = 0
                 try:
                     self._data = bytes(watson, encoding="ASCII")
                 except TypeError:
                     self._data = watson
                     watson = watson.decode("ASCII")
-                    crick = crick.decode("ASCII")
             else:  # ovhg given, but no crick strand
                 raise ValueError("ovhg defined without crick strand!")
         else:  # crick strand given
@@ -367,11 +375,11 @@ class Dseq(_Seq):
                     else:
                         self._data = bytes(watson, encoding="ASCII")
 
-        self.circular = circular
-        self.watson = _pretty_str(watson)
-        self.crick = _pretty_str(crick)
+        self._circular = circular
+        self._watson = _pretty_str(watson)
+        self._crick = None if crick is None else _pretty_str(crick)
         self.length = len(self._data)
-        self.ovhg = ovhg
+        self._ovhg = ovhg
         self.pos = pos
 
     @classmethod
@@ -405,10 +413,10 @@ class Dseq(_Seq):
         **kwargs,
     ):
         obj = cls.__new__(cls)  # Does not call __init__
-        obj.watson = _pretty_str(dna)
-        obj.crick = _pretty_str(_rc(dna))
-        obj.ovhg = 0
-        obj.circular = circular
+        obj._watson = _pretty_str(dna)
+        obj._crick = None  # derived from watson on first access
+        obj._ovhg = 0
+        obj._circular = circular
         # obj._linear = linear
         obj.length = len(dna)
         obj.pos = 0
@@ -494,12 +502,43 @@ class Dseq(_Seq):
 
         return Dseq(watson, crick=crick, ovhg=crick_ovhg)
 
-    # @property
-    # def ovhg(self):
-    #     """The ovhg property. This cannot be set directly, but is a
-    #     consequence of how the watson and crick strands anneal to
-    #     each other"""
-    #     return self._ovhg
+    @property
+    def watson(self):
+        """The watson (upper) strand of the double stranded fragment 5'-3'."""
+        return self._watson
+
+    @watson.setter
+    def watson(self, value):
+        self._watson = value
+        self._reset_cache()
+
+    @property
+    def crick(self):
+        """The crick (lower) strand of the double stranded fragment 5'-3'.
+
+        For blunt sequences created from a single string, the crick strand
+        is the reverse complement of the watson strand and is only computed
+        the first time it is accessed.
+        """
+        if self._crick is None:
+            self._crick = _pretty_str(_rc(self._watson))
+        return self._crick
+
+    @crick.setter
+    def crick(self, value):
+        self._crick = value
+        self._reset_cache()
+
+    @property
+    def ovhg(self):
+        """The stagger between the watson and crick strands in the 5' end.
+        See the class docstring for details."""
+        return self._ovhg
+
+    @ovhg.setter
+    def ovhg(self, value):
+        self._ovhg = value
+        self._reset_cache()
 
     # @property
     # def linear(self):
@@ -507,11 +546,69 @@ class Dseq(_Seq):
     #     Use an empty slice [:] to create a linear object."""
     #     return self._linear
 
-    # @property
-    # def circular(self):
-    #     """The circular property can not be set directly.
-    #     Use :meth:`looped` to create a circular Dseq object"""
-    #     return self._circular
+    @property
+    def circular(self):
+        """True if the sequence is circular, False if linear.
+        Use :meth:`looped` to create a circular Dseq object"""
+        return self._circular
+
+    @circular.setter
+    def circular(self, value):
+        self._circular = value
+        self._reset_cache()
+
+    def _cached(self, key, factory):
+        """Return a representation derived from the strands, computing it on first use.
+
+        Derived values (case normalized strands, SEGUID, search strings) are stored
+        in a cache that is dropped when watson, crick, ovhg or circular are set.
+        The cache is neither copied nor pickled.
+        """
+        cache = getattr(self, "_cache", None)
+        if cache is None:
+            cache = self._cache = {}
+        try:
+            return cache[key]
+        except KeyError:
+            value = cache[key] = factory()
+            return value
+
+    def _reset_cache(self):
+        self._cache = None
+
+    def _lower(self):
+        """Lower case (watson, crick) tuple."""
+        return self._cached("lower", lambda: (self.watson.lower(), self.crick.lower()))
+
+    def _upper(self):
+        """Upper case (watson, crick) tuple."""
+        return self._cached("upper", lambda: (self.watson.upper(), self.crick.upper()))
+
+    def _formatted_seq(self, linear=None):
+        """Bio.Restriction FormattedSeq used for restriction enzyme searches.
+
+        The topology of the sequence is used unless linear is given.
+        """
+        linear = not self.circular if linear is None else linear
+        return self._cached(("formatted", linear), lambda: _FormattedSeq(self, linear=linear))
+
+    def __getstate__(self):
+        return self.__dict__.copy(), {"_data": self._data, "_crick": self._crick}
+
+    def __setstate__(self, state):
+        state, slotstate = state if isinstance(state, tuple) else (state, None)
+        state = dict(state)
+        slotstate = dict(slotstate or {})
+        # Dseq objects pickled by earlier versions store the strands as plain attributes
+        if "crick" in state:
+            slotstate["_crick"] = state.pop("crick")
+        for name in ("watson", "ovhg", "circular"):
+            if name in state:
+                state[f"_{name}"] = state.pop(name)
+        slotstate.setdefault("_crick", None)
+        self.__dict__.update(state)
+        for name, value in slotstate.items():
+            setattr(self, name, value)
 
     def mw(self):
         """This method returns the molecular weight of the DNA molecule
@@ -521,7 +618,7 @@ class Dseq(_Seq):
                     (C x 289.2) + (G x 329.2) +
                     (N x 308.9) + 79.0
         """
-        nts = (self.watson + self.crick).lower()
+        nts = "".join(self._lower())
 
         return (
             313.2 * nts.count("a")
@@ -556,9 +653,10 @@ class Dseq(_Seq):
         pydna.dseq.Dseq.lower
 
         """
+        watson, crick = self._upper()
         return self.quick(
-            self.watson.upper(),
-            self.crick.upper(),
+            watson,
+            crick,
             ovhg=self.ovhg,
             # linear=self.linear,
             circular=self.circular,
@@ -588,9 +686,10 @@ class Dseq(_Seq):
         --------
         pydna.dseq.Dseq.upper
         """
+        watson, crick = self._lower()
         return self.quick(
-            self.watson.lower(),
-            self.crick.lower(),
+            watson,
+            crick,
             ovhg=self.ovhg,
             # linear=self.linear,
             circular=self.circular,
@@ -639,7 +738,8 @@ class Dseq(_Seq):
         if not self.circular:
             return _Seq.find(self, sub, start, end)
 
-        return (_pretty_str(self) + _pretty_str(self)).find(sub, start, end)
+        # The full sequence of a circular Dseq is the watson strand
+        return _circular_find(self.watson, sub, start, end)
 
     def __getitem__(self, sl):
         """Returns a subsequence. This method is used by the slice notation"""
@@ -689,12 +789,12 @@ class Dseq(_Seq):
 
         """
         try:
-            same = (
-                other.watson.lower() == self.watson.lower()
-                and other.crick.lower() == self.crick.lower()
-                and other.ovhg == self.ovhg
-                and self.circular == other.circular
-            )
+            same = other.ovhg == self.ovhg and self.circular == other.circular
+            if same:
+                if isinstance(other, Dseq):
+                    same = other._lower() == self._lower()
+                else:
+                    same = (other.watson.lower(), other.crick.lower()) == self._lower()
             # Also test for alphabet ?
         except AttributeError:
             same = False
@@ -1052,15 +1152,63 @@ class Dseq(_Seq):
             raise TypeError("sticky ends not compatible!")
         return answer
 
+    @classmethod
+    def join(cls, seqs):
+        """Ligate several Dseq objects in one step.
+
+        The result is the same as adding the sequences one by one with +,
+        but the ends are checked pairwise and the strands of the product are
+        only built once, so the time grows linearly with the number of
+        sequences. Empty sequences are ignored.
+
+        A TypeError is raised if more than one sequence is given and one of
+        them is circular or if adjacent sticky ends are not compatible.
+
+        Examples
+        --------
+        >>> from Bio.Restriction import EcoRI
+        >>> from pydna.dseq import Dseq
+        >>> a, b = Dseq("aaaGAATTCccc").cut(EcoRI)
+        >>> Dseq.join([a, b, Dseq("")])
+        Dseq(-12)
+        aaaGAATTCccc
+        tttCTTAAGggg
+        >>> Dseq.join([a, a])
+        Traceback (most recent call last):
+        ...
+        TypeError: sticky ends not compatible!
+        """
+        seqs = list(seqs)
+        if len(seqs) == 1:
+            return _copy.copy(seqs[0])
+        pieces = []
+        for seq in seqs:
+            if seq.circular:
+                raise TypeError("circular DNA cannot be ligated!")
+            if not seq:
+                continue
+            if pieces:
+                left_type, left_tail = pieces[-1].three_prime_end()
+                right_type, right_tail = seq.five_prime_end()
+                if left_type != right_type or str(left_tail) != str(_rc(right_tail)):
+                    raise TypeError("sticky ends not compatible!")
+            pieces.append(seq)
+        if not pieces:
+            return cls("")
+        if len(pieces) == 1:
+            return _copy.copy(pieces[0])
+        return cls.quick(
+            "".join(piece.watson for piece in pieces),
+            "".join(piece.crick for piece in reversed(pieces)),
+            pieces[0].ovhg,
+        )
+
     def __mul__(self, number):
         if not isinstance(number, int):
             raise TypeError("TypeError: can't multiply Dseq by non-int of type {}".format(type(number)))
         if number <= 0:
             return self.__class__("")
-        new = _copy.copy(self)
-        for i in range(number - 1):
-            new += self
-        return new
+        return self.join([self] * number)
 
     def _fill_in_five_prime(self, nucleotides):
         stuffer = ""
@@ -1291,11 +1439,48 @@ class Dseq(_Seq):
         d.crick = d.crick[n:]
         return d
 
+    def restriction_search(self, batch: _RestrictionBatch = None, linear=None):
+        """Cut positions for the enzymes in a RestrictionBatch.
+
+        Returns a dict with the same content as
+        :meth:`Bio.Restriction.RestrictionBatch.search`, enzymes as keys and
+        lists of 1-based cut positions as values. The sequence is searched as
+        circular or linear according to its topology unless linear is given.
+
+        The result for each enzyme is kept in the cache of the sequence, so
+        repeated queries (cutters, unique_cutters, get_cutsites, ...) only
+        search for enzymes that were not searched for before.
+
+        Examples
+        --------
+        >>> from Bio.Restriction import EcoRI, BamHI
+        >>> from pydna.dseq import Dseq
+        >>> seq = Dseq("aaGAATTCaaGAATTCaa")
+        >>> seq.restriction_search([EcoRI, BamHI]) == {EcoRI: [4, 12], BamHI: []}
+        True
+        """
+        if batch is None:
+            batch = CommOnly
+        if linear is None:
+            linear = not self.circular
+        table = self._cached(("restriction", linear), dict)
+        missing = set(batch).difference(table)
+        if missing:
+            fseq = self._formatted_seq(linear=linear)
+            # A single pass with a RestrictionScanner is faster than separate searches
+            # for all but the smallest numbers of enzymes. The scanner is compiled once
+            # for the whole batch, so it is reused for other sequences.
+            if len(missing) >= 5:
+                table.update(_scanner(batch).search(fseq))
+            else:
+                table.update((e, e.search(fseq)) for e in missing)
+        return {e: list(table[e]) for e in batch}
+
     def no_cutters(self, batch: _RestrictionBatch = None):
         """Enzymes in a RestrictionBatch not cutting sequence."""
         if not batch:
             batch = CommOnly
-        ana = batch.search(self)
+        ana = self.restriction_search(batch, linear=True)
         ncut = {enz: sitelist for (enz, sitelist) in ana.items() if not sitelist}
         return _RestrictionBatch(ncut)
 
@@ -1317,7 +1502,7 @@ class Dseq(_Seq):
         """Enzymes in a RestrictionBatch cutting n times."""
         if not batch:
             batch = CommOnly
-        ana = batch.search(self)
+        ana = self.restriction_search(batch, linear=True)
         ncut = {enz: sitelist for (enz, sitelist) in ana.items() if len(sitelist) == n}
         return _RestrictionBatch(ncut)
 
@@ -1325,18 +1510,22 @@ class Dseq(_Seq):
         """Enzymes in a RestrictionBatch cutting sequence at least once."""
         if not batch:
             batch = CommOnly
-        ana = batch.search(self)
+        ana = self.restriction_search(batch, linear=True)
         ncut = {enz: sitelist for (enz, sitelist) in ana.items() if sitelist}
         return _RestrictionBatch(ncut)
 
     def seguid(self):
         """SEGUID checksum for the sequence."""
+        return self._cached("seguid", self._seguid)
+
+    def _seguid(self):
+        watson, crick = self._upper()
         if self.circular:
-            cs = _cdseguid(self.watson.upper(), self.crick.upper(), alphabet="{DNA-extended}")
+            cs = _cdseguid(watson, crick, alphabet="{DNA-extended}")
         else:
             """docstring."""
-            w = f"{self.ovhg*'-'}{self.watson}{'-'*(-self.ovhg+len(self.crick)-len(self.watson))}".upper()
-            c = f"{'-'*(self.ovhg+len(self.watson)-len(self.crick))}{self.crick}{-self.ovhg*'-'}".upper()
+            w = f"{self.ovhg*'-'}{watson}{'-'*(-self.ovhg+len(crick)-len(watson))}"
+            c = f"{'-'*(self.ovhg+len(watson)-len(crick))}{crick}{-self.ovhg*'-'}"
             cs = _ldseguid(w, c, alphabet="{DNA-extended}")
         return cs
 
@@ -1458,6 +1647,91 @@ class Dseq(_Seq):
 
         assert cutsite is not None, "cutsite is None"
 
+        return bool(self.cutsites_are_valid([cutsite])[0])
+
+    def cutsites_are_valid(self, cutsites):
+        """Same as cutsite_is_valid for a list of cutsites.
+
+        Returns a numpy array of booleans, one for each cutsite. The double
+        stranded part of the sequence is given by left_end_position and
+        right_end_position, so the overhangs and recognition sites are checked
+        with integer arrays, without creating slices of the sequence.
+
+        Examples
+        --------
+        >>> from Bio.Restriction import EcoRI
+        >>> from pydna.dseq import Dseq
+        >>> seq = Dseq("GAATTCaaaGAATTCaa", "ttCTTAAGtttCTTAAG"[::-1], ovhg=2)
+        >>> seq
+        Dseq(-19)
+          GAATTCaaaGAATTCaa
+        ttCTTAAGtttCTTAAG
+        >>> seq.cutsites_are_valid([((1, -4), EcoRI), ((10, -4), EcoRI)]).tolist()
+        [False, True]
+        """
+        length = len(self)
+        count = len(cutsites)
+        watson = _np.fromiter((c[0][0] for c in cutsites), dtype=_np.int64, count=count)
+        ovhg = _np.fromiter((c[0][1] for c in cutsites), dtype=_np.int64, count=count)
+        fst5 = _np.fromiter((c[1].fst5 for c in cutsites), dtype=_np.int64, count=count)
+        size = _np.fromiter((c[1].size for c in cutsites), dtype=_np.int64, count=count)
+        # Only some enzymes cut twice, scd5 is None (or missing) for the others
+        scd5s = [getattr(c[1], "scd5", None) for c in cutsites]
+        cuts_twice = _np.fromiter((s is not None for s in scd5s), dtype=bool, count=count)
+        scd5 = _np.fromiter((s or 0 for s in scd5s), dtype=_np.int64, count=count)
+
+        def site_start(fst):
+            start = watson - fst
+            return _np.where(start < 0, start + length, start)
+
+        first_site = site_start(fst5)
+        second_site = site_start(scd5)
+
+        if self.circular:
+            # All positions are double stranded, a recognition site is only invalid
+            # if it starts after the end of the sequence
+            def site_is_valid(start):
+                return start <= length
+
+            valid = site_is_valid(first_site) | (cuts_twice & site_is_valid(second_site))
+        else:
+            ds_start = max(self.left_end_position())
+            ds_end = min(self.right_end_position())
+
+            def is_double_stranded(start, stop):
+                # Slices are clipped at the end of the sequence like Python slices
+                start = _np.minimum(start, length)
+                stop = _np.minimum(stop, length)
+                return (start >= ds_start) & (stop <= ds_end), stop <= start
+
+            def site_is_valid(start):
+                double_stranded, empty = is_double_stranded(start, start + size)
+                return double_stranded & ~empty
+
+            crick = watson - ovhg
+            # The overhang is the sequence between the cuts on the watson and crick strands
+            overhang_double_stranded, overhang_empty = is_double_stranded(
+                _np.minimum(watson, crick), _np.maximum(watson, crick)
+            )
+            valid = (
+                (crick >= 0)
+                & (crick <= length)
+                & (overhang_empty | overhang_double_stranded)
+                & (site_is_valid(first_site) | (cuts_twice & site_is_valid(second_site)))
+            )
+
+        # Negative positions would wrap around like negative indices of Python slices,
+        # these rare cases are checked by slicing the sequence.
+        unusual = (watson < 0) | (first_site < 0) | (cuts_twice & (second_site < 0))
+        if length == 0:
+            unusual[:] = True
+        for index in _np.flatnonzero(unusual):
+            valid[index] = self._cutsite_is_valid_by_slicing(cutsites[index])
+        return valid
+
+    def _cutsite_is_valid_by_slicing(self, cutsite):
+        """cutsite_is_valid by checking slices of the sequence (PRIVATE)."""
+
         enz = cutsite[1]
         watson, crick, ovhg = self.get_cut_parameters(cutsite, True)
 
@@ -1480,7 +1754,7 @@ class Dseq(_Seq):
             end_of_recognition_site %= len(self)
         recognition_site = self[start_of_recognition_site:end_of_recognition_site]
         if len(recognition_site) == 0 or recognition_site.ovhg != 0 or recognition_site.watson_ovhg() != 0:
-            if enz.scd5 is None:
+            if getattr(enz, "scd5", None) is None:
                 return False
             else:
                 # For enzymes that cut twice, this might be referring to the second one
@@ -1555,15 +1829,21 @@ class Dseq(_Seq):
             enzymes = [e for e in enzymes[0]]
 
         enzymes = _flatten(enzymes)
+        searches = self.restriction_search(set(e for e in enzymes if isinstance(e, _RestrictionType)))
         out = list()
         for e in enzymes:
             # Positions of the cut on the watson strand. They are 1-based, so we subtract
             # 1 to get 0-based positions
-            cuts_watson = [c - 1 for c in e.search(self, linear=(not self.circular))]
+            # Other objects than Biopython enzymes, such as pydna.crispr.cas9 implement
+            # their own search method
+            if isinstance(e, _RestrictionType):
+                cuts_watson = [c - 1 for c in searches[e]]
+            else:
+                cuts_watson = [c - 1 for c in e.search(self, linear=(not self.circular))]
 
             out += [((w, e.ovhg), e) for w in cuts_watson]
 
-        return sorted([cutsite for cutsite in out if self.cutsite_is_valid(cutsite)])
+        return sorted([cutsite for cutsite, valid in zip(out, self.cutsites_are_valid(out)) if valid])
 
     def left_end_position(self) -> Tuple[int, int]:
         """The index in the full sequence of the watson and crick start positions.
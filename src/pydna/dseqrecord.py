@@ -18,8 +18,11 @@ from pydna._pretty import pretty_str as _pretty_str
 from pydna.utils import flatten as _flatten, location_boundaries as _location_boundaries
 
 # from pydna.utils import memorize as _memorize
-from pydna.utils import rc as _rc
-from pydna.utils import shift_location as _shift_location
+from pydna.feature_store import FeatureStore as _FeatureStore
+from pydna.feature_index import FeatureIndex as _FeatureIndex
+from pydna.sync import Synchronizer as _Synchronizer
+from pydna.tracemap import map_traces as _map_traces
+from pydna.utils import circular_find as _circular_find
 from pydna.utils import shift_feature as _shift_feature
 from pydna.common_sub_strings import common_sub_strings as _common_sub_strings
 from Bio.SeqFeature import SeqFeature as _SeqFeature
@@ -35,6 +38,7 @@ import os as _os
 import re as _re
 import time as _time
 import datetime as _datetime
+import numpy as _np
 
 
 import logging as _logging
@@ -50,6 +54,17 @@ except ImportError:
         return item
 
 
+def _inside(location, length, empty):
+    """The location if it does not span the origin of a sequence of the given length, else None (PRIVATE).
+
+    Locations of length 0 are only kept if empty is True.
+    """
+    start, end = _location_boundaries(location)
+    if end <= length and (start < end or empty and start == end):
+        return location
+    return None
+
+
 class Dseqrecord(_SeqRecord):
     """Dseqrecord is a double stranded version of the Biopython SeqRecord [#]_ class.
     The Dseqrecord object holds a Dseq object describing the sequence.
@@ -127,6 +142,9 @@ class Dseqrecord(_SeqRecord):
 
     """
 
+    # Feature indices are rebuilt when needed and kept out of __dict__
+    __slots__ = ("_feature_indices",)
+
     def __init__(
         self,
         record,
@@ -225,10 +243,8 @@ class Dseqrecord(_SeqRecord):
         # linear=True, circular=False, n = 5E-14, **kwargs):
         obj = cls.__new__(cls)  # Does not call __init__
         obj._per_letter_annotations = {}
-        obj.seq = _Dseq.quick(
+        obj.seq = _Dseq.from_string(
             record,
-            _rc(record),
-            ovhg=0,
             # linear=linear,
             circular=circular,
         )
@@ -255,10 +271,8 @@ class Dseqrecord(_SeqRecord):
     ):
         obj = cls.__new__(cls)  # Does not call __init__
         obj._per_letter_annotations = record._per_letter_annotations
-        obj.seq = _Dseq.quick(
+        obj.seq = _Dseq.from_string(
             str(record.seq),
-            _rc(str(record.seq)),
-            ovhg=0,
             # linear=linear,
             circular=circular,
         )
@@ -285,6 +299,87 @@ class Dseqrecord(_SeqRecord):
         Use :meth:`looped`"""
         return self.seq.circular
 
+    @property
+    def features(self):
+        """List of SeqFeature objects.
+
+        Records made by shifting, slicing, cutting or joining other records
+        share the features of those until the list is used for the first
+        time, see :mod:`pydna.feature_store`.
+        """
+        return self._load_features()
+
+    @features.setter
+    def features(self, value):
+        self.__dict__["features"] = value
+        self._feature_indices = None
+
+    def _load_features(self):
+        """Replace a FeatureStore with the list of its features, returns the list (PRIVATE)."""
+        features = self.__dict__["features"]
+        if isinstance(features, _FeatureStore):
+            features = self.__dict__["features"] = features.features()
+        return features
+
+    def _feature_store(self):
+        """The features as a FeatureStore (PRIVATE)."""
+        features = self.__dict__["features"]
+        if isinstance(features, _FeatureStore):
+            return features
+        return _FeatureStore(features)
+
+    def _feature_index(self, circular):
+        """FeatureIndex of the feature locations, see :mod:`pydna.feature_index` (PRIVATE).
+
+        The index is kept until the length of the sequence changes or a
+        feature gets another location object, which is checked by identity
+        as the locations are not compared. Returns None if the features are
+        held in a FeatureStore, to avoid copying them.
+        """
+        features = self.__dict__["features"]
+        if isinstance(features, _FeatureStore):
+            return None
+        indices = getattr(self, "_feature_indices", None)
+        if indices is None:
+            indices = self._feature_indices = {}
+        index = indices.get(circular)
+        if (
+            index is None
+            or index.length != len(self)
+            or len(index) != len(features)
+            or not all(map(_operator.is_, index.locations, (f.location for f in features)))
+        ):
+            index = indices[circular] = _FeatureIndex((f.location for f in features), len(self), circular)
+        return index
+
+    def _overlapping_features(self, start, stop, circular=False):
+        """FeatureStore with the features that can overlap start:stop, in order (PRIVATE).
+
+        Features with unknown positions are included.
+        """
+        index = self._feature_index(circular)
+        if index is None:
+            return self._feature_store()
+        features = self.__dict__["features"]
+        ids = _np.union1d(index.overlapping(start, stop), index.unindexed)
+        return _FeatureStore([features[i] for i in ids])
+
+    def __getstate__(self):
+        return self.__dict__.copy()
+
+    def _derived(self, seq, features):
+        """Deep copy of the record with a new sequence and a FeatureStore (PRIVATE).
+
+        The sequence and features of the record are not copied.
+        """
+        answer = _copy.copy(self)
+        for key, value in self.__dict__.items():
+            if key not in ("_seq", "features"):
+                setattr(answer, key, _copy.deepcopy(value))
+        answer.seq = seq
+        answer.features = features
+        return answer
+
     def m(self):
         """This method returns the mass of the DNA molecule in grams. This is
         calculated as the product between the molecular weight of the Dseq object
@@ -630,13 +725,12 @@ class Dseqrecord(_SeqRecord):
         # TODO check for linearity of other, raise exception if not
         # TODO add tests and docstring for this method
         o = str(other.seq).upper()
+        s = str(self.seq).upper()
 
         if not self.circular:
-            s = str(self.seq).upper()
-        else:
-            # allow wrapping around origin
-            s = str(self.seq).upper() + str(self.seq).upper()[: len(other) - 1]
-        return s.find(o)
+            return s.find(o)
+        # allow wrapping around origin
+        return _circular_find(s, o, 0, len(s) + len(o) - 1)
 
     def __str__(self):
         return ("Dseqrecord\n" "circular: {}\n" "size: {}\n").format(self.circular, len(self)) + _SeqRecord.__str__(
@@ -779,30 +873,109 @@ class Dseqrecord(_SeqRecord):
 
         return [x.annotations["filename"] for x in matching_reads]
 
+    def map_traces(self, traces, limit=25, workers=None, add_features=False):
+        """Map Sanger sequencing traces to this sequence, see :mod:`pydna.tracemap`.
+
+        Parameters
+        ----------
+        traces : str or iterable
+            A glob pattern, or file names of ABI files or SeqRecords.
+        limit : int, optional
+            Length of the exact matches used to find the position of a trace.
+        workers : int, optional
+            Number of processes reading ABI files, one per CPU by default.
+        add_features : bool, optional
+            Add a "trace" feature for each mapped trace.
+
+        Returns
+        -------
+        list of pydna.tracemap.TraceMatch
+            Use :func:`pydna.tracemap.trace_table` for a table of the matches.
+        """
+        matches = list(_map_traces(self, traces, k=limit, workers=workers))
+        if add_features:
+            for match in matches:
+                if match.location is not None:
+                    self.features.append(
+                        _SeqFeature(match.location, qualifiers={"label": [match.read]}, type="trace")
+                    )
+        return matches
+
     def __repr__(self):
         return "Dseqrecord({}{})".format({True: "-", False: "o"}[not self.circular], len(self))
 
     def _repr_pretty_(self, p, cycle):
         p.text("Dseqrecord({}{})".format({True: "-", False: "o"}[not self.circular], len(self)))
 
+    @classmethod
+    def join(cls, records):
+        """Ligate several Dseqrecords in one step.
+
+        The result is the same as adding the records one by one with +, but
+        the sequence is ligated with :meth:`pydna.dseq.Dseq.join` and the
+        features of each record are shifted once to their position in the
+        product, without copying the records. Objects that are not
+        Dseqrecords are converted with Dseqrecord().
+
+        Examples
+        --------
+        >>> from Bio.Restriction import EcoRI
+        >>> from pydna.dseqrecord import Dseqrecord
+        >>> a = Dseqrecord("aaaGAATTCccc")
+        >>> a.add_feature(0, 3)
+        >>> a.add_feature(9, 12)
+        >>> b, c = a.cut(EcoRI)
+        >>> product = Dseqrecord.join([b, c])
+        >>> product.seq == a.seq
+        True
+        >>> [(int(f.location.start), int(f.location.end)) for f in product.features]
+        [(0, 3), (9, 12)]
+        """
+        records = [r if hasattr(r, "seq") and hasattr(r.seq, "watson") else Dseqrecord(r) for r in records]
+        if not records:
+            return cls("")
+        seq = _Dseq.join(record.seq for record in records)
+        first = records[0]
+        answer = cls(seq, dbxrefs=first.dbxrefs[:])
+        features = [first._feature_store()]
+        default_id, default_name, default_description = answer.id, answer.name, answer.description
+        default_annotations = dict(answer.annotations)
+        id, name, description = first.id, first.name, first.description
+        annotations = first.annotations
+        # length of the product of the records ligated so far
+        length = len(first.seq)
+        for record in records[1:]:
+            # Features are shifted like in SeqRecord.__add__, corrected for the
+            # overlapping sticky ends
+            end_type, tail = record.seq.five_prime_end()
+            shift = length
+            if end_type == "5'":
+                shift += record.seq.ovhg
+            elif end_type == "3'":
+                shift -= record.seq.ovhg
+            if not length:
+                shift = 0
+            features.append(record._feature_store().shifted(shift))
+            length = shift + len(record.seq) if len(record.seq) else length
+            answer.dbxrefs.extend(ref for ref in record.dbxrefs if ref not in answer.dbxrefs)
+            id = id if id == record.id else default_id
+            name = name if name == record.name else default_name
+            description = description if description == record.description else default_description
+            annotations = dict(
+                default_annotations,
+                **{k: v for k, v in annotations.items() if k in record.annotations and record.annotations[k] == v},
+            )
+        answer.id, answer.name, answer.description = id, name, description
+        answer.annotations = annotations
+        answer.features = _FeatureStore.concatenate(features)
+        answer.n = min(record.n for record in records)
+        return answer
+
     def __add__(self, other):
         if hasattr(other, "seq") and hasattr(other.seq, "watson"):
-            other = _copy.deepcopy(other)
-            other_five_prime = other.seq.five_prime_end()
-            if other_five_prime[0] == "5'":
-                # add other.seq.ovhg
-                for f in other.features:
-                    f.location = f.location + other.seq.ovhg
-            elif other_five_prime[0] == "3'":
-                # subtract other.seq.ovhg (sign change)
-                for f in other.features:
-                    f.location = f.location + (-other.seq.ovhg)
-
-            answer = Dseqrecord(_SeqRecord.__add__(self, other))
-            answer.n = min(self.n, other.n)
-        else:
-            answer = Dseqrecord(_SeqRecord.__add__(self, Dseqrecord(other)))
-            answer.n = self.n
+            return Dseqrecord.join((self, other))
+        answer = Dseqrecord.join((self, Dseqrecord(other)))
+        answer.n = self.n
         return answer
 
     def __mul__(self, number):
@@ -811,16 +984,18 @@ class Dseqrecord(_SeqRecord):
         if self.circular:
             raise TypeError("TypeError: can't multiply circular Dseqrecord.")
         if number > 0:
-            new = _copy.copy(self)
-            for i in range(1, number):
-                new += self
-            return new
+            if number == 1:
+                return _copy.copy(self)
+            return Dseqrecord.join([self] * number)
         else:
             return self.__class__("")
 
     def __getitem__(self, sl):
         """docstring."""
-        answer = Dseqrecord(_copy.copy(self))
+        record = _copy.copy(self)
+        # The features are replaced below
+        record.features = []
+        answer = Dseqrecord(record)
         answer.seq = self.seq.__getitem__(sl)
         # answer.seq.alphabet = self.seq.alphabet
         # breakpoint()
@@ -832,20 +1007,19 @@ class Dseqrecord(_SeqRecord):
             # related to https://github.com/BjornFJohansson/pydna/issues/161
             if self.circular and sl.stop == 0:
                 sl = slice(sl.start, len(self.seq), sl.step)
-            answer.features = super().__getitem__(sl).features
+            start, stop, step = sl.indices(len(self.seq))
+            if step == 1:
+                answer.features = self._overlapping_features(start, stop).window(start, stop)
+            else:
+                answer.features = []
         elif self.circular and sl_start > sl_stop:
-            answer.features = self.shifted(sl_start).features
             # origin-spanning features should only be included after shifting
             # in cases where the slice comprises the entire sequence, but then
             # sl_start == sl_stop and the second condition is not met
-            answer.features = [
-                f
-                for f in answer.features
-                if (
-                    _location_boundaries(f.location)[1] <= answer.seq.length
-                    and _location_boundaries(f.location)[0] < _location_boundaries(f.location)[1]
-                )
-            ]
+            features = None
+            if 0 <= sl_stop < sl_start <= len(self):
+                features = self._overlapping_features(sl_start, sl_stop, circular=True)
+            answer.features = self._shifted_features(sl_start, features).transformed(_inside, answer.seq.length, False)
 
         elif self.circular and sl_start == sl_stop:
             cut = ((sl_start, 0), None)
@@ -863,9 +1037,30 @@ class Dseqrecord(_SeqRecord):
         answer.name = _identifier_from_string("part_{name}".format(name=self.name))[:16]
         return answer
 
+    def _identity(self):
+        """Content derived identity, the SEGUID and topology of the sequence (PRIVATE).
+
+        The identity is cached by the Dseq object, which drops it when the
+        strands, overhang or topology are set.
+        """
+        return self.seq._cached("identity", lambda: (self.seq.seguid(), self.seq.circular))
+
+    def _known_identity(self):
+        """The identity if it was computed before, else None (PRIVATE)."""
+        return (getattr(self.seq, "_cache", None) or {}).get("identity")
+
     def __eq__(self, other):
         """docstring."""
+        if self is other:
+            return True
         try:
+            # Records used as dict keys or graph nodes have known identities
+            identity, other_identity = self._known_identity(), other._known_identity()
+            if identity and other_identity and identity != other_identity:
+                return False
+            # features are compared as a list
+            self._load_features()
+            other._load_features()
             if self.seq == other.seq and str(self.__dict__) == str(other.__dict__):
                 return True
         except AttributeError:
@@ -877,8 +1072,12 @@ class Dseqrecord(_SeqRecord):
         return not self.__eq__(other)
 
     def __hash__(self):
-        """__hash__ must be based on __eq__."""
-        return hash((str(self.seq).lower(), str(tuple(sorted(self.__dict__.items())))))
+        """__hash__ must be based on __eq__.
+
+        Equal records have the same sequence and topology, so the hash is
+        computed from the cached identity of the sequence only.
+        """
+        return hash(self._identity())
 
     def linearize(self, *enzymes):
         """Similar to :func:`cut.
@@ -925,7 +1124,9 @@ class Dseqrecord(_SeqRecord):
     def number_of_cuts(self, *enzymes):
         """The number of cuts by digestion with the Restriction enzymes
         contained in the iterable."""
-        return sum([len(enzyme.search(self.seq)) for enzyme in _flatten(enzymes)])
+        enzymes = _flatten(enzymes)
+        sites = self.seq.restriction_search(set(enzymes), linear=True)
+        return sum([len(sites[enzyme]) for enzyme in enzymes])
 
     def cas9(self, RNA: str):
         """docstring."""
@@ -960,7 +1161,8 @@ class Dseqrecord(_SeqRecord):
         pydna.dseq.Dseq.reverse_complement
 
         """
-        answer = type(self)(super().reverse_complement())
+        answer = type(self)(super().reverse_complement(features=False))
+        answer.features = self._feature_store().flipped(len(self)).sorted()
         answer.name = "{}_rc".format(self.name[:13])
         answer.description = self.description + "_rc"
         answer.id = self.id + "_rc"
@@ -1008,54 +1210,7 @@ class Dseqrecord(_SeqRecord):
 
         """
 
-        if not self.circular:
-            raise TypeError("Only circular DNA can be synced!")
-
-        newseq = _copy.copy(self)
-
-        s = str(self.seq.watson).lower()
-        s_rc = str(self.seq.crick).lower()
-
-        if hasattr(ref, "seq"):
-            r = ref.seq
-            if hasattr(r, "watson"):
-                r = str(r.watson).lower()
-            else:
-                r = str(r).lower()
-        else:
-            r = str(ref.lower())
-
-        lim = min(limit, limit * (len(s) // limit) + 1)
-
-        c = _common_sub_strings(s + s, r, limit=lim)
-        d = _common_sub_strings(s_rc + s_rc, r, limit=lim)
-
-        c = [(x[0], x[2]) for x in c if x[1] == 0]
-        d = [(x[0], x[2]) for x in d if x[1] == 0]
-
-        if not c and not d:
-            raise TypeError("There is no overlap between sequences!")
-
-        if c:
-            start, length = c.pop(0)
-        else:
-            start, length = 0, 0
-
-        if d:
-            start_rc, length_rc = d.pop(0)
-        else:
-            start_rc, length_rc = 0, 0
-
-        if length_rc > length:
-            start = start_rc
-            newseq = newseq.rc()
-
-        if start == 0:
-            result = newseq
-        else:
-            result = newseq.shifted(start)
-        _module_logger.info("synced")
-        return result
+        return _Synchronizer(ref, limit)(self)
 
     def upper(self):
         """Returns an uppercase copy.
@@ -1118,9 +1273,9 @@ class Dseqrecord(_SeqRecord):
         lower.seq = lower.seq.lower()
         return lower
 
-    def orfs(self, minsize=30):
-        """docstring."""
-        return tuple(Dseqrecord(s) for s in self.seq.orfs(minsize=minsize))
+    def orfs(self, minsize=30, all_starts=False):
+        """Open reading frames on the forward strand, see :meth:`pydna.seq.Seq.orfs`."""
+        return tuple(Dseqrecord(s) for s in self.seq.orfs(minsize=minsize, all_starts=all_starts))
 
     def _copy_to_clipboard(self, sequence_format):
         """docstring."""
@@ -1231,14 +1386,18 @@ class Dseqrecord(_SeqRecord):
         else:
             shift %= ln  # 0<=shift<=ln
         newseq = (self.seq[shift:] + self.seq[:shift]).looped()
-        newfeatures = _copy.deepcopy(self.features)
-        for feature in newfeatures:
-            feature.location = _shift_location(feature.location, -shift, ln)
-        newfeatures.sort(key=_operator.attrgetter("location.start"))
-        answer = _copy.deepcopy(self)
-        answer.features = newfeatures
-        answer.seq = newseq
-        return answer
+        return self._derived(newseq, self._shifted_features(shift))
+
+    def _shifted_features(self, shift, features=None):
+        """FeatureStore with the features of the record shifted like in :meth:`shifted` (PRIVATE).
+
+        Only the features in the FeatureStore features are shifted, if given.
+        """
+        ln = len(self)
+        features = self._feature_store() if features is None else features
+        if not shift % ln:
+            return features
+        return features.shifted(-(shift % ln), ln).sorted()
 
     def cut(self, *enzymes):
         """Digest a Dseqrecord object with one or more restriction enzymes.
@@ -1289,7 +1448,7 @@ class Dseqrecord(_SeqRecord):
         if left_cut == right_cut:
             # Not really a cut, but to handle the general case
             if left_cut is None:
-                features = _copy.deepcopy(self.features)
+                features = self._feature_store()
             else:
                 # The features that span the origin if shifting with left_cut, but that do not cross
                 # the cut site should be included, and if there is a feature within the cut site, it should
@@ -1308,7 +1467,7 @@ class Dseqrecord(_SeqRecord):
                 #
                 left_watson, left_crick, left_ovhg = self.seq.get_cut_parameters(left_cut, True)
                 initial_shift = left_watson if left_ovhg < 0 else left_crick
-                features = self.shifted(initial_shift).features
+                features = self._shifted_features(initial_shift).features()
                 # for f in features:
                 #     print(f.id, f.location, _location_boundaries(f.location))
                 # Here, we have done what's shown below (* indicates the origin).
@@ -1346,23 +1505,18 @@ class Dseqrecord(_SeqRecord):
                 # length of the final product.
                 # print(*features, sep='\n')
                 # Features like 3 are removed here
-                features = [
-                    f
-                    for f in features
-                    if (
-                        _location_boundaries(f.location)[1] <= len(dseq)
-                        and _location_boundaries(f.location)[0] <= _location_boundaries(f.location)[1]
-                    )
-                ]
+                features = [f for f in features if _inside(f.location, len(dseq), True)]
         else:
             left_watson, left_crick, left_ovhg = self.seq.get_cut_parameters(left_cut, True)
             right_watson, right_crick, right_ovhg = self.seq.get_cut_parameters(right_cut, False)
 
             left_edge = left_crick if left_ovhg > 0 else left_watson
             right_edge = right_watson if right_ovhg > 0 else right_crick
-            features = self[left_edge:right_edge].features
+            features = self[left_edge:right_edge]._feature_store()
 
-        return Dseqrecord(dseq, features=features)
+        answer = Dseqrecord(dseq)
+        answer.features = features
+        return answer
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Interval index over feature locations.
+
+Finding the features inside, overlapping or spanning a region of a sequence
+by comparing every location takes time proportional to the number of
+features. The :class:`FeatureIndex` keeps the start and end positions of the
+locations in sorted numpy arrays, so that these queries take logarithmic
+time plus the time to report the results.
+
+The locations are divided into groups of similar length (a factor of two
+between the shortest and the longest), so that long features such as the
+source feature of a GenBank record do not slow down queries for short ones.
+
+On circular sequences, locations spanning the origin and regions that wrap
+around the origin (stop smaller than start) are supported.
+
+>>> from Bio.SeqFeature import SimpleLocation, CompoundLocation
+>>> from pydna.feature_index import FeatureIndex
+>>> locations = [SimpleLocation(0, 100), SimpleLocation(10, 20), SimpleLocation(15, 40),
+...              CompoundLocation([SimpleLocation(90, 100), SimpleLocation(0, 5)])]
+>>> index = FeatureIndex(locations, 100, circular=True)
+>>> index.inside(10, 40)
+array([1, 2])
+>>> index.overlapping(18, 30)
+array([0, 1, 2])
+>>> index.spanning(12, 18)
+array([0, 1])
+>>> index.inside(80, 10)
+array([3])
+"""
+
+import numpy as _np
+
+from pydna.utils import location_boundaries as _location_boundaries
+
+
+class FeatureIndex:
+    """Sorted start and end positions of a list of feature locations.
+
+    Queries return sorted numpy arrays of indices into the list of
+    locations. Locations with unknown positions are not indexed, their
+    indices are in the unindexed attribute.
+
+    Parameters
+    ----------
+    locations : iterable of Bio.SeqFeature.Location
+    length : int, optional
+        Length of the sequence, needed for circular sequences.
+    circular : bool, optional
+        If True, locations like [90:100]+[0:5] span the origin.
+
+    Attributes
+    ----------
+    locations : list
+    length : int or None
+    circular : bool
+    unindexed : numpy.ndarray
+    """
+
+    def __init__(self, locations, length=None, circular=False):
+        self.locations = list(locations)
+        self.length = length
+        self.circular = circular
+        ids, starts, ends, unindexed = [], [], [], []
+        for i, location in enumerate(self.locations):
+            try:
+                start, end = int(location.start), int(location.end)
+                if circular and len(location.parts) > 1:
+                    first, last = _location_boundaries(location)
+                    if len(location) and int(last) <= int(first):
+                        # The location spans the origin
+                        start, end = int(first), int(last) + length
+            except (AttributeError, TypeError, ValueError):
+                unindexed.append(i)
+                continue
+            ids.append(i)
+            starts.append(start)
+            ends.append(end)
+        self.unindexed = _np.array(unindexed, dtype=_np.int64)
+
+        ids = _np.array(ids, dtype=_np.int64)
+        starts = _np.array(starts, dtype=_np.int64)
+        ends = _np.array(ends, dtype=_np.int64)
+        if circular and length:
+            # Copies one turn before and after, for regions near and across the origin
+            ids = _np.tile(ids, 3)
+            starts = _np.concatenate((starts - length, starts, starts + length))
+            ends = _np.concatenate((ends - length, ends, ends + length))
+
+        # Groups of locations with lengths from 2**n to 2**(n+1) - 1
+        groups = _np.frexp(_np.maximum(ends - starts, 1))[1]
+        self._groups = []
+        for group in _np.unique(groups):
+            members = groups == group
+            order = _np.argsort(starts[members], kind="stable")
+            group_starts = starts[members][order]
+            group_ends = ends[members][order]
+            longest = int((group_ends - group_starts).max())
+            self._groups.append((group_starts, group_ends, ids[members][order], longest))
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __repr__(self):
+        return f"FeatureIndex({len(self)} locations)"
+
+    def _region(self, start, stop):
+        """Start and stop of a region, unwrapped if it spans the origin (PRIVATE)."""
+        if self.circular and stop < start:
+            stop += self.length
+        return start, stop
+
+    @staticmethod
+    def _result(found):
+        return _np.unique(_np.concatenate(found)) if found else _np.zeros(0, dtype=_np.int64)
+
+    def inside(self, start, stop):
+        """Indices of the locations inside start:stop."""
+        start, stop = self._region(start, stop)
+        found = []
+        for starts, ends, ids, longest in self._groups:
+            lo = _np.searchsorted(starts, start, "left")
+            hi = _np.searchsorted(starts, stop, "right")
+            found.append(ids[lo:hi][ends[lo:hi] <= stop])
+        return self._result(found)
+
+    def overlapping(self, start, stop):
+        """Indices of the locations that overlap or touch start:stop."""
+        start, stop = self._region(start, stop)
+        found = []
+        for starts, ends, ids, longest in self._groups:
+            lo = _np.searchsorted(starts, start - longest, "left")
+            hi = _np.searchsorted(starts, stop, "right")
+            found.append(ids[lo:hi][ends[lo:hi] >= start])
+        return self._result(found)
+
+    def spanning(self, start, stop):
+        """Indices of the locations that include all of start:stop."""
+        start, stop = self._region(start, stop)
+        found = []
+        for starts, ends, ids, longest in self._groups:
+            lo = _np.searchsorted(starts, stop - longest, "left")
+            hi = _np.searchsorted(starts, start, "right")
+            found.append(ids[lo:hi][ends[lo:hi] >= stop])
+        return self._result(found)
+
+
+if __name__ == "__main__":
+    import os as _os
+
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Features shared between Dseqrecord objects.
+
+Shifting the origin, slicing, reverse complementing or joining Dseqrecords
+makes new records with the features of the old ones at new locations.
+Instead of transforming all features for each operation, the new record
+gets a FeatureStore that keeps the features and the list of location
+transforms to apply. The transforms are applied when the features of the
+new record are used for the first time, and only if they are used.
+
+A store keeps its own copies of the features, made with
+:func:`pydna.utils.copy_feature` when the store is made. The qualifiers are
+copied and the locations, which are replaced rather than changed, are
+shared. Changes to the features of a record after a new record was derived
+from it do not show up in the new record.
+
+>>> from Bio.SeqFeature import SeqFeature, SimpleLocation
+>>> from pydna.feature_store import FeatureStore
+>>> store = FeatureStore([SeqFeature(SimpleLocation(2, 5), type="misc")])
+>>> store = store.shifted(3).window(4, 10)
+>>> store
+FeatureStore(1 features, 2 transforms)
+>>> [f.location for f in store.features()]
+[SimpleLocation(ExactPosition(1), ExactPosition(4))]
+"""
+
+import warnings as _warnings
+
+from pydna.utils import copy_feature as _copy_feature
+from pydna.utils import shift_location as _shift_location
+
+
+def _shift(location, shift, length=None):
+    """Location shifted on a linear (length None) or circular sequence (PRIVATE)."""
+    if length is None:
+        return location._shift(shift)
+    return _shift_location(location, shift, length)
+
+
+def _flip(location, length):
+    """Location on the reverse complement of a sequence of the given length (PRIVATE)."""
+    return location._flip(length)
+
+
+def _window(location, start, stop):
+    """Location relative to start, or None if outside start:stop (PRIVATE).
+
+    Same rules as for slicing a Bio.SeqRecord.SeqRecord.
+    """
+    if location.ref or location.ref_db:
+        _warnings.warn(
+            "When slicing SeqRecord objects, any "
+            "SeqFeature referencing other sequences (e.g. "
+            "from segmented GenBank records) are ignored."
+        )
+        return None
+    try:
+        if start <= location.start and location.end <= stop:
+            return location._shift(-start) if start else location
+    except TypeError:
+        # Will fail on UnknownPosition
+        pass
+    return None
+
+
+class FeatureStore:
+    """An immutable sequence of features with location transforms applied on demand.
+
+    A store holds either a sequence of SeqFeatures or other stores, the
+    features of which are concatenated, and a tuple of transforms. Each
+    transform is a function and arguments. The function is called as
+    function(location, *args) and returns a new location or None, in which
+    case the feature is dropped. A transform with function None sorts the
+    features by start position.
+
+    Parameters
+    ----------
+    features : iterable of Bio.SeqFeature.SeqFeature, optional
+        The store keeps copies of these, see the module docstring.
+    """
+
+    __slots__ = ("_sources", "_features", "_transforms")
+
+    def __init__(self, features=()):
+        self._sources = ()
+        self._features = tuple(_copy_feature(feature) for feature in features)
+        self._transforms = ()
+
+    @classmethod
+    def _new(cls, features, sources, transforms):
+        store = cls.__new__(cls)
+        store._features = features
+        store._sources = sources
+        store._transforms = transforms
+        return store
+
+    @classmethod
+    def concatenate(cls, stores):
+        """A store with the features of all stores, in order."""
+        sources = []
+        for store in stores:
+            store._share()
+            if store._transforms:
+                sources.append(store)
+            elif store._sources:
+                sources.extend(store._sources)
+            elif not store._empty():
+                sources.append(store)
+        if len(sources) == 1:
+            return sources[0]
+        return cls._new((), tuple(sources), ())
+
+    def _empty(self):
+        """True if the store has no features (PRIVATE)."""
+        return not self._features and not self._sources
+
+    def _share(self):
+        """Called when another store refers to this one (PRIVATE)."""
+
+    def transformed(self, function, *args):
+        """A new store with one more transform, see the class docstring."""
+        if self._empty():
+            return self
+        return self._new(self._features, self._sources, self._transforms + ((function, args),))
+
+    def shifted(self, shift, length=None):
+        """Locations shifted by shift, wrapping around the origin if length is given."""
+        if not shift:
+            return self
+        return self.transformed(_shift, shift, length)
+
+    def flipped(self, length):
+        """Locations on the reverse complement of a sequence with the given length."""
+        return self.transformed(_flip, length)
+
+    def window(self, start, stop):
+        """Features inside start:stop, with locations relative to start."""
+        return self.transformed(_window, start, stop)
+
+    def sorted(self):
+        """Features sorted by start position."""
+        return self.transformed(None)
+
+    def _items(self):
+        """List of (feature, location) pairs with all transforms applied (PRIVATE)."""
+        if self._sources:
+            items = [item for source in self._sources for item in source._items()]
+        else:
+            items = [(feature, feature.location) for feature in self._features]
+        for function, args in self._transforms:
+            if function is None:
+                items.sort(key=lambda item: item[1].start)
+                continue
+            transformed = []
+            for feature, location in items:
+                location = function(location, *args)
+                if location is not None:
+                    transformed.append((feature, location))
+            items = transformed
+        return items
+
+    def features(self):
+        """A new list of copies of the features at their transformed locations."""
+        return [_copy_feature(feature, location) for feature, location in self._items()]
+
+    def __repr__(self):
+        stores = [self]
+        features = transforms = 0
+        while stores:
+            store = stores.pop()
+            features += len(store._features)
+            transforms += len(store._transforms)
+            stores.extend(store._sources)
+        return f"FeatureStore({features} features, {transforms} transforms)"
+
+
+class LazyFeatureStore(FeatureStore):
+    """A FeatureStore with features that are made when they are first used.
+
+    The features are the list returned by function(*args), which is only
+    called if the features are needed. Transforms are kept in new stores
+    that refer to this one, as for other stores. The features are not
+    copied, unless another store refers to this one.
+
+    >>> from Bio.SeqFeature import SeqFeature, SimpleLocation
+    >>> from pydna.feature_store import LazyFeatureStore
+    >>> store = LazyFeatureStore(lambda n: [SeqFeature(SimpleLocation(0, n))], 3)
+    >>> store
+    LazyFeatureStore(not loaded)
+    >>> [f.location for f in store.shifted(2).features()]
+    [SimpleLocation(ExactPosition(2), ExactPosition(5))]
+    """
+
+    __slots__ = ("_function", "_args", "_shared")
+
+    def __init__(self, function, *args):
+        super().__init__()
+        self._function = function
+        self._args = args
+        self._shared = False
+
+    def _load(self):
+        """Make the features, if not made already (PRIVATE)."""
+        if self._function is not None:
+            self._features = tuple(self._function(*self._args))
+            self._function = self._args = None
+
+    def _empty(self):
+        return self._function is None and not self._features
+
+    def _share(self):
+        self._shared = True
+
+    def transformed(self, function, *args):
+        if self._empty():
+            return self
+        self._share()
+        return FeatureStore._new((), (self,), ((function, args),))
+
+    def _items(self):
+        self._load()
+        return super()._items()
+
+    def features(self):
+        """A new list of the features, which are copied if another store refers to this one."""
+        self._load()
+        if self._shared:
+            return [_copy_feature(feature) for feature in self._features]
+        return list(self._features)
+
+    def __repr__(self):
+        if self._function is not None:
+            return "LazyFeatureStore(not loaded)"
+        return f"LazyFeatureStore({len(self._features)} features)"
+
+
+if __name__ == "__main__":
+    import os as _os
+
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
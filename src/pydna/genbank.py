@@ -9,19 +9,111 @@ called Genbank and an function that does the same thing called genbank.
 
 The function can be used if the environmental variable **pydna_email** has
 been set to a valid email address. The easiest way to do this permanantly is to edit the
-`pydna.ini` file. See the documentation of :func:`pydna.open_config_folder`"""
+`pydna.ini` file. See the documentation of :func:`pydna.open_config_folder`
 
-from pydna.utils import memorize as _memorize
+Many records can be downloaded at once with :meth:`Genbank.nucleotides`, which
+sends several accessions in each request and several requests in parallel, without
+exceeding the number of requests per second allowed by NCBI.
+
+Cached records are stored once per accession and interval. Requests for a
+region of a record, or for the antisense strand, are answered from a cached
+record that covers the region, without a download."""
+
+from pydna.utils import _memorize_key
+from pydna.utils import _memorize_cache
+from pydna.utils import trim_feature as _trim_feature
 from pydna.genbankrecord import GenbankRecord as _GenbankRecord
 from pydna.readers import read as _read
 
 from Bio import Entrez as _Entrez
+from collections import Counter as _Counter
+from concurrent.futures import ThreadPoolExecutor as _ThreadPoolExecutor
+from urllib.error import HTTPError as _HTTPError
+from urllib.parse import urlencode as _urlencode
+from urllib.parse import urlsplit as _urlsplit
+import http.client as _http_client
+import threading as _threading
+import time as _time
 import re as _re
 import os as _os
 import logging as _logging
 
 _module_logger = _logging.getLogger("pydna." + __name__)
 
+# E-utilities base URL used by Genbank.nucleotides
+endpoint = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+# attempts for each request and seconds before the first new attempt, doubled for each attempt
+max_tries = 3
+sleep_between_tries = 1.0
+# seconds to wait for a response
+timeout = 60.0
+# responses that are worth a new attempt
+_retry_status = {429, 500, 502, 503, 504}
+# name of Genbank.nucleotide in pydna_cached_funcs
+_cached_name = "pydna.genbank.Genbank.nucleotide"
+
+_connections = _threading.local()
+
+
+class _RateLimiter(object):
+    """Spread requests from all threads evenly in time (PRIVATE)."""
+
+    def __init__(self):
+        self._lock = _threading.Lock()
+        self._next = 0.0
+
+    def wait(self, rate):
+        with self._lock:
+            now = _time.monotonic()
+            start = max(now, self._next)
+            self._next = start + 1.0 / rate
+        if start > now:
+            _time.sleep(start - now)
+
+
+_rate_limiter = _RateLimiter()
+
+
+def _post(url, params):
+    """POST params to url with a connection kept open by this thread,
+    returns the status, headers and body of the response (PRIVATE)."""
+    parts = _urlsplit(url)
+    connections = _connections.__dict__.setdefault("connections", {})
+    key = (parts.scheme, parts.netloc)
+    connection = connections.get(key)
+    if connection is None:
+        Connection = _http_client.HTTPSConnection if parts.scheme == "https" else _http_client.HTTPConnection
+        connection = connections[key] = Connection(parts.netloc, timeout=timeout)
+    try:
+        connection.request(
+            "POST",
+            parts.path or "/",
+            body=_urlencode(params),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        response = connection.getresponse()
+        body = response.read()
+    except Exception:
+        connection.close()
+        del connections[key]
+        raise
+    if response.will_close:
+        connection.close()
+        del connections[key]
+    return response.status, response.headers, body
+
+
+def _split_records(text):
+    """Split concatenated Genbank records (PRIVATE)."""
+    return [chunk + "//\n" for chunk in _re.split(r"^//[ \t]*(?:\n|$)", text, flags=_re.M) if chunk.strip()]
+
+
+def _identifiers(record):
+    """Version and accession of a Genbank record in text form (PRIVATE)."""
+    version = _re.search(r"^VERSION\s+(\S+)", record, _re.M)
+    accession = _re.search(r"^ACCESSION\s+(\S+)", record, _re.M)
+    return [m.group(1) for m in (version, accession) if m]
+
 
 # TODO http://httpbin.org/ use for testing?
 
@@ -35,6 +127,14 @@ class Genbank(object):
     users_email : string
         Has to be a valid email address. You should always tell
         Genbanks who you are, so that they can contact you.
+    tool : string, optional
+        Name of the software sent to NCBI with each request.
+    api_key : string, optional
+        NCBI API key, which allows 10 instead of 3 requests per second.
+    endpoint : string, optional
+        Base URL of the E-utilities. If it is set, all downloads are made
+        from it. Otherwise :meth:`nucleotide` downloads with Bio.Entrez and
+        :meth:`nucleotides` from the module variable `endpoint`.
 
     Examples
     --------
@@ -46,7 +146,7 @@ class Genbank(object):
     1
     """
 
-    def __init__(self, users_email: str, *args, tool="pydna", **kwargs):
+    def __init__(self, users_email: str, *args, tool="pydna", api_key=None, endpoint=None, **kwargs):
         if not _re.match(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,4}", users_email, _re.IGNORECASE):
             raise ValueError("email address {} is not valid.".format(users_email))
 
@@ -58,12 +158,13 @@ class Genbank(object):
             raise ValueError("you have to set your email address in order to download from Genbank")
         self.email = users_email
         self.tool = tool
+        self.api_key = api_key
+        self.endpoint = endpoint
 
     def __repr__(self):
         """This method returns a short representation containing the email used to initiate."""
         return "GenbankConnection({})".format(self.email)
 
-    @_memorize("pydna.genbank.Genbank.nucleotide")
     def nucleotide(self, item: str, seq_start=None, seq_stop=None, strand=1):
         """This method downloads a genbank nuclotide record from genbank. This method is
         cached by default. This can be controlled by editing the **pydna_cached_funcs** environment
@@ -105,35 +206,22 @@ class Genbank(object):
 
         Result is returned as a :class:`pydna.genbankrecord.GenbankRecord` object.
 
+        When the result is cached, the sense strand of the record or of the
+        interval is downloaded and stored, and later requests for the same
+        accession are answered from it if it covers the requested interval.
+        Intervals are cut from the stored record with the features trimmed
+        to the interval, and the antisense strand is made by reverse
+        complementing. Download the whole record first, or use
+        :meth:`nucleotides`, to get many intervals of a large record with a
+        single download.
+
         References
         ----------
 
         .. [#]   http://www.dsimb.inserm.fr/~fuchs/M2BI/AnalSeq/Annexes/Sequences/Accession_Numbers.htm
         .. [#]   http://www.ncbi.nlm.nih.gov/books/NBK25499/#chapter4.EFetch
         """
-        matches = (
-            (1, _re.search(r"(REGION:\s(?P<start>\d+)\.\.(?P<stop>\d+))", item)),
-            (
-                2,
-                _re.search(r"(REGION: complement\((?P<start>\d+)\.\.(?P<stop>\d+)\))", item),
-            ),
-            (1, _re.search(r"(:|\s)(?P<start>\d+)-(?P<stop>\d+)", item)),
-            (2, _re.search(r"(:|\s)c(?P<start>\d+)-(?P<stop>\d+)", item)),
-        )
-
-        for strand_, match in matches:
-            if match:
-                seq_start = match.group("start")
-                seq_stop = match.group("stop")
-                item = item[: match.start()]
-                strand = strand_
-                break
-
-        if strand not in [1, 2]:
-            try:
-                strand = {"c": 2, "crick": 2, "antisense": 2, "2": 2, "-": 2, "-1": 2}[strand.lower()]
-            except (KeyError, AttributeError):
-                strand = 1
+        item, seq_start, seq_stop, strand = _interval(item, seq_start, seq_stop, strand)
 
         _module_logger.info("#### Genbank download ####")
         _module_logger.info("item  %s", item)
@@ -142,11 +230,34 @@ class Genbank(object):
 
         _module_logger.info("strand  %s", str(strand))
 
+        if _cached_name not in _os.getenv("pydna_cached_funcs", ""):
+            text = self._entrez(item, seq_start, seq_stop, strand)
+            return _GenbankRecord(_read(text), item=item, start=seq_start, stop=seq_stop, strand=strand)
+
+        cache = _memorize_cache()
+        accession = item.strip()
+        start, stop = _bounds(seq_start, seq_stop)
+        record = _lookup(cache, accession, start, stop)
+        if record is None:
+            if stop is None:
+                start = None
+            text = self._entrez(accession, start, stop, 1)
+            record = _GenbankRecord(_read(text), item=accession, start=start, stop=stop, strand=1)
+            _store(cache, accession, start, stop, record)
+        else:
+            _module_logger.info("found %s %s-%s in cache", accession, record.start, record.stop)
+        return _answer(record, item, seq_start, seq_stop, strand)
+
+    def _entrez(self, item, seq_start, seq_stop, strand):
+        """Download a record with Bio.Entrez, or from the endpoint if it is set, returns the text (PRIVATE)."""
+        if self.endpoint:
+            params = dict(db="nuccore", id=item.strip(), rettype="gbwithparts", strand=strand, retmode="text")
+            params.update((k, v) for k, v in (("seq_start", seq_start), ("seq_stop", seq_stop)) if v is not None)
+            return self._request(**params)
         _Entrez.email = self.email
         _Entrez.tool = self.tool
-
-        seq_start = int(seq_start) if seq_start else None
-        seq_stop = int(seq_stop) if seq_stop else None
+        # an api_key set in Bio.Entrez is used if this object has none
+        params = {"api_key": self.api_key} if self.api_key else {}
 
         _module_logger.info("Entrez.email  %s", self.email)
         text = _Entrez.efetch(
@@ -157,11 +268,237 @@ class Genbank(object):
             seq_stop=seq_stop,
             strand=strand,
             retmode="text",
+            **params,
         ).read()
 
         _module_logger.info("text[:160]  %s", text[:160])
-
-        return _GenbankRecord(_read(text), item=item, start=seq_start, stop=seq_stop, strand=strand)
+        return text
+
+    def nucleotides(self, items, batch_size=50, workers=None):
+        """Download many genbank nucleotide records.
+
+        Whole records are downloaded batch_size at a time, intervals (see
+        :meth:`nucleotide` for the formats) one at a time. If more than one
+        item refers to the same accession, the whole record is downloaded
+        once and the intervals and antisense strands are made from it.
+        Requests are sent from several threads, but never more than 3 per
+        second, or 10 per second if the Genbank object has an api_key.
+        Requests that fail with a server error or a network error are
+        repeated max_tries times, with sleep_between_tries seconds between
+        the first attempts, doubled for each new attempt (see the module
+        variables).
+
+        If **pydna_cached_funcs** contains pydna.genbank.Genbank.nucleotide,
+        records are taken from and stored in the same cache as for
+        :meth:`nucleotide`, so `gb.nucleotide(item)` returns the same record
+        afterwards without a download.
+
+        Parameters
+        ----------
+        items : iterable of str
+            Accession numbers, optionally with interval information.
+        batch_size : int, optional
+            Maximum number of accessions in each request.
+        workers : int, optional
+            Number of threads, by default the number of requests per second.
+
+        Returns
+        -------
+        list of :class:`pydna.genbankrecord.GenbankRecord`
+            One record for each item, in the same order.
+        """
+        items = list(items)
+        cache = _memorize_cache() if _cached_name in _os.getenv("pydna_cached_funcs", "") else None
+        intervals = {item: _interval(item) for item in items}
+        results = {}
+        missing = {}
+        for item, (accession, seq_start, seq_stop, strand) in intervals.items():
+            accession = accession.strip()
+            start, stop = _bounds(seq_start, seq_stop)
+            record = None if cache is None else _lookup(cache, accession, start, stop)
+            if record is None:
+                missing[item] = (accession, start, stop)
+            else:
+                results[item] = _answer(record, *intervals[item])
+
+        counts = _Counter(accession for accession, start, stop in missing.values())
+        # the whole record is downloaded once for an accession that is needed more than once
+        whole = [accession for accession, start, stop in missing.values() if stop is None or counts[accession] > 1]
+        whole = list(dict.fromkeys(whole))
+        batches = [whole[i : i + batch_size] for i in range(0, len(whole), batch_size)]
+        batches.extend(dict.fromkeys(key for key in missing.values() if key[0] not in whole))
+        _module_logger.info("#### Genbank download of %s records in %s requests ####", len(missing), len(batches))
+
+        def fetch(batch):
+            if isinstance(batch, tuple):
+                return {batch: self._efetch(*batch)}
+            return {(accession, None, None): record for accession, record in self._efetch_batch(batch).items()}
+
+        downloaded = {}
+        with _ThreadPoolExecutor(workers or self._requests_per_second()) as executor:
+            for records in executor.map(fetch, batches):
+                downloaded.update(records)
+                if cache is not None:
+                    for (accession, start, stop), record in records.items():
+                        _store(cache, accession, start, stop, record)
+
+        for item, (accession, start, stop) in missing.items():
+            key = (accession, None, None) if accession in whole else (accession, start, stop)
+            results[item] = _answer(downloaded[key], *intervals[item])
+        return [results[item] for item in items]
+
+    def _requests_per_second(self):
+        return 10 if self.api_key else 3
+
+    def _request(self, **params):
+        """Send an efetch request, returns the response text (PRIVATE)."""
+        params = dict(params, tool=self.tool, email=self.email)
+        if self.api_key:
+            params["api_key"] = self.api_key
+        url = (self.endpoint or endpoint).rstrip("/") + "/efetch.fcgi"
+        for attempt in range(max_tries):
+            _rate_limiter.wait(self._requests_per_second())
+            try:
+                status, headers, body = _post(url, params)
+            except (OSError, _http_client.HTTPException) as error:
+                if attempt + 1 == max_tries:
+                    raise
+                _module_logger.info("request to %s failed: %s", url, error)
+                delay = sleep_between_tries * 2**attempt
+            else:
+                if status == 200:
+                    return body.decode("utf-8")
+                if status not in _retry_status or attempt + 1 == max_tries:
+                    raise _HTTPError(url, status, body.decode("utf-8", "replace"), headers, None)
+                _module_logger.info("request to %s failed with status %s", url, status)
+                retry_after = headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else sleep_between_tries * 2**attempt
+            _time.sleep(delay)
+
+    def _efetch(self, accession, start=None, stop=None):
+        """Download the sense strand of one record or interval (PRIVATE)."""
+        params = dict(db="nuccore", id=accession, rettype="gbwithparts", retmode="text")
+        if start:
+            params.update(seq_start=start, seq_stop=stop)
+        text = self._request(**params)
+        return _GenbankRecord(_read(text), item=accession, start=start, stop=stop, strand=1)
+
+    def _efetch_batch(self, accessions):
+        """Download whole records, returns a dict with a record for each accession (PRIVATE).
+
+        Records are matched to accessions by the VERSION and ACCESSION lines.
+        Accessions that are not matched, for example GI numbers, are
+        downloaded one by one.
+        """
+        try:
+            text = self._request(db="nuccore", id=",".join(accessions), rettype="gbwithparts", retmode="text")
+        except _HTTPError as error:
+            # a single invalid accession makes NCBI reject the whole batch
+            if error.code != 400 or len(accessions) == 1:
+                raise
+            text = ""
+        texts = {}
+        for record in _split_records(text):
+            for identifier in _identifiers(record):
+                texts.setdefault(identifier, record)
+        results = {}
+        for accession in accessions:
+            record = texts.get(accession)
+            if record is None:
+                results[accession] = self._efetch(accession)
+            else:
+                results[accession] = _GenbankRecord(_read(record), item=accession, start=None, stop=None, strand=1)
+        return results
+
+
+def _interval(item, seq_start=None, seq_stop=None, strand=1):
+    """Accession, start, stop and strand (1 or 2) from the arguments of
+    Genbank.nucleotide (PRIVATE)."""
+    matches = (
+        (1, _re.search(r"(REGION:\s(?P<start>\d+)\.\.(?P<stop>\d+))", item)),
+        (
+            2,
+            _re.search(r"(REGION: complement\((?P<start>\d+)\.\.(?P<stop>\d+)\))", item),
+        ),
+        (1, _re.search(r"(:|\s)(?P<start>\d+)-(?P<stop>\d+)", item)),
+        (2, _re.search(r"(:|\s)c(?P<start>\d+)-(?P<stop>\d+)", item)),
+    )
+
+    for strand_, match in matches:
+        if match:
+            seq_start = match.group("start")
+            seq_stop = match.group("stop")
+            item = item[: match.start()]
+            strand = strand_
+            break
+
+    if strand not in [1, 2]:
+        try:
+            strand = {"c": 2, "crick": 2, "antisense": 2, "2": 2, "-": 2, "-1": 2}[strand.lower()]
+        except (KeyError, AttributeError):
+            strand = 1
+
+    seq_start = int(seq_start) if seq_start else None
+    seq_stop = int(seq_stop) if seq_stop else None
+    return item, seq_start, seq_stop, strand
+
+
+def _bounds(seq_start, seq_stop):
+    """First and last position of an interval, (None, None) for the whole record
+    and last position None for the rest of the record (PRIVATE)."""
+    if seq_start and seq_stop:
+        return min(seq_start, seq_stop), max(seq_start, seq_stop)
+    if seq_start or seq_stop:
+        return seq_start or 1, seq_stop
+    return None, None
+
+
+def _key(*args):
+    """Cache key of the intervals stored for an accession, args (accession,),
+    or of a record, args (accession, start, stop) (PRIVATE)."""
+    return _memorize_key(_cached_name, args, {})
+
+
+def _lookup(cache, accession, start, stop):
+    """A cached sense strand record that covers start..stop, or None (PRIVATE)."""
+    index_key = _key(accession)
+    intervals = cache.get(index_key, [])
+    for interval in sorted(intervals, key=lambda interval: interval[0] is not None):
+        if interval[0] is None or stop is not None and interval[0] <= start and stop <= interval[1]:
+            record = cache.get(_key(accession, *interval))
+            if record is not None:
+                return record
+            # removed from the cache
+            cache[index_key] = [i for i in intervals if i != interval]
+    return None
+
+
+def _store(cache, accession, start, stop, record):
+    """Store a sense strand record of the interval start..stop (PRIVATE)."""
+    cache[_key(accession, start, stop)] = record
+    index_key = _key(accession)
+    intervals = cache.get(index_key, [])
+    if (start, stop) not in intervals:
+        cache[index_key] = intervals + [(start, stop)]
+
+
+def _answer(record, item, seq_start, seq_stop, strand):
+    """The result of Genbank.nucleotide from a sense strand record that
+    covers the interval (PRIVATE)."""
+    start, stop = _bounds(seq_start, seq_stop)
+    if start is not None:
+        offset = record.start or 1
+        first, last = start - offset, (stop or offset + len(record) - 1) - offset + 1
+        if (first, last) != (0, len(record)):
+            region = record[first:last]
+            features = (
+                _trim_feature(feature, first, last) for feature in record._overlapping_features(first, last).features()
+            )
+            region.features = [feature for feature in features if feature is not None]
+            region.id, region.name, region.description = record.id, record.name, record.description
+            record = region
+    result = _GenbankRecord(record, item=item, start=seq_start, stop=seq_stop, strand=1)
+    return result.reverse_complement() if strand == 2 else result
 
 
 def genbank(accession: str = "CS570233.1", *args, **kwargs):
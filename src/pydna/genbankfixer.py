@@ -12,6 +12,8 @@ pass the BioPython Genbank parser
 
 Almost all of this code was lifted from BioJSON (https://github.com/levskaya/BioJSON) by Anselm Levskaya.
 The original code was not accompanied by any software licence. This parser is based on pyparsing.
+The common forms of each entry are first scanned with regular expressions that match the same
+text as the grammar, which is only used for the rest.
 
 There are some modifications to deal with fringe cases.
 
@@ -263,9 +265,11 @@ multipleGB = _pp.OneOrMore(_pp.Group(GB))
 # Main JSON Conversion Routine
 
 
+_indent = _re.compile("[\n]{1}(COMMENT){0,1}[ ]+")
+
+
 def strip_indent(str):
-    whitespace = _re.compile("[\n]{1}(COMMENT){0,1}[ ]+")
-    return whitespace.sub("\n", str)
+    return _indent.sub("\n", str)
 
 
 def concat_dict(dlist):
@@ -274,59 +278,302 @@ def concat_dict(dlist):
     """
     newdict = {}
     for e in dlist:
-        if e[0] in newdict.keys():
-            newdict[e[0]] = newdict[e[0]] + strip_indent(e[1])
-        else:
-            newdict[e[0]] = strip_indent(e[1])
-    return newdict
+        newdict.setdefault(e[0], []).append(strip_indent(e[1]))
+    return {key: "".join(vals) for key, vals in newdict.items()}
 
 
-def toJSON(gbkstring):
+def _jseq(seq, features):
+    """build the JSON object for one record from the LOCUS fields, sequence and
+    generic entries in seq and a list of features, each a list of key value pairs
+    """
+    nl = []
+    for a in list(map(dict, features)):
+        dct = {}
+        for key in a:
+            val = a[key]
+            dct[key] = a[key]
+            if isinstance(val, str):
+                dct[key] = a[key].strip()
+        nl.append(dct)
+
+    return {
+        "__format__": "jseq v0.1",
+        "name": seq["name"],
+        "size": seq["size"],
+        "seqtype": seq["seqtype"],
+        "divcode": seq["divcode"],
+        "date": seq["date"],
+        "topology": seq["topology"],
+        "sequence": seq["sequence"],
+        "features": nl,
+        "annotations": concat_dict(seq["generics"]),
+    }
+
+
+def parseGB(gbkstring):
+    """parses gbkstring with the pyparsing grammar, returns a list of JSON objects"""
     parsed = multipleGB.parseString(gbkstring)
 
-    jseqlist = []
+    # Print to STDOUT some details (useful for long multi-record parses)
+    # print(seq['name'], ":  length:", len(seq['sequence']) , " #features:" , len(seq['features'].asList()))
+
+    return [_jseq(seq, seq["features"].asList() if "features" in seq else []) for seq in parsed]
+
+
+# ===============================================================================
+# Fast path
+#
+# pyparsing is slow, so toJSON first scans the text with the regular expressions below,
+# which match the same text as the grammar for the common forms of each entry.
+# A LOCUS line or a feature that is not in a common form is parsed with the LocusEntry or
+# Feature grammar, and if anything else is unusual, the whole text is parsed with parseGB.
+
+_ws = " \t\r\n"
+_skip = _re.compile(r"[ \t\r\n]*")
+
+_locus = _re.compile(
+    r"LOCUS[ \t\r\n]*(?P<name>[\w\-().\\]+)(?![\w\-().\\])"
+    r"[ \t\r\n]*(?P<size>\d+)(?!\d)"
+    r"[ \t\r\n]*(?i:bp)"
+    r"[ \t\r\n]*(?P<seqtype>[A-Za-z\-]+)(?![A-Za-z\-])"
+    r"[ \t\r\n]*(?P<topology>(?i:linear|circular))"
+    r"(?:[ \t\r\n]*(?P<divcode>[A-Za-z]+)(?![A-Za-z]))?"
+    r"[ \t\r\n]*(?P<date>\d{2}-\S{3}-\d{4})",
+    _re.ASCII,
+)
+_locus_entry = LocusEntry + _pp.Empty().setParseAction(lambda s, l_, t: l_).setResultsName("end")
+
+_generic = _re.compile(
+    r"(?P<title>[A-Z]+)(?![A-Z])[ \t\r\n]*(?![ \t\r\n])"
+    r"(?P<text>[^\n]+(?:\n|\Z)(?:[ \t\r\n]+(?![ \t\r\n])[^\n]+(?:\n|\Z))*)"
+)
+
+_features = _re.compile(r"FEATURES[ \t\r\n]*Location/Qualifiers")
+_line_end = _re.compile(r"[ \t\r]*(?:\n|\Z)")
+_feature_key = _re.compile(r"[ \t\r\n]*([\w\-]+)[ \t\r\n]+", _re.ASCII)
+_qualifier_key = _re.compile(r"[\w\-]+", _re.ASCII)
+_number_value = _re.compile(r'"[ \t\r\n]*(\d+)[ \t\r\n]*"', _re.ASCII)
+_multiline = _re.compile("[\n]{1}[ ]+")
+_location_spaces = _re.compile(r"[ \t\r\n]*([(),])[ \t\r\n]*")
+_location_token = _re.compile(r"complement\(|join\(|\)|,|[<>]?\d+(?:\.\.[<>]?\d+)?", _re.ASCII)
+
+_sequence = _re.compile(r"(?:[ \t\r\n]*\d+(?:[ \t\r\n]*[ACGTacgtNn]+)+)+", _re.ASCII)
+_not_bases = str.maketrans("", "", "0123456789" + _ws)
+
+
+def _is_slice(token):
+    return token[0] in "<>0123456789"
+
+
+def _slices(tokens, i):
+    """parses the complexSlice starting at tokens[i], returns the index after it or None"""
+    if tokens[i] not in ("complement(", "join("):
+        return None
+    i += 1
+    if i < len(tokens) and _is_slice(tokens[i]):
+        i += 1
+        while i + 1 < len(tokens) and tokens[i] == "," and _is_slice(tokens[i + 1]):
+            i += 2
+    else:
+        while True:
+            i = _slices(tokens, i) if i < len(tokens) else None
+            if i is None:
+                return None
+            if i + 1 < len(tokens) and tokens[i] == "," and not _is_slice(tokens[i + 1]):
+                i += 1
+                continue
+            break
+    return i + 1 if i < len(tokens) and tokens[i] == ")" else None
 
-    for seq in parsed:
-        # for item in seq.asList():
-        #    print(item)
-
-        # import sys;sys.exit(42)
-
-        # Print to STDOUT some details (useful for long multi-record parses)
-        # print(seq['name'], ":  length:", len(seq['sequence']) , " #features:" , len(seq['features'].asList()))
-
-        # build JSON object
-
-        nl = []
-        if "features" in seq:
-            for a in list(map(dict, seq["features"].asList())):
-                dct = {}
-                for key in a:
-                    val = a[key]
-                    # print(key, a[key])
-                    dct[key] = a[key]
-                    if isinstance(val, str):
-                        dct[key] = a[key].strip()
-                nl.append(dct)
-
-        # import sys;sys.exit(42)
-
-        # print(list(map(dict, hej))[2]["codon_start"])
-
-        jseq = {
-            "__format__": "jseq v0.1",
-            "name": seq["name"],
-            "size": seq["size"],
-            "seqtype": seq["seqtype"],
-            "divcode": seq["divcode"],
-            "date": seq["date"],
-            "topology": seq["topology"],
-            "sequence": seq["sequence"],
-            "features": nl,
-            "annotations": concat_dict(seq["generics"]),
-        }
-        jseqlist.append(jseq)
 
+def _location(text):
+    """location list and strand of a location string, or None if not in a common form"""
+    text = _location_spaces.sub(r"\1", text.strip())
+    tokens = _location_token.findall(text)
+    if not tokens or "".join(tokens) != text:
+        return None
+    if len(tokens) > 1 and _slices(tokens, 0) != len(tokens):
+        return None
+    locationlist = []
+    for token in tokens:
+        if _is_slice(token):
+            start, _, end = token.replace("<", "").replace(">", "").partition("..")
+            locationlist.append([int(start), int(end or start)])
+    if not locationlist:
+        return None
+    return locationlist, -1 if "complement(" in tokens else 1
+
+
+def _feature(text, start, end):
+    """key value pairs of the feature in text[start:end], or None if not in a common form"""
+    m = _feature_key.match(text, start, end)
+    if not m:
+        return None
+    slash = text.find("/", m.end(), end)
+    location = _location(text[m.end() : slash]) if slash != -1 else None
+    if location is None:
+        return None
+    pairs = [["type", m.group(1)], ["location", location[0]], ["strand", location[1]]]
+    pos = slash
+    while True:
+        pos = _skip.match(text, pos, end).end()
+        if pos == end:
+            break
+        if text[pos] != "/":
+            return None
+        m = _qualifier_key.match(text, pos + 1, end)
+        if not m:
+            return None
+        key, pos = m.group(), m.end()
+        if pos < end and text[pos] == "=":
+            pos += 1
+            if pos < end and text[pos] == '"':
+                m = _number_value.match(text, pos, end)
+                if m:
+                    value, pos = int(m.group(1)), m.end()
+                else:
+                    close = text.find('"', pos + 1, end)
+                    if close == -1 or "\\" in text[pos:close]:
+                        return None
+                    value, pos = _multiline.sub(" ", text[pos + 1 : close]), close + 1
+            elif pos < end and text[pos] not in _ws:
+                eol = text.find("\n", pos, end)
+                eol = end if eol == -1 else eol + 1
+                value, pos = text[pos:eol], eol
+                following = text[eol : eol + 22]
+                if len(following) == 22 and not following[:21].strip(_ws) and following[21] != "/":
+                    return None
+            else:
+                return None
+        else:
+            value = True
+        pairs.append([key, value])
+    return pairs if len(pairs) > 3 else None
+
+
+def _feature_spans(text, pos):
+    """splits the feature table starting at pos into features, returns the
+    (start, end) of each feature and the position after the table, or None
+    if there is text before the first feature
+    """
+    spans = []
+    quotes = 0
+    while pos < len(text):
+        eol = text.find("\n", pos)
+        eol = len(text) if eol == -1 else eol + 1
+        line = text[pos:eol]
+        if quotes % 2 == 0:
+            stripped = line.lstrip(_ws)
+            if stripped and line[0] not in _ws:
+                break
+            if stripped and not stripped.startswith("/") and len(line) - len(stripped) < 21:
+                if not spans or "/" in text[spans[-1][0] : pos]:
+                    spans.append([pos, eol])
+            if stripped and not spans:
+                return None, pos
+        quotes += line.count('"')
+        if spans:
+            spans[-1][1] = eol
+        pos = eol
+    return spans, pos
+
+
+def _locus_line(text, pos):
+    """scans the LOCUS line starting at text[pos], returns a dict with its fields and the
+    position after it, or None, None if there is no LOCUS line.
+    """
+    if not text.startswith("LOCUS", pos):
+        return None, None
+    m = _locus.match(text, pos)
+    if m:
+        seq = m.groupdict()
+        seq["topology"] = seq["topology"].lower()
+        seq["divcode"] = seq["divcode"] or "   "
+        return seq, m.end()
+    try:
+        seq = _locus_entry.parseString(text[pos:])
+    except _pp.ParseBaseException:
+        return None, None
+    seq = {key: seq[key] for key in ("name", "size", "seqtype", "divcode", "date", "topology", "end")}
+    return seq, pos + seq.pop("end")
+
+
+def _feature_table(text, pos):
+    """scans the feature table after the FEATURES keyword at text[pos], returns the list of
+    features and the position after the table. The list is None if the table is not in a
+    common form.
+    """
+    m = _line_end.match(text, pos)
+    if not m:
+        return None, pos
+    spans, end = _feature_spans(text, m.end())
+    if spans is None:
+        return None, pos
+    features = []
+    for start, stop in spans:
+        pairs = _feature(text, start, stop)
+        if pairs is None:
+            try:
+                pairs = Feature.parseString(text[start:stop], parseAll=True).asList()[0]
+            except (_pp.ParseBaseException, ValueError):
+                return None, pos
+        features.append(pairs)
+    return features, end
+
+
+def _record(text, pos):
+    """scans the record starting at text[pos], returns the record and the position after it.
+    The record is None if it is not in a common form. The position is None if there is no record.
+    """
+    seq, pos = _locus_line(text, pos)
+    if seq is None:
+        return None, None
+    generics = []
+    features = None
+    while True:
+        pos = _skip.match(text, pos).end()
+        if text.startswith("//", pos):
+            break
+        m = _features.match(text, pos)
+        if m:
+            table, end = _feature_table(text, m.end())
+            if table is None:
+                return None, pos
+            if table:
+                features = table
+                pos = end
+                continue
+        if text.startswith("ORIGIN", pos):
+            m = _sequence.match(text, pos + 6)
+            if m:
+                seq["sequence"] = m.group().translate(_not_bases)
+                pos = m.end()
+                continue
+        m = _generic.match(text, pos)
+        if not m:
+            return None, pos
+        generics.append([m.group("title"), m.group("text")])
+        pos = m.end()
+    if not generics or "sequence" not in seq:
+        return None, pos
+    seq["generics"] = generics
+    return _jseq(seq, features or []), pos + 2
+
+
+def toJSON(gbkstring):
+    """parses gbkstring, returns a list of JSON objects, one for each record"""
+    # pyparsing expands tabs before parsing
+    gbkstring = gbkstring.expandtabs()
+    jseqlist = []
+    pos = 0
+    while True:
+        record, pos = _record(gbkstring, _skip.match(gbkstring, pos).end())
+        if record is None:
+            break
+        jseqlist.append(record)
+    if pos is not None or not jseqlist:
+        # a record that is not in a common form
+        return parseGB(gbkstring)
     return jseqlist
 
 
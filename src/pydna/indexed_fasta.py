@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Memory mapped access to sequences in large FASTA files.
+
+Parsing a FASTA file with :func:`pydna.parsers.parse` reads the whole file.
+For genomes, this module maps the file into memory and reads only the parts
+of the sequences that are used. The position of each sequence in the file is
+kept in an index with the same format as the .fai files made by
+``samtools faidx``. The index is saved next to the FASTA file and reused as
+long as the FASTA file is not modified.
+
+All lines of a sequence except the last must have the same length.
+
+>>> import tempfile, os
+>>> from pydna.indexed_fasta import MappedFasta
+>>> path = os.path.join(tempfile.mkdtemp(), "genome.fasta")
+>>> with open(path, "w") as f:
+...     _ = f.write(">chrA first chromosome\\nGGATCCaaaa\\nttttGAATTC\\ncc\\n>chrB\\naaaaaaaa\\n")
+>>> with MappedFasta(path) as genome:
+...     list(genome)
+...     chrA = genome["chrA"]
+...     len(chrA), chrA.find("gaattc")
+...     chrA[4:16].seq
+['chrA', 'chrB']
+(22, 14)
+Dseq(-12)
+CCaaaattttGA
+GGttttaaaaCT
+"""
+
+import mmap as _mmap
+import os as _os
+import re as _re
+from bisect import bisect_left as _bisect_left
+from typing import NamedTuple as _NamedTuple
+
+from Bio.Seq import Seq as _Seq
+from Bio.Seq import SequenceDataAbstractBaseClass as _SequenceDataAbstractBaseClass
+from pydna.utils import flatten as _flatten
+from pydna.utils import rc as _rc
+
+# Number of bases read at a time when searching a sequence
+chunk_size = 2**22
+
+
+class FaiRecord(_NamedTuple):
+    """One line of a .fai index.
+
+    header is the position of the header line in the FASTA file. It is not
+    part of the .fai format and is None for records read from a .fai file.
+    """
+
+    name: str
+    length: int
+    offset: int
+    linebases: int
+    linewidth: int
+    header: int = None
+
+
+def build_index(path):
+    """Index the sequences in a FASTA file.
+
+    Returns a list of FaiRecord, one for each sequence. A ValueError is
+    raised if the lines of a sequence do not have the same length or if
+    there is sequence before the first header line.
+    """
+    records = []
+    with open(path, "rb") as f:
+        name = None
+        position = header = offset = length = 0
+        linebases = linewidth = None
+        last_line = False
+        for line in f:
+            if line.startswith(b">"):
+                if name is not None:
+                    records.append(FaiRecord(name, length, offset, linebases or 0, linewidth or 0, header))
+                name = (line[1:].split() or [b""])[0].decode("ascii")
+                header = position
+                offset = position + len(line)
+                length = 0
+                linebases = linewidth = None
+                last_line = False
+            elif name is None:
+                if line.strip():
+                    raise ValueError(f"Sequence before the first header line in {path}.")
+            else:
+                bases = len(line.rstrip(b"\r\n"))
+                if linebases is None:
+                    linebases, linewidth = bases, len(line)
+                elif (
+                    (bases and last_line)
+                    or bases > linebases
+                    # the last line of the file can be without a line break
+                    or (bases == linebases and len(line) != linewidth and line.endswith(b"\n"))
+                ):
+                    raise ValueError(f"Lines of sequence {name} in {path} do not have the same length.")
+                # Only the last line of a sequence can be shorter
+                last_line = last_line or bases < linebases
+                length += bases
+            position += len(line)
+        if name is not None:
+            records.append(FaiRecord(name, length, offset, linebases or 0, linewidth or 0, header))
+    return records
+
+
+def write_index(records, path):
+    """Write FaiRecords to a .fai file."""
+    with open(path, "w") as f:
+        for record in records:
+            f.write("\t".join(str(field) for field in record[:5]) + "\n")
+
+
+def read_index(path):
+    """Read a .fai file into a list of FaiRecords."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            name, *numbers = line.rstrip("\n").split("\t")[:5]
+            records.append(FaiRecord(name, *(int(n) for n in numbers)))
+    return records
+
+
+def index(path):
+    """The index of a FASTA file.
+
+    The index is read from path + ".fai" if that file is newer than the
+    FASTA file. Otherwise the FASTA file is indexed and the index saved, if
+    the directory is writable.
+    """
+    fai = f"{path}.fai"
+    try:
+        if _os.path.getmtime(fai) >= _os.path.getmtime(path):
+            return read_index(fai)
+    except OSError:
+        pass
+    records = build_index(path)
+    try:
+        write_index(records, fai)
+    except OSError:
+        pass
+    return records
+
+
+class MappedSequenceData(_SequenceDataAbstractBaseClass):
+    """Sequence content read on demand from a memory mapped FASTA file.
+
+    This can be used as data for a Bio.Seq.Seq object. Only the lines of the
+    FASTA file that hold the requested part of the sequence are read.
+    """
+
+    __slots__ = ("_mm", "_record")
+
+    def __init__(self, mm, record: FaiRecord):
+        self._mm = mm
+        self._record = record
+        super().__init__()
+
+    def __len__(self):
+        return self._record.length
+
+    def _position(self, index):
+        """Position in the file of a position in the sequence (PRIVATE)."""
+        record = self._record
+        return record.offset + (index // record.linebases) * record.linewidth + index % record.linebases
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                positions = range(start, stop, step)
+                if not positions:
+                    return b""
+                lowest = min(positions[0], positions[-1])
+                highest = max(positions[0], positions[-1])
+                return self[lowest : highest + 1][positions[0] - lowest :: step]
+            if start >= stop:
+                return b""
+            return self._mm[self._position(start) : self._position(stop - 1) + 1].translate(None, b"\r\n")
+        index = range(len(self))[key]
+        return self._mm[self._position(index)]
+
+    def chunks(self, start=0, stop=None, overlap=0):
+        """Generator of (position, bytes) for consecutive parts of the sequence.
+
+        Consecutive parts overlap by overlap bases, so that matches of up to
+        overlap + 1 bases are found in at least one part.
+        """
+        start, stop, step = slice(start, stop).indices(len(self))
+        for position in range(start, stop, chunk_size):
+            yield position, self[position : min(stop, position + chunk_size + overlap)]
+
+    def find(self, sub, start=None, end=None):
+        """Lowest index where sub is found in data[start:end], reading one part of the sequence at a time."""
+        if isinstance(sub, str):
+            sub = sub.encode("ascii")
+        start, end, step = slice(start, end).indices(len(self))
+        for position, chunk in self.chunks(start, end, overlap=max(len(sub) - 1, 0)):
+            found = chunk.find(sub)
+            if found != -1:
+                return position + found
+        return -1
+
+
+class MappedRecord:
+    """A sequence in a memory mapped FASTA file.
+
+    Slices are returned as :class:`pydna.dseqrecord.Dseqrecord` objects. The
+    seq attribute is a Bio.Seq.Seq object that reads from the file when
+    needed.
+    """
+
+    def __init__(self, mm, record: FaiRecord):
+        self.name = self.id = record.name
+        self.fai = record
+        header = record.header
+        if header is None:
+            # the header is the line before the sequence
+            header = mm.rfind(b"\n", 0, record.offset - 1) + 1
+        self.description = mm[header + 1 : record.offset].decode("ascii").strip()
+        self._data = MappedSequenceData(mm, record)
+        self.seq = _Seq(self._data)
+
+    def __len__(self):
+        return self.fai.length
+
+    def __repr__(self):
+        return f"MappedRecord({self.name}, {len(self)})"
+
+    def __getitem__(self, key):
+        from pydna.dseqrecord import Dseqrecord
+
+        if not isinstance(key, slice):
+            return chr(self._data[key])
+        start, stop, step = key.indices(len(self))
+        return Dseqrecord(
+            self._data[key].decode("ascii"),
+            id=f"{self.name}:{start + 1}-{stop}" if step == 1 else self.name,
+            name=self.name,
+            description=self.description,
+        )
+
+    def find(self, sub, start=0, end=None):
+        """Lowest index where sub is found, ignoring case. Returns -1 if sub is not found."""
+        sub = str(getattr(sub, "seq", sub)).upper().encode("ascii")
+        for position, chunk in self._data.chunks(start, end, overlap=max(len(sub) - 1, 0)):
+            found = chunk.upper().find(sub)
+            if found != -1:
+                return position + found
+        return -1
+
+    def _primer_sites(self, primers, limit):
+        """Positions of the 3' ends of the primers on both strands (PRIVATE)."""
+        forward, reverse = set(), set()
+        for primer in primers:
+            end = str(primer.seq).upper()[-limit:].encode("ascii")
+            forward.add(end)
+            reverse.add(_rc(end.decode("ascii")).encode("ascii"))
+        pattern = _re.compile(b"(?=(" + b"|".join(_re.escape(word) for word in forward | reverse) + b"))")
+        forward_sites, reverse_sites = set(), set()
+        for position, chunk in self._data.chunks(overlap=limit - 1):
+            for match in pattern.finditer(chunk.upper()):
+                word = match.group(1)
+                if word in forward:
+                    forward_sites.add(position + match.start())
+                if word in reverse:
+                    reverse_sites.add(position + match.start())
+        return sorted(forward_sites), sorted(reverse_sites)
+
+    def products(self, *primers, limit=13, max_size=50000):
+        """PCR products formed by the primers with this sequence as template.
+
+        The primers are found by reading through the sequence once. Only the
+        regions with primers annealing in opposite directions at most max_size
+        bp apart are read into memory and used as templates for
+        :class:`pydna.amplify.Anneal`. The templates are named after the
+        region, like chr1:1001-2000.
+
+        Returns a list of :class:`pydna.amplicon.Amplicon` objects.
+        """
+        from pydna.amplify import Anneal
+        from pydna.primer import Primer
+
+        primers = [p if hasattr(p, "seq") else Primer(p) for p in _flatten(primers)]
+        margin = max(len(p) for p in primers)
+        forward_sites, reverse_sites = self._primer_sites(primers, limit)
+        regions = []
+        for site in forward_sites:
+            # The 3' ends of the primers have to be in the same order as in a product
+            first = _bisect_left(reverse_sites, site)
+            if first < len(reverse_sites) and reverse_sites[first] + limit - site <= max_size:
+                last = _bisect_left(reverse_sites, site + max_size - limit + 1) - 1
+                regions.append([max(site - margin, 0), min(reverse_sites[last] + limit + margin, len(self))])
+        merged = []
+        for region in sorted(regions):
+            if merged and region[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], region[1])
+            else:
+                merged.append(region)
+        products = []
+        for start, stop in merged:
+            products.extend(Anneal(primers, self[start:stop], limit=limit).products)
+        return products
+
+    def pcr(self, *primers, limit=13, max_size=50000):
+        """The single PCR product formed by the primers, see :func:`pydna.amplify.pcr`.
+
+        A ValueError is raised if no product or more than one product is formed.
+        """
+        products = self.products(*primers, limit=limit, max_size=max_size)
+        if len(products) != 1:
+            raise ValueError(f"{len(products)} PCR products formed from {self.name}.")
+        return products[0]
+
+
+class MappedFasta:
+    """A FASTA file mapped into memory.
+
+    Sequences are accessed by name, like in a dict. The file stays open until
+    close is called or the with block ends.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+    """
+
+    def __init__(self, path):
+        self.path = _os.fspath(path)
+        self.index = {record.name: record for record in index(self.path)}
+        self._file = open(self.path, "rb")
+        empty = _os.fstat(self._file.fileno()).st_size == 0
+        self._mm = None if empty else _mmap.mmap(self._file.fileno(), 0, access=_mmap.ACCESS_READ)
+
+    def __getitem__(self, name):
+        return MappedRecord(self._mm, self.index[name])
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def values(self):
+        return (self[name] for name in self.index)
+
+    def items(self):
+        return ((name, self[name]) for name in self.index)
+
+    def __repr__(self):
+        return f"MappedFasta({self.path!r}, {len(self)} sequences)"
+
+    def close(self):
+        """Close the memory map and the file."""
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == "__main__":
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
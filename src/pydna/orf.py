@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Six frame search for open reading frames (ORFs).
+
+Every position of the sequence is classified as a start codon, a stop codon
+or neither in one vectorized pass per strand. Each start codon is then paired
+with the first stop codon in the same frame, so the search time grows
+linearly with the length of the sequence.
+
+The result is an :class:`OrfTable` holding the coordinates of the ORFs as
+numpy arrays. Sequences of the ORFs are only created when requested.
+
+>>> from pydna.orf import find_orfs
+>>> orfs = find_orfs("ccATGaaaTAAcccTTAtttCATcc", minsize=1)
+>>> orfs
+OrfTable(2 ORFs)
+>>> for start, stop, strand in orfs:
+...     print(start, stop, strand)
+2 11 1
+14 23 -1
+>>> orfs.seq(1)
+Seq('ATGaaaTAA')
+"""
+
+import numpy as _np
+from Bio.Data.CodonTable import unambiguous_dna_by_id as _unambiguous_dna_by_id
+
+# A, C, G and T (any case) are translated to 0-3, all other characters to 4
+_translation = bytes({65: 0, 67: 1, 71: 2, 84: 3, 97: 0, 99: 1, 103: 2, 116: 3}.get(i, 4) for i in range(256))
+_complement = bytes.maketrans(b"ACGTacgt", b"TGCAtgca")
+
+
+def _codon_indices(codons):
+    """Codon numbers (16 * first + 4 * second + third) of a collection of codons (PRIVATE)."""
+    numbers = []
+    for codon in codons:
+        a, b, c = codon.encode("ascii").translate(_translation)
+        numbers.append(16 * a + 4 * b + c)
+    return numbers
+
+
+def _codon_mask(codes, codons):
+    """Boolean array, True where one of the codons starts (PRIVATE)."""
+    table = _np.zeros(64, dtype=bool)
+    table[_codon_indices(codons)] = True
+    valid = (codes[:-2] < 4) & (codes[1:-1] < 4) & (codes[2:] < 4)
+    numbers = _np.where(valid, 16 * codes[:-2] + 4 * codes[1:-1] + codes[2:], 0)
+    return table[numbers] & valid
+
+
+def _search(text: bytes, length: int, starts, stops, minsize, nested, circular):
+    """Start and stop positions of the ORFs in one strand (PRIVATE).
+
+    text is the sequence of the strand, extended for circular sequences so that
+    an ORF starting at any position can be read three times around the
+    sequence.
+    """
+    codes = _np.frombuffer(text.translate(_translation), dtype=_np.uint8).astype(_np.int64)
+    if len(codes) < 3:
+        return _np.zeros(0, dtype=_np.int64), _np.zeros(0, dtype=_np.int64)
+    start_positions = _np.flatnonzero(_codon_mask(codes, starts))
+    start_positions = start_positions[start_positions < length]
+    stop_positions = _np.flatnonzero(_codon_mask(codes, stops))
+
+    orf_starts, orf_stops = [], []
+    for frame in range(3):
+        frame_starts = start_positions[start_positions % 3 == frame]
+        frame_stops = stop_positions[stop_positions % 3 == frame]
+        # The first stop codon in frame downstream of each start codon
+        following = _np.searchsorted(frame_stops, frame_starts)
+        has_stop = following < len(frame_stops)
+        frame_starts, following = frame_starts[has_stop], following[has_stop]
+        orf_starts.append(frame_starts)
+        orf_stops.append(frame_stops[following] + 3)
+    orf_starts = _np.concatenate(orf_starts)
+    orf_stops = _np.concatenate(orf_stops)
+
+    # The stop codon is not part of the minimum number of codons
+    keep = orf_stops - orf_starts >= 3 * (minsize + 2)
+    if circular:
+        # An ORF can not be longer than three times around the sequence
+        keep &= orf_stops - orf_starts <= 3 * length
+    orf_starts, orf_stops = orf_starts[keep], orf_stops[keep]
+
+    if not nested:
+        # Only the longest ORF ending with each stop codon
+        ends = orf_stops % length if circular else orf_stops
+        order = _np.lexsort((orf_starts - orf_stops, ends))
+        _, first = _np.unique(ends[order], return_index=True)
+        orf_starts, orf_stops = orf_starts[order][first], orf_stops[order][first]
+    return orf_starts, orf_stops
+
+
+def find_orfs(seq, minsize=30, table=1, start_codons=("ATG",), circular=None, strand=0, nested=False):
+    """Open reading frames in all six frames of a sequence.
+
+    Parameters
+    ----------
+    seq : str, Bio.Seq.Seq, pydna.seq.Seq, pydna.dseq.Dseq or pydna.dseqrecord.Dseqrecord
+    minsize : int, optional
+        Minimum number of codons between the start and the stop codon.
+    table : int, optional
+        NCBI genetic code table used for the stop codons.
+    start_codons : iterable of str or None, optional
+        Start codons, by default only ATG. If None, all start codons of the
+        genetic code table are used.
+    circular : bool or None, optional
+        If None, the topology of seq is used if it has one.
+        ORFs of circular sequences can span the origin.
+    strand : int, optional
+        1 for the watson strand only, -1 for the crick strand only, 0 (default) for both.
+    nested : bool, optional
+        If True, an ORF is reported for every start codon. By default only the
+        longest ORF ending with each stop codon is reported.
+
+    Returns
+    -------
+    OrfTable
+    """
+    dna = getattr(seq, "seq", seq)
+    if circular is None:
+        circular = bool(getattr(dna, "circular", False))
+    text = str(dna).encode("ascii")
+    length = len(text)
+    code = _unambiguous_dna_by_id[table]
+    starts = code.start_codons if start_codons is None else start_codons
+    stops = code.stop_codons
+
+    strands = []
+    if strand >= 0:
+        strands.append((1, text))
+    if strand <= 0:
+        strands.append((-1, text[::-1].translate(_complement)))
+
+    orf_starts, orf_stops, orf_strands = [], [], []
+    for sign, strand_text in strands:
+        if circular and length:
+            strand_text = strand_text * 4 + strand_text[:2]
+        st, sp = _search(strand_text, length, starts, stops, minsize, nested, circular)
+        if sign == -1:
+            # Coordinates on the watson strand
+            st, sp = length - sp, length - st
+            if circular:
+                # ORFs spanning the origin start on the last turn around the sequence
+                offset = st % length - st
+                st, sp = st + offset, sp + offset
+        orf_starts.append(st)
+        orf_stops.append(sp)
+        orf_strands.append(_np.full(len(st), sign, dtype=_np.int8))
+
+    return OrfTable(
+        text.decode("ascii"),
+        _np.concatenate(orf_starts),
+        _np.concatenate(orf_stops),
+        _np.concatenate(orf_strands),
+        circular,
+    )
+
+
+class OrfTable:
+    """Coordinates of open reading frames.
+
+    The ORFs are sorted by length, longest first. Each ORF is described by
+    its start and stop positions on the watson strand (stop codon included)
+    and its strand (1 or -1). For circular sequences, stop can be larger than
+    the length of the sequence when the ORF spans the origin.
+
+    Attributes
+    ----------
+    start : numpy.ndarray
+    stop : numpy.ndarray
+    strand : numpy.ndarray
+    circular : bool
+
+    Examples
+    --------
+    >>> from pydna.orf import find_orfs
+    >>> orfs = find_orfs("aTAAaaaATGcc", minsize=1, circular=True)
+    >>> orfs.start, orfs.stop, orfs.strand
+    (array([7]), array([16]), array([1], dtype=int8))
+    >>> orfs.seq(0)
+    Seq('ATGccaTAA')
+    """
+
+    def __init__(self, sequence: str, start, stop, strand, circular: bool):
+        order = _np.lexsort((start, start - stop))
+        self.start = start[order]
+        self.stop = stop[order]
+        self.strand = strand[order]
+        self.circular = circular
+        self._sequence = sequence
+
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, index):
+        return int(self.start[index]), int(self.stop[index]), int(self.strand[index])
+
+    def __iter__(self):
+        return zip(self.start.tolist(), self.stop.tolist(), self.strand.tolist())
+
+    def __repr__(self):
+        return f"OrfTable({len(self)} ORFs)"
+
+    @property
+    def lengths(self):
+        """Lengths of the ORFs in base pairs, stop codons included."""
+        return self.stop - self.start
+
+    def seq(self, index):
+        """The sequence of ORF number index, as it is read (5'-3' on its own strand)."""
+        from pydna.seq import Seq
+
+        start, stop, strand = self[index]
+        sequence = self._sequence
+        if stop > len(sequence):
+            sequence = sequence * (stop // len(sequence) + 1)
+        orf = Seq(sequence[start:stop])
+        return orf if strand == 1 else orf.reverse_complement()
+
+    def seqs(self):
+        """Generator of the sequences of all ORFs."""
+        return (self.seq(index) for index in range(len(self)))
+
+    def translations(self, table=1):
+        """Generator of the amino acid sequences of all ORFs."""
+        return (seq.translate(table=table, to_stop=True) for seq in self.seqs())
+
+
+if __name__ == "__main__":
+    import os as _os
+
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
@@ -5,25 +5,39 @@
 # license.  Please see the LICENSE.txt file that should have been included
 # as part of this package.
 
-"""Provides two functions, parse and parse_primers"""
+"""Provides the functions parse, iparse, parse_many and parse_primers"""
 
 import os as _os
 import re as _re
 import io as _io
+import gzip as _gzip
+import bz2 as _bz2
+import contextlib as _contextlib
+import hashlib as _hashlib
+import logging as _logging
+import pickle as _pickle
+import tempfile as _tempfile
 import textwrap as _textwrap
 from Bio import SeqIO as _SeqIO
 from pydna.genbankfile import GenbankFile as _GenbankFile
 from pydna.dseqrecord import Dseqrecord as _Dseqrecord
+from pydna.feature_store import LazyFeatureStore as _LazyFeatureStore
 from pydna.primer import Primer as _Primer
 from pydna.amplify import pcr as _pcr
-from copy import deepcopy as _deepcopy
-from Bio.SeqFeature import SeqFeature as _SeqFeature
 import xml.etree.ElementTree as _et
+from pydna import __version__ as _version
+from collections import Counter as _Counter
+from concurrent.futures import ProcessPoolExecutor as _ProcessPoolExecutor
+from concurrent.futures import as_completed as _as_completed
+from typing import NamedTuple as _NamedTuple
+from typing import Optional as _Optional
+
+_module_logger = _logging.getLogger("pydna." + __name__)
 
 # "^>.+?^(?=$|LOCUS|ID|>|\#)|^(?:LOCUS|ID).+?^//"
 # "(?:^>.+\n^(?:^[^>]+?)(?=\n\n|>|^LOCUS|ID))|(?:(?:^LOCUS|ID)(?:(?:.|\n)+?)^//)"
 
-gb_fasta_embl_regex = r"(?:>.+\n^(?:^[^>]+?)(?=\n\n|>|LOCUS|ID))|(?:(?:LOCUS|ID)(?:(?:.|\n)+?)^//)"
+gb_fasta_embl_regex = r"(?:>.+\n^(?:^[^>]+?)(?=\n\n|>|LOCUS|ID))|(?:(?:LOCUS|ID)[\s\S]+?^//)"
 
 # The gb_fasta_embl_regex is meant to be able to extract sequences from
 # text where sequences are mixed with other contents as well
@@ -34,50 +48,327 @@ def extract_from_text(text):
     return _re.findall(gb_fasta_embl_regex, _textwrap.dedent(str(text) + "\n\n"), flags=_re.MULTILINE)
 
 
-def embl_gb_fasta(text, ds, path=None):
+# Formats tried, in order, for records that sniff_format does not recognize
+_formats = ("embl", "genbank", "fasta")
 
-    chunks = extract_from_text(text)
-    result_list = []
+# Number of records parsed in the format found by sniff_format, by the
+# fallback to trying all formats and records that could not be parsed.
+format_counts = _Counter()
 
-    for chunk in chunks:
-        handle = _io.StringIO(chunk)
-        circular = False
+
+def sniff_format(chunk):
+    """The format of a record from its first line, "embl", "genbank", "fasta" or None.
+
+    >>> from pydna.parsers import sniff_format
+    >>> sniff_format("LOCUS       name  3 bp    DNA     linear   UNK 01-JAN-1980")
+    'genbank'
+    """
+    if chunk.startswith(">"):
+        return "fasta"
+    if chunk.startswith("LOCUS"):
+        return "genbank"
+    if chunk.startswith("ID"):
+        return "embl"
+    return None
+
+
+def _read_chunk(chunk):
+    """The SeqRecord in chunk and its format, or (None, None) (PRIVATE)."""
+    sniffed = sniff_format(chunk)
+    formats = (sniffed,) + tuple(f for f in _formats if f != sniffed) if sniffed else _formats
+    for fmt in formats:
         try:
-            parsed = _SeqIO.read(handle, "embl")
+            parsed = _SeqIO.read(_io.StringIO(chunk), fmt)
         except ValueError:
-            handle.seek(0)
-            try:
-                parsed = _SeqIO.read(handle, "genbank")
-                if "circular" in str(parsed.annotations.get("topology")).lower():
-                    circular = True
-            except ValueError:
-                handle.seek(0)
-                try:
-                    parsed = _SeqIO.read(handle, "fasta")
-                except ValueError:
-                    parsed = ""
-        handle.close()
+            continue
+        format_counts[fmt if fmt == sniffed else "fallback"] += 1
+        return parsed, fmt
+    format_counts["unparsed"] += 1
+    return None, None
+
+
+# The first line after the feature table of a GenBank record
+_feature_table_end = _re.compile(r"^\S", flags=_re.MULTILINE)
+
+
+def _split_feature_table(chunk):
+    """The GenBank record in chunk without its feature table, and the feature table (PRIVATE)."""
+    start = chunk.find("\nFEATURES") + 1
+    newline = chunk.find("\n", start)
+    if not start or newline == -1:
+        return chunk, ""
+    end = _feature_table_end.search(chunk, newline + 1)
+    end = end.start() if end else len(chunk)
+    return chunk[:start] + chunk[end:], chunk[start:end]
+
+
+def _genbank_features(locus, table):
+    """Features parsed from the feature table of a GenBank record with the given LOCUS line (PRIVATE)."""
+    return _SeqIO.read(_io.StringIO(f"{locus}\n{table}ORIGIN\n//\n"), "genbank").features
+
+
+def _seqrecords(text, features=True):
+    """Generator of (SeqRecord, circular) for the records in text (PRIVATE).
+
+    With features False or "lazy", the feature tables of GenBank records
+    are cut out before parsing. Lazy records get a LazyFeatureStore that
+    parses the feature table when the features are used.
+    """
+    for chunk in extract_from_text(text):
+        circular = False
+        table = ""
+        if features is not True and sniff_format(chunk) == "genbank":
+            chunk, table = _split_feature_table(chunk)
+        parsed, fmt = _read_chunk(chunk)
+        if fmt == "genbank" and "circular" in str(parsed.annotations.get("topology")).lower():
+            circular = True
         if "circular" in chunk.splitlines()[0].lower().split():
             # hack to pick up topology from malformed files
             circular = True
         if parsed:
-            # TODO: clean up !
-            nfs = [_SeqFeature() for f in parsed.features]
-            for f, nf in zip(parsed.features, nfs):
-                nf.__dict__ = _deepcopy(f.__dict__)
-            parsed.features = nfs
-            if ds and path:
-                result_list.append(_GenbankFile.from_SeqRecord(parsed, circular=circular, path=path))
-            elif ds:
-                result_list.append(_Dseqrecord.from_SeqRecord(parsed, circular=circular))
+            if not features:
+                parsed.features = []
+            elif table and fmt == "genbank":
+                parsed.features = _LazyFeatureStore(_genbank_features, chunk.split("\n", 1)[0], table)
+            yield parsed, circular
+
+
+def _convert(parsed, circular, ds, path=None):
+    """Dseqrecord, GenbankFile or SeqRecord made from a parsed SeqRecord (PRIVATE)."""
+    # The features of the new SeqRecord are not shared, so the
+    # Dseqrecord takes them over without copying
+    if ds and path:
+        return _GenbankFile.from_SeqRecord(parsed, circular=circular, path=path)
+    elif ds:
+        return _Dseqrecord.from_SeqRecord(parsed, circular=circular)
+    parsed.annotations.update({"molecule_type": "DNA"})
+    return parsed
+
+
+def embl_gb_fasta(text, ds, path=None, features=True):
+    """Parse the EMBL, GenBank and FASTA records in text.
+
+    The format of each record is found by :func:`sniff_format`. If that
+    fails, the record is read as EMBL, GenBank and FASTA, in that order.
+    The number of records parsed in each way is kept in format_counts.
+    See :func:`parse` for the features argument.
+    """
+    if not ds and features == "lazy":
+        features = True
+    return [_convert(parsed, circular, ds, path) for parsed, circular in _seqrecords(text, features)]
+
+
+def _open(path):
+    """Open a utf-8 encoded text file, which can be compressed with gzip or bzip2 (PRIVATE).
+
+    The compression is detected from the first bytes of the file.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(3)
+    if magic[:2] == b"\x1f\x8b":
+        return _gzip.open(path, "rt", encoding="utf-8")
+    if magic == b"BZh":
+        return _bz2.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _read(path):
+    """Text of a file, which can be compressed with gzip or bzip2 (PRIVATE)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = f.read()
+    except UnicodeDecodeError:
+        compressed = True
+    else:
+        compressed = raw.startswith("BZh")
+    if compressed:
+        with _open(path) as f:
+            raw = f.read()
+    return raw
+
+
+def _cache_file(path):
+    """Name of the file in which the records parsed from path are cached (PRIVATE)."""
+    digest = _hashlib.sha1(_os.path.abspath(path).encode("utf-8")).hexdigest()
+    return _os.path.join(_os.environ["pydna_data_dir"], "parsed", f"{digest}.pickle")
+
+
+def _file_seqrecords(path, features=True):
+    """List of (SeqRecord, circular) for the records in a file (PRIVATE).
+
+    If "pydna.parsers.parse" is among the cached functions (the
+    pydna_cached_funcs environment variable), the records are pickled in
+    the pydna data directory. They are used as long as the absolute path,
+    modification time and size of the file and the pydna version are the
+    same. Only records with all features are cached.
+
+    An IOError is only raised if the file can not be read. Errors reading
+    or writing the cache are logged and the file is parsed without it.
+    """
+    if features is not True or "pydna.parsers.parse" not in _os.getenv("pydna_cached_funcs", ""):
+        return list(_seqrecords(_read(path), features))
+    stat = _os.stat(path)
+    key = (_os.path.abspath(path), stat.st_mtime_ns, stat.st_size, _version)
+    cache_file = _cache_file(path)
+    try:
+        with open(cache_file, "rb") as f:
+            if _pickle.load(f) == key:
+                return _pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, _pickle.UnpicklingError) as error:
+        _module_logger.info("Could not read the cache file %s: %s", cache_file, error)
+    records = list(_seqrecords(_read(path)))
+    _write_cache(cache_file, key, records)
+    return records
+
+
+def _write_cache(cache_file, key, records):
+    """Pickle the key and the records to cache_file, errors are logged (PRIVATE)."""
+    name = None
+    try:
+        _os.makedirs(_os.path.dirname(cache_file), exist_ok=True)
+        # The cache file is replaced at once, so that other processes never read a partial file
+        with _tempfile.NamedTemporaryFile("wb", dir=_os.path.dirname(cache_file), delete=False) as f:
+            name = f.name
+            _pickle.dump(key, f, _pickle.HIGHEST_PROTOCOL)
+            _pickle.dump(records, f, _pickle.HIGHEST_PROTOCOL)
+        _os.replace(name, cache_file)
+    except OSError as error:
+        _module_logger.warning("Could not write the cache file %s: %s", cache_file, error)
+        if name is not None:
+            try:
+                _os.remove(name)
+            except OSError:
+                pass
+
+
+@_contextlib.contextmanager
+def _text_handle(handle):
+    """Text mode version of a file-like object, decompressed if needed (PRIVATE).
+
+    The file-like object is detached from the wrappers on exit, so that it
+    is not closed.
+    """
+    if isinstance(handle, _io.TextIOBase):
+        yield handle
+        return
+    buffered = decompressed = None
+    if not hasattr(handle, "peek"):
+        # the first bytes are needed to detect the compression
+        buffered = handle = _io.BufferedReader(handle)
+    magic = handle.peek(3)[:3]
+    if magic[:2] == b"\x1f\x8b":
+        decompressed = _gzip.GzipFile(fileobj=handle)
+    elif magic == b"BZh":
+        decompressed = _bz2.BZ2File(handle)
+    text = _io.TextIOWrapper(decompressed or handle, encoding="utf-8")
+    try:
+        yield text
+    finally:
+        text.detach()
+        if decompressed is not None:
+            # does not close a file object it was given
+            decompressed.close()
+        if buffered is not None:
+            buffered.detach()
+
+
+def split_records(lines):
+    r"""Generator of the text of each EMBL, GenBank or FASTA record in lines of text.
+
+    Records are recognized like in :func:`extract_from_text`, a line at a
+    time. FASTA records start with a line beginning with ">" and end before
+    an empty line or the start of the next record. EMBL and GenBank records
+    start with a line beginning with ID or LOCUS and end with a line
+    beginning with //. Text outside of records is skipped.
+
+    >>> from pydna.parsers import split_records
+    >>> list(split_records([">a\n", "aaa\n", "\n", "text\n", ">b\n", "ccc\n"]))
+    ['>a\naaa\n', '>b\nccc\n']
+    """
+    record = []
+    end = None
+    for line in lines:
+        if end == "//":
+            record.append(line)
+            if line.startswith("//"):
+                yield "".join(record)
+                record, end = [], None
+            continue
+        if end == ">" and (not line.strip() or line.startswith((">", "LOCUS", "ID"))):
+            yield "".join(record)
+            record, end = [], None
+        if end is None:
+            if line.startswith(">"):
+                end = ">"
+            elif line.startswith(("LOCUS", "ID")):
+                end = "//"
             else:
-                parsed.annotations.update({"molecule_type": "DNA"})
-                result_list.append(parsed)
+                continue
+        record.append(line)
+    if end == ">":
+        yield "".join(record)
+
+
+def iparse(data, ds=True, features=True):
+    """Generator of the DNA sequences found in data, one at a time.
+
+    Unlike :func:`parse`, files are read incrementally and each record is
+    parsed when it is reached, so files larger than the available memory
+    can be parsed. Files compressed with gzip or bzip2 are decompressed on
+    the fly.
+
+    Parameters
+    ----------
+    data : str, path, file-like object or iterable
+        A path to a file, a string with sequences, a file-like object open in
+        text or binary mode or an iterable of these. File-like objects are
+        not closed.
+
+    ds : bool
+        If True double stranded :class:`Dseqrecord` objects are returned,
+        otherwise Bio.SeqRecord objects.
+
+    features : bool or "lazy"
+        See :func:`parse`.
+
+    Yields
+    ------
+    Dseqrecord or SeqRecord
 
-    return result_list
+    See Also
+    --------
+    parse
+
+    Notes
+    -----
+    Records are split by :func:`split_records`. Unlike :func:`parse`, text
+    around the sequences is not dedented, so the records have to start at
+    the beginning of the lines.
+    """
+    if not hasattr(data, "__iter__") or isinstance(data, (str, bytes)) or hasattr(data, "read"):
+        data = (data,)
+
+    for item in data:
+        path = None
+        if hasattr(item, "read"):
+            # file-like objects are not closed
+            handle = _text_handle(item)
+        else:
+            try:
+                handle = _open(item)
+            except (IOError, TypeError, ValueError):
+                # item was not a path
+                handle = _contextlib.nullcontext(_io.StringIO(str(item)))
+            else:
+                path = item
+        with handle as lines:
+            for text in split_records(lines):
+                yield from embl_gb_fasta(text, ds, path, features)
 
 
-def parse(data, ds=True):
+def parse(data, ds=True, features=True):
     """Return *all* DNA sequences found in data.
 
     If no sequences are found, an empty list is returned. This is a greedy
@@ -92,7 +383,9 @@ def parse(data, ds=True):
            The file will be read in text
            mode and parsed for EMBL, FASTA
            and Genbank sequences. Can be
-           a string or a Path object.
+           a string or a Path object. Files
+           compressed with gzip or bzip2
+           are decompressed.
 
         2. a string containing one or more
            sequences in EMBL, GENBANK,
@@ -106,11 +399,25 @@ def parse(data, ds=True):
         If False single stranded :class:`Bio.SeqRecord` [#]_ objects are
         returned.
 
+    features : bool or "lazy"
+        If False, the sequences have no features. Feature tables of
+        GenBank records are skipped without being parsed, which is much
+        faster for large annotated records. If "lazy", the feature table
+        of each GenBank record is parsed when the features of the
+        Dseqrecord are first used, for example when it is sliced.
+        SeqRecords (ds=False) always get their features with "lazy".
+
     Returns
     -------
     list
         contains Dseqrecord or SeqRecord objects
 
+    Notes
+    -----
+    Add "pydna.parsers.parse" to the pydna_cached_funcs environment variable
+    to keep the records parsed from files in the pydna data directory. The
+    cached records are used until the file changes.
+
     References
     ----------
     .. [#] http://biopython.org/wiki/SeqRecord
@@ -118,6 +425,7 @@ def parse(data, ds=True):
     See Also
     --------
     read
+    iparse
 
     """
 
@@ -131,20 +439,122 @@ def parse(data, ds=True):
     for item in data:
         try:
             # item is a path to a utf-8 encoded text file?
-            with open(item, "r", encoding="utf-8") as f:
-                raw = f.read()
+            parsed = _file_seqrecords(item, features if ds else bool(features))
         except IOError:
             # item was not a path, add sequences parsed from item
-            raw = item
-            path = None
+            sequences.extend(embl_gb_fasta(item, ds, features=features))
         else:
             # item was a readable text file, seqences are parsed from the file
-            path = item
-        finally:
-            sequences.extend(embl_gb_fasta(raw, ds, path))
+            sequences.extend(_convert(record, circular, ds, item) for record, circular in parsed)
     return sequences
 
 
+# Extensions of the files found by parse_many in directories
+suffixes = (".gb", ".gbk", ".genbank", ".ape", ".embl", ".fasta", ".fas", ".fa", ".fna", ".txt")
+
+
+class ParsedFile(_NamedTuple):
+    """The sequences parsed from a file by :func:`parse_many`."""
+
+    path: str
+    records: list
+    error: _Optional[Exception]
+
+
+def _files(data):
+    """Generator of the paths in data, with the files in directories (PRIVATE)."""
+    if isinstance(data, (str, _os.PathLike)):
+        data = (data,)
+    for path in data:
+        if not _os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in _os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                stem, ext = _os.path.splitext(name)
+                if ext in (".gz", ".bz2"):
+                    ext = _os.path.splitext(stem)[1]
+                if ext.lower() in suffixes:
+                    yield _os.path.join(root, name)
+
+
+def _parse_file(path):
+    """Parsed SeqRecords and circular flags in a file, or the error (PRIVATE).
+
+    SeqRecords are returned instead of Dseqrecords as they are smaller to
+    send from a worker process. The format_counts added while parsing the
+    file are also returned, so that they can be added to the format_counts
+    of the parent process.
+    """
+    before = format_counts.copy()
+    try:
+        parsed, error = _file_seqrecords(path), None
+    except Exception as exception:
+        parsed, error = [], exception
+    return parsed, error, format_counts - before
+
+
+def _parsed_file(path, result, ds):
+    """ParsedFile from the result of _parse_file (PRIVATE)."""
+    parsed, error, counts = result
+    return ParsedFile(path, [_convert(record, circular, ds, path) for record, circular in parsed], error)
+
+
+def parse_many(data, workers=None, ds=True, ordered=True):
+    """Generator of the sequences in many files, parsed by a pool of worker processes.
+
+    Parameters
+    ----------
+    data : str, path or iterable
+        Paths to files or directories. Directories are searched recursively
+        for files ending with one of the suffixes in parsers.suffixes,
+        optionally followed by .gz or .bz2.
+
+    workers : int, optional
+        Number of worker processes, as many as the number of CPUs if None.
+        With workers=1, the files are parsed in this process. The records
+        parsed by the workers are counted in format_counts like the ones
+        parsed in this process.
+
+    ds : bool
+        If True GenbankFile objects are returned, otherwise Bio.SeqRecord
+        objects, like in :func:`parse`.
+
+    ordered : bool
+        If True, the results are in the order of the files. Otherwise they
+        are returned as soon as each file is parsed.
+
+    Yields
+    ------
+    ParsedFile
+        The path, the list of sequences and the exception raised while
+        reading the file, or None. Errors do not stop the other files from
+        being parsed.
+
+    See Also
+    --------
+    parse
+    """
+    paths = list(_files(data))
+    workers = min(workers or _os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        for path in paths:
+            yield _parsed_file(path, _parse_file(path), ds)
+        return
+    with _ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_parse_file, path): path for path in paths}
+        try:
+            for future in futures if ordered else _as_completed(futures):
+                result = future.result()
+                format_counts.update(result[2])
+                yield _parsed_file(futures[future], result, ds)
+        finally:
+            # Files not yet parsed when the generator is closed are skipped
+            for future in futures:
+                future.cancel()
+
+
 def parse_primers(data):
     """docstring."""
     return [_Primer(x) for x in parse(data, ds=False)]
@@ -10,7 +10,7 @@ from pydna.parsers import parse as _parse
 from pydna.primer import Primer as _Primer
 
 
-def read(data, ds=True):
+def read(data, ds=True, features=True):
     """This function is similar the :func:`parse` function but expects one and only
     one sequence or and exception is thrown.
 
@@ -21,6 +21,9 @@ def read(data, ds=True):
     ds : bool
         Double stranded or single stranded DNA, if True return
         Dseqrecord objects, else Bio.SeqRecord objects.
+    features : bool or "lazy"
+        Skip the features or parse them when they are first used, see
+        :func:`parse`.
 
     Returns
     -------
@@ -38,7 +41,7 @@ def read(data, ds=True):
 
     """
 
-    results = _parse(data, ds)
+    results = _parse(data, ds, features)
     try:
         results = results.pop()
     except IndexError:
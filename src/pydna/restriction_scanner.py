@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Single pass search for the recognition sites of many restriction enzymes.
+
+Searching a sequence with a RestrictionBatch from Biopython runs one regular
+expression search per enzyme. The :class:`RestrictionScanner` compiles the
+recognition sites of all enzymes into one Aho-Corasick automaton that finds
+the sites of all enzymes in one pass over the sequence.
+
+Recognition sites are expanded into concrete sequences over the IUPAC
+alphabet. Sites that are too degenerate to expand completely (like XcmI,
+CCANNNNNNNNNTGG) are represented by their most specific part (an anchor)
+and each candidate position is verified with the regular expression of the
+enzyme.
+
+The results are identical to those of :meth:`Bio.Restriction.RestrictionBatch.search`.
+
+>>> from Bio.Restriction import RestrictionBatch, BamHI, EcoRI, BsaI
+>>> from pydna.dseq import Dseq
+>>> from pydna.restriction_scanner import RestrictionScanner
+>>> scanner = RestrictionScanner([BamHI, EcoRI, BsaI])
+>>> seq = Dseq("GGATCCaaGAATTCaaGAGACCaaaaaa")
+>>> sorted(scanner.search(seq).items(), key=str)
+[(BamHI, [2]), (BsaI, [12]), (EcoRI, [10])]
+>>> scanner.search(seq) == RestrictionBatch([BamHI, EcoRI, BsaI]).search(seq)
+True
+"""
+
+import itertools as _itertools
+from functools import lru_cache as _lru_cache
+
+from Bio.Data.IUPACData import ambiguous_dna_values as _ambiguous_dna_values
+from Bio.Restriction.Restriction import FormattedSeq as _FormattedSeq
+from pydna.utils import rc as _rc
+
+# Maximum number of concrete sequences a recognition site (or the anchor of a
+# site) is expanded into.
+max_variants = 64
+
+_codes = {"A": 0, "C": 1, "G": 2, "T": 3}
+# All characters other than A, C, G and T send the automaton back to the root
+_translation = bytes(_codes.get(chr(i), 4) for i in range(256))
+
+
+def _anchor(site: str):
+    """Most specific part of a recognition site that expands into at most max_variants sequences.
+
+    Returns the offset of the anchor in the site and the anchor. N is never part of
+    an anchor as it corresponds to "." in the regular expressions of Biopython.
+    """
+    best_length, best_variants, best_start = 0, 0, 0
+    for start in range(len(site)):
+        variants = 1
+        for stop in range(start, len(site)):
+            if site[stop] == "N":
+                break
+            variants *= len(_ambiguous_dna_values[site[stop]])
+            if variants > max_variants:
+                break
+            length = stop - start + 1
+            if length > best_length or (length == best_length and variants < best_variants):
+                best_length, best_variants, best_start = length, variants, start
+    return best_start, site[best_start : best_start + best_length]
+
+
+def _expand(site: str):
+    """All concrete (A, C, G, T) sequences matching an IUPAC sequence."""
+    return ["".join(p) for p in _itertools.product(*(_ambiguous_dna_values[c] for c in site))]
+
+
+class RestrictionScanner:
+    """Find the recognition sites of a collection of restriction enzymes in one pass.
+
+    Parameters
+    ----------
+    enzymes : iterable of Bio.Restriction enzymes or a RestrictionBatch
+
+    Examples
+    --------
+    >>> from Bio.Restriction import CommOnly
+    >>> from pydna.dseq import Dseq
+    >>> from pydna.restriction_scanner import RestrictionScanner
+    >>> seq = Dseq("aaGAATTCaaGAATTCaa")
+    >>> scanner = RestrictionScanner(CommOnly)
+    >>> result = scanner.search(seq)
+    >>> result == CommOnly.search(seq)
+    True
+    """
+
+    def __init__(self, enzymes):
+        self.enzymes = tuple(sorted(set(enzymes), key=str))
+        self.max_size = max((e.size for e in self.enzymes), default=0)
+        # Each pattern is (enzyme index, forward strand, offset of anchor end in site, exact)
+        patterns = {}
+        self._unanchored = []
+        for index, enzyme in enumerate(self.enzymes):
+            if len(enzyme.site) != enzyme.size or not set(enzyme.site) <= set(_ambiguous_dna_values):
+                # Unusual site definitions are searched with the regular expression only
+                self._unanchored.append(index)
+                continue
+            sites = [(enzyme.site, True)]
+            if not enzyme.is_palindromic():
+                sites.append((_rc(enzyme.site), False))
+            for site, forward in sites:
+                offset, anchor = _anchor(site)
+                if not anchor:
+                    self._unanchored.append(index)
+                    break
+                exact = len(anchor) == len(site)
+                for word in _expand(anchor):
+                    patterns.setdefault(word, []).append((index, forward, offset + len(anchor), exact))
+        self._matchers = [(e.compsite.match, str(e)) for e in self.enzymes]
+        self._build(patterns)
+
+    def _build(self, patterns):
+        """Compile the words into a complete Aho-Corasick automaton (PRIVATE).
+
+        The automaton is stored as a transition table (one list of five next
+        states per state) so that scanning is a table lookup per character.
+        """
+        goto = [[None] * 5]
+        output = [[]]
+        for word, hits in patterns.items():
+            state = 0
+            for char in word:
+                code = _codes[char]
+                if goto[state][code] is None:
+                    goto[state][code] = len(goto)
+                    goto.append([None] * 5)
+                    output.append([])
+                state = goto[state][code]
+            output[state].extend(hits)
+
+        fail = [0] * len(goto)
+        queue = []
+        for code in range(5):
+            child = goto[0][code]
+            if child is None:
+                goto[0][code] = 0
+            else:
+                queue.append(child)
+        for state in queue:  # breadth first, the queue grows while iterating
+            output[state].extend(output[fail[state]])
+            for code in range(5):
+                child = goto[state][code]
+                if child is None:
+                    goto[state][code] = goto[fail[state]][code]
+                else:
+                    fail[child] = goto[fail[state]][code]
+                    queue.append(child)
+        self._goto = goto
+        self._output = [tuple(o) for o in output]
+
+    def sites(self, dna, linear=True):
+        """Start positions of recognition sites for each enzyme.
+
+        Returns two lists with one set per enzyme, the 1-based start positions of
+        sites on the watson strand and the positions of sites found only on the
+        crick strand. This is how Biopython represents sites before they are
+        translated into cut positions.
+        """
+        fseq = dna if isinstance(dna, _FormattedSeq) else _FormattedSeq(dna, linear)
+        data = fseq.data
+        length = len(fseq)
+        text = data if fseq.is_linear() else data + data[1 : self.max_size]
+        forward_sites = [set() for e in self.enzymes]
+        reverse_sites = [set() for e in self.enzymes]
+        candidates = [(index, start) for index in self._unanchored for start in range(1, length + 1)]
+
+        goto = self._goto
+        output = self._output
+        state = 0
+        for position, code in enumerate(text.encode("ascii").translate(_translation)):
+            state = goto[state][code]
+            hits = output[state]
+            if hits:
+                for index, forward, end, exact in hits:
+                    start = position - end + 1
+                    if not 1 <= start <= length:
+                        continue
+                    if exact:
+                        (forward_sites if forward else reverse_sites)[index].add(start)
+                    else:
+                        candidates.append((index, start))
+
+        # Candidates found by an anchor are verified with the regular expression of the enzyme
+        matchers = self._matchers
+        for index, start in candidates:
+            match, name = matchers[index]
+            m = match(text, start)
+            if m:
+                (forward_sites if m.group(name) else reverse_sites)[index].add(start)
+
+        for fwd, rev in zip(forward_sites, reverse_sites):
+            rev -= fwd
+        return forward_sites, reverse_sites
+
+    def search(self, dna, linear=True):
+        """Cut positions for all enzymes.
+
+        Returns a dict with the same content as :meth:`Bio.Restriction.RestrictionBatch.search`,
+        enzymes as keys and lists of 1-based cut positions as values.
+        """
+        fseq = dna if isinstance(dna, _FormattedSeq) else _FormattedSeq(dna, linear)
+        forward_sites, reverse_sites = self.sites(fseq)
+        result = {}
+        for enzyme, fwd, rev in zip(self.enzymes, forward_sites, reverse_sites):
+            # The cut positions are calculated by the enzyme itself in the same
+            # way as in the _search methods of Bio.Restriction
+            results = [r for s in sorted(fwd) for r in enzyme._modify(s)]
+            if rev:
+                results += [r for s in sorted(rev) for r in enzyme._rev_modify(s)]
+            if results:
+                if not enzyme.is_palindromic():
+                    results.sort()
+                enzyme.dna = fseq
+                enzyme.results = results
+                enzyme._drop()
+                results = enzyme.results
+            result[enzyme] = results
+        return result
+
+
+@_lru_cache(maxsize=32)
+def _scanner(enzymes: frozenset):
+    return RestrictionScanner(enzymes)
+
+
+def scanner(enzymes):
+    """A RestrictionScanner for the enzymes, compiled once per set of enzymes.
+
+    >>> from Bio.Restriction import CommOnly
+    >>> from pydna.restriction_scanner import scanner
+    >>> scanner(CommOnly) is scanner(list(CommOnly))
+    True
+    """
+    return _scanner(frozenset(enzymes))
+
+
+def precompute(sequences, batch=None):
+    """Search many sequences for the enzymes in a batch.
+
+    The sequences can be Dseq or Dseqrecord objects. The cut positions are
+    stored in the cache of each sequence (see :meth:`pydna.dseq.Dseq.restriction_search`),
+    so that subsequent calls to cutters, unique_cutters, get_cutsites etc. for
+    enzymes in the batch do not search the sequence again. All sequences share
+    one compiled RestrictionScanner.
+
+    Returns a list with the result of restriction_search for each sequence.
+
+    >>> from Bio.Restriction import CommOnly, EcoRI
+    >>> from pydna.dseqrecord import Dseqrecord
+    >>> from pydna.restriction_scanner import precompute
+    >>> records = [Dseqrecord("aaGAATTCaa"), Dseqrecord("GAATTCaaGAATTC", circular=True)]
+    >>> results = precompute(records, CommOnly)
+    >>> [result[EcoRI] for result in results]
+    [[4], [2, 10]]
+    >>> [EcoRI in record.unique_cutters() for record in records]
+    [True, False]
+    """
+    if batch is None:
+        from Bio.Restriction import CommOnly as batch
+    results = []
+    for sequence in sequences:
+        dseq = getattr(sequence, "seq", sequence)
+        # The cutter methods search circular sequences as linear, cutsites
+        # are searched according to the topology of the sequence
+        dseq.restriction_search(batch, linear=True)
+        results.append(dseq.restriction_search(batch))
+    return results
+
+
+if __name__ == "__main__":
+    import os as _os
+
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
@@ -16,6 +16,7 @@ from pydna.codon import stop as _stop
 from pydna.codon import n_end as _n_end
 from seguid import lsseguid as _lsseguid
 from pydna.utils import rc as _rc
+from pydna.orf import find_orfs as _find_orfs
 
 from Bio.SeqUtils import seq3 as _seq3
 from Bio.SeqUtils import gc_fraction as _GC
@@ -84,8 +85,21 @@ class Seq(_Seq):
         x.add_row(val)
         return x
 
-    def orfs(self, minsize=30):
-        """docstring."""
+    def orfs(self, minsize=30, all_starts=False):
+        """Open reading frames on the forward strand, longest first.
+
+        By default, ORFs are found by a regular expression search for ATG,
+        at least minsize codons and a stop codon, starting again one base
+        after the start of each ORF found.
+
+        If all_starts is True, an ORF is returned for each ATG followed by
+        at least minsize codons and an in frame stop codon, using
+        :func:`pydna.orf.find_orfs`. See that function for all six frames,
+        circular sequences and other genetic codes.
+        """
+        if all_starts:
+            orfs = _find_orfs(self, minsize=minsize, circular=False, strand=1, nested=True)
+            return [self[start:stop] for start, stop, strand in orfs]
         orf = _re.compile(f"ATG(?:...){{{minsize},}}?(?:TAG|TAA|TGA)", flags=_re.IGNORECASE)
         start = 0
         matches = []
@@ -585,8 +585,11 @@ class SeqRecord(_SeqRecord):
         return not self.__eq__(other)
 
     def __hash__(self):
-        """__hash__ must be based on __eq__."""
-        return hash((str(self.seq).lower(), str(tuple(sorted(self.__dict__.items())))))
+        """__hash__ must be based on __eq__.
+
+        Equal records have equal sequences, so only the sequence is hashed.
+        """
+        return hash(str(self.seq))
 
     def __str__(self):
         """docstring."""
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Rotation of circular sequences to the origin of a reference.
+
+This module is used by :meth:`pydna.dseqrecord.Dseqrecord.synced`. The
+origin of a circular sequence is moved to the start of the longest match of
+the beginning of the reference sequence, on either strand.
+
+The first limit characters of the reference are looked up in the circular
+sequence and the matches are extended from there. If the seed is found very
+many times, as for low complexity sequences, the reference is compared with
+all positions of the sequence at once, in time proportional to the length
+of the sequences.
+
+:class:`Synchronizer` prepares the reference once and can be used to sync
+many sequences, see also :func:`sync_all`.
+
+>>> from pydna.dseqrecord import Dseqrecord
+>>> from pydna.sync import sync_all
+>>> a = Dseqrecord("gaat", circular=True)
+>>> [str(p.seq) for p in sync_all([Dseqrecord("atgaCCC", circular=True), Dseqrecord("GGGtcat", circular=True)], a)]
+['gaCCCat', 'gaCCCat']
+"""
+
+from pydna.utils import circular_find as _circular_find
+from pydna.utils import common_prefix_length as _common_prefix_length
+
+import copy as _copy
+import logging as _logging
+
+_module_logger = _logging.getLogger("pydna." + __name__)
+
+# Seed matches to extend before comparing all positions
+max_seeds = 100
+
+
+def _reference_string(ref):
+    """Lower case string of a str, Seq, Dseq, SeqRecord or Dseqrecord (PRIVATE)."""
+    if hasattr(ref, "seq"):
+        ref = ref.seq
+    return str(getattr(ref, "watson", ref)).lower()
+
+
+def _z_values(text):
+    """Length of the longest common prefix of text and text[i:] for each i (PRIVATE).
+
+    This is the Z algorithm, which takes linear time also for repetitive text.
+    """
+    n = len(text)
+    z = [0] * n
+    if n:
+        z[0] = n
+    left = right = 0
+    for i in range(1, n):
+        if i < right:
+            z[i] = min(right - i, z[i - left])
+        while i + z[i] < n and text[z[i]] == text[i + z[i]]:
+            z[i] += 1
+        if i + z[i] > right:
+            left, right = i, i + z[i]
+    return z
+
+
+def _all_prefix_matches(s, r, limit):
+    """Longest match of the beginning of r in the circular sequence s, comparing all positions (PRIVATE)."""
+    length = len(s)
+    r = r[: 2 * length]
+    # a match starting in s can not be longer than r
+    z = _z_values(r + "\0" + s + s[: len(r)])[len(r) + 1 : len(r) + 1 + length]
+    size = max(z)
+    return (z.index(size), size) if size >= limit else None
+
+
+def longest_circular_match(s, r, limit):
+    """Longest match of the beginning of r in the circular sequence s.
+
+    The match can span the origin and go at most twice around s. Returns a
+    (start, length) tuple for the longest match of at least limit
+    characters, the one closest to the origin if several are equally long,
+    or None.
+
+    >>> from pydna.sync import longest_circular_match
+    >>> longest_circular_match("ttgaatcc", "ccttg", 3)
+    (6, 5)
+    """
+    length = len(s)
+    if not length or len(r) < limit:
+        return None
+    best = None
+    seed = r[:limit]
+    start = _circular_find(s, seed)
+    seeds = 0
+    while -1 < start < length:
+        seeds += 1
+        if seeds > max_seeds:
+            return _all_prefix_matches(s, r, limit)
+        size = _common_prefix_length(s, r, start)
+        if size == length - start:
+            size += _common_prefix_length(s, r, 0, size)
+        if best is None or size > best[1]:
+            best = start, size
+        start = _circular_find(s, seed, start + 1)
+    return best
+
+
+class Synchronizer:
+    """Rotates circular Dseqrecords to the origin of a reference sequence.
+
+    Parameters
+    ----------
+    ref : str, Seq, Dseq, SeqRecord or Dseqrecord
+    limit : int, optional
+        Shortest match to accept.
+    """
+
+    def __init__(self, ref, limit=25):
+        self.ref = _reference_string(ref)
+        self.limit = limit
+
+    def __repr__(self):
+        return f"Synchronizer({len(self.ref)} bp, limit={self.limit})"
+
+    def offset(self, record):
+        """Start of the match with the reference and True if it is on the reverse strand.
+
+        A TypeError is raised if the sequences have no match.
+        """
+        s = str(record.seq.watson).lower()
+        limit = min(self.limit, self.limit * (len(s) // self.limit) + 1)
+        watson = longest_circular_match(s, self.ref, limit)
+        crick = longest_circular_match(str(record.seq.crick).lower(), self.ref, limit)
+        if not watson and not crick:
+            raise TypeError("There is no overlap between sequences!")
+        start, length = watson or (0, 0)
+        start_rc, length_rc = crick or (0, 0)
+        if length_rc > length:
+            return start_rc, True
+        return start, False
+
+    def __call__(self, record):
+        """A copy of the circular record synced to the reference, see :meth:`pydna.dseqrecord.Dseqrecord.synced`."""
+        if not record.circular:
+            raise TypeError("Only circular DNA can be synced!")
+        start, reverse = self.offset(record)
+        result = record.rc() if reverse else _copy.copy(record)
+        if start:
+            result = result.shifted(start)
+        _module_logger.info("synced")
+        return result
+
+
+def sync_all(records, ref, limit=25):
+    """List of the circular records synced to ref, see :class:`Synchronizer`."""
+    synchronizer = Synchronizer(ref, limit)
+    return [synchronizer(record) for record in records]
+
+
+if __name__ == "__main__":
+    import os as _os
+
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright 2013-2023 by Björn Johansson.  All rights reserved.
+# This code is part of the Python-dna distribution and governed by its
+# license.  Please see the LICENSE.txt file that should have been included
+# as part of this package.
+
+"""Mapping of Sanger sequencing traces to a reference sequence.
+
+ABI trace files are read and mapped in a pool of worker processes and the
+results are returned one at a time as they are ready, so that a large
+number of traces can be mapped without keeping them all in memory. The
+reference is indexed once by :class:`ReferenceIndex`, which keeps the
+positions of all substrings of length k (k-mers) of the reference. A trace is mapped to the diagonal
+(reference position minus trace position) on which most of its k-mers are
+found, on the strand where it matches best.
+
+The result for each trace is a :class:`TraceMatch` with the name of the
+trace, the location of the match on the reference, the fraction of
+identical bases in the match and the strand. Traces that do not have any
+k-mers in common with the reference have no location. Features are only
+added to the reference if asked for, see
+:meth:`pydna.dseqrecord.Dseqrecord.map_traces`.
+
+>>> from Bio.Seq import Seq
+>>> from Bio.SeqRecord import SeqRecord
+>>> from pydna.dseqrecord import Dseqrecord
+>>> from pydna.tracemap import ReferenceIndex
+>>> reference = Dseqrecord("ttgtaacgaacggtgcaataatgattaattatccgtcatcctgacatgtcg", circular=True)
+>>> index = ReferenceIndex(reference, k=8)
+>>> index.map(SeqRecord(Seq("cgacatgtcaggatgacggataattaatcat"), id="read1"))
+TraceMatch(read='read1', location=SimpleLocation(ExactPosition(20), ExactPosition(51), strand=-1), identity=1.0, strand=-1)
+>>> match = index.map(SeqRecord(Seq("catgtcgttgtaacgaac"), id="read2"))
+>>> match.location
+CompoundLocation([SimpleLocation(ExactPosition(44), ExactPosition(51), strand=1), \
+SimpleLocation(ExactPosition(0), ExactPosition(11), strand=1)], 'join')
+"""
+
+import glob as _glob
+import os as _os
+from collections import Counter as _Counter
+from concurrent.futures import ProcessPoolExecutor as _ProcessPoolExecutor
+from typing import NamedTuple as _NamedTuple
+from typing import Optional as _Optional
+
+from Bio import SeqIO as _SeqIO
+from Bio.SeqFeature import Location as _Location
+from Bio.SeqFeature import SimpleLocation as _SimpleLocation
+from pydna._pretty import PrettyTable as _PrettyTable
+from pydna.utils import rc as _rc
+from pydna.utils import shift_location as _shift_location
+
+
+class TraceMatch(_NamedTuple):
+    """The match of a trace with a reference sequence."""
+
+    read: str
+    location: _Optional[_Location]
+    identity: float
+    strand: _Optional[int]
+
+
+def read_trace(path):
+    """Read an ABI trace file into a lower case SeqRecord.
+
+    The path is kept in the "filename" annotation and the fname attribute.
+    """
+    trace = _SeqIO.read(path, "abi").lower()
+    trace.annotations["filename"] = trace.fname = _os.fspath(path)
+    return trace
+
+
+def _pool(paths, workers, function, initializer=None, initargs=()):
+    """Generator of function(path) for the paths, computed by a pool of worker processes (PRIVATE)."""
+    paths = list(paths)
+    workers = min(workers or _os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        if initializer:
+            initializer(*initargs)
+        yield from map(function, paths)
+        return
+    with _ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        yield from executor.map(function, paths, chunksize=max(1, len(paths) // (4 * workers)))
+
+
+def read_traces(paths, workers=None):
+    """Generator of the traces in the ABI files, in order.
+
+    The files are read by a pool of workers processes, as many as the
+    number of CPUs if workers is None. With workers=1, the files are read
+    in this process.
+    """
+    return _pool(paths, workers, read_trace)
+
+
+# The ReferenceIndex used by _map_trace_file in worker processes
+_worker_index = None
+
+
+def _set_worker_index(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _map_trace_file(path):
+    return _worker_index.map(read_trace(path))
+
+
+class ReferenceIndex:
+    """Positions of the k-mers of a reference sequence, for mapping traces.
+
+    Parameters
+    ----------
+    reference : str, Seq, SeqRecord or Dseqrecord
+        Dseqrecords and Dseqs can be circular, in which case matches can
+        span the origin.
+    k : int, optional
+        Length of the exact matches used to find the position of a trace.
+    """
+
+    def __init__(self, reference, k=25):
+        seq = getattr(reference, "seq", reference)
+        self.circular = bool(getattr(seq, "circular", False))
+        self.sequence = str(seq).lower()
+        self.k = k
+        length = len(self.sequence)
+        # Circular references are repeated so that matches can cross the origin
+        self._text = self.sequence * 3 if self.circular else self.sequence
+        kmers = {}
+        for position in range(length if self.circular else length - k + 1):
+            kmers.setdefault(self._text[position : position + k], []).append(position)
+        self._kmers = kmers
+
+    def __len__(self):
+        return len(self.sequence)
+
+    def __repr__(self):
+        return f"ReferenceIndex({len(self)} bp, k={self.k})"
+
+    def _diagonals(self, read):
+        """Counter of reference position - read position for the shared k-mers of read (PRIVATE)."""
+        diagonals = _Counter()
+        kmers, k, length = self._kmers, self.k, len(self)
+        for position in range(len(read) - k + 1):
+            for reference_position in kmers.get(read[position : position + k], ()):
+                diagonal = reference_position - position
+                diagonals[diagonal % length if self.circular else diagonal] += 1
+        return diagonals
+
+    def map(self, trace):
+        """The TraceMatch of a trace, a SeqRecord or string."""
+        name = getattr(trace, "annotations", {}).get("filename") or getattr(trace, "id", None) or "read"
+        read = str(getattr(trace, "seq", trace)).lower()
+        best = None
+        for strand, sequence in ((1, read), (-1, _rc(read))):
+            diagonals = self._diagonals(sequence)
+            if diagonals:
+                diagonal, count = max(diagonals.items(), key=lambda item: (item[1], -item[0]))
+                if best is None or count > best[0]:
+                    best = count, diagonal, strand, sequence
+        if best is None:
+            return TraceMatch(name, None, 0.0, None)
+        count, diagonal, strand, sequence = best
+        return TraceMatch(name, *self._match(sequence, diagonal, strand), strand)
+
+    def _match(self, read, diagonal, strand):
+        """Location and identity of the ungapped match of read on a diagonal (PRIVATE)."""
+        length, k = len(self), self.k
+        # The part of the read that lies on the reference, at most one turn for circular references
+        first = max(0, -diagonal)
+        last = min(len(read), length if self.circular else length - diagonal)
+        text = self._text
+        hits = [i for i in range(first, last - k + 1) if text[diagonal + i : diagonal + i + k] == read[i : i + k]]
+        start, stop = hits[0], hits[-1] + k
+        identity = sum(a == b for a, b in zip(text[diagonal + start : diagonal + stop], read[start:stop]))
+        start, stop = diagonal + start, diagonal + stop
+        if not self.circular:
+            return _SimpleLocation(start, stop, strand), identity / (stop - start)
+        start, stop = start % length, start % length + stop - start
+        if stop <= length:
+            location = _SimpleLocation(start, stop, strand)
+        else:
+            location = _shift_location(_SimpleLocation(start, stop, strand), 0, length)
+        return location, identity / (stop - start)
+
+    def map_all(self, traces):
+        """Generator of the TraceMatches of the traces."""
+        return (self.map(trace) for trace in traces)
+
+
+def trace_table(matches):
+    """Table of the TraceMatches, with read, location, identity and strand columns."""
+    table = _PrettyTable(["read", "location", "identity", "strand"])
+    table.align["read"] = "l"
+    table.align["location"] = "l"
+    for match in matches:
+        table.add_row(
+            [
+                _os.path.basename(match.read),
+                "-" if match.location is None else str(match.location),
+                f"{match.identity:.3f}",
+                {1: "-->", -1: "<--", None: "---"}[match.strand],
+            ]
+        )
+    return table
+
+
+def map_traces(reference, traces, k=25, workers=None):
+    """Generator of the TraceMatches of traces on reference.
+
+    Parameters
+    ----------
+    reference : ReferenceIndex or an argument for ReferenceIndex
+        Pass a ReferenceIndex to map several batches of traces against the
+        same reference without indexing it again.
+    traces : str or iterable
+        A glob pattern, or file names of ABI files or SeqRecords.
+    k : int, optional
+        k-mer length, used if reference is not a ReferenceIndex.
+    workers : int, optional
+        Number of processes reading and mapping ABI files, see
+        :func:`read_traces`.
+    """
+    index = reference if isinstance(reference, ReferenceIndex) else ReferenceIndex(reference, k)
+    if isinstance(traces, (str, _os.PathLike)):
+        traces = sorted(_glob.glob(_os.fspath(traces)))
+    traces = list(traces)
+    paths = [trace for trace in traces if isinstance(trace, (str, _os.PathLike))]
+    # The index is sent once to each worker, which reads and maps the trace files
+    matches = _pool(paths, workers, _map_trace_file, _set_worker_index, (index,)) if paths else iter(())
+    for trace in traces:
+        yield next(matches) if isinstance(trace, (str, _os.PathLike)) else index.map(trace)
+
+
+if __name__ == "__main__":
+    cached = _os.getenv("pydna_cached_funcs", "")
+    _os.environ["pydna_cached_funcs"] = ""
+    import doctest
+
+    doctest.testmod(verbose=True, optionflags=doctest.ELLIPSIS)
+    _os.environ["pydna_cached_funcs"] = cached
@@ -8,7 +8,6 @@
 
 from Bio.Data.IUPACData import ambiguous_dna_complement as _ambiguous_dna_complement
 from Bio.Seq import _maketrans
-import shelve as _shelve
 import os as _os
 import re as _re
 import logging as _logging
@@ -18,7 +17,7 @@ import hashlib as _hashlib
 import keyword as _keyword
 import collections as _collections
 import itertools as _itertools
-from copy import deepcopy as _deepcopy
+from copy import copy as _copy
 from typing import Union as _Union
 
 import sys as _sys
@@ -27,11 +26,14 @@ import itertools
 import random
 import subprocess as _subprocess
 
+from pydna.cache import cache as _cache
 from pydna.codon import weights as _weights
 from pydna.codon import rare_codons as _rare_codons
 
 from Bio.SeqFeature import SimpleLocation as _sl
 from Bio.SeqFeature import CompoundLocation as _cl
+from Bio.SeqFeature import BeforePosition as _BeforePosition
+from Bio.SeqFeature import AfterPosition as _AfterPosition
 
 _module_logger = _logging.getLogger("pydna." + __name__)
 _ambiguous_dna_complement.update({"U": "A"})
@@ -89,12 +91,107 @@ def shift_location(original_location, shift, lim):
 #     return new_feature
 
 
+def copy_feature(feature, location=None):
+    """Return a copy of a feature, optionally with a new location.
+
+    Only the qualifiers dict and its values are copied, the location is
+    shared unless a new one is given. This is much faster than a deep copy
+    and enough as long as locations are replaced rather than changed in
+    place, which is how pydna and Biopython treat them.
+
+    Examples
+    --------
+    >>> from Bio.SeqFeature import SeqFeature, SimpleLocation
+    >>> from pydna.utils import copy_feature
+    >>> feature = SeqFeature(SimpleLocation(0, 3), type="CDS", qualifiers={"label": ["orf"]})
+    >>> new = copy_feature(feature, SimpleLocation(3, 6))
+    >>> new.qualifiers["label"].append("copy")
+    >>> feature.qualifiers, new.location
+    ({'label': ['orf']}, SimpleLocation(ExactPosition(3), ExactPosition(6)))
+    """
+    new_feature = _copy(feature)
+    new_feature.qualifiers = feature.qualifiers.copy()
+    for key, value in new_feature.qualifiers.items():
+        new_feature.qualifiers[key] = _copy(value)
+    if location is not None:
+        new_feature.location = location
+    return new_feature
+
+
 def shift_feature(feature, shift, lim):
     """Return a new feature with shifted location."""
     # TODO: Missing tests
     new_location = shift_location(feature.location, shift, lim)
-    new_feature = _deepcopy(feature)
-    new_feature.location = new_location
+    return copy_feature(feature, new_location)
+
+
+def trim_location(location, start, stop, partial=True):
+    """Part of a location inside start:stop, relative to start.
+
+    Parts of the location outside start:stop are removed and, if partial is
+    True, ends that were cut are marked as partial (<, >), as in regions
+    downloaded from Genbank. Returns None if the location does not overlap
+    start:stop.
+
+    Examples
+    --------
+    >>> from Bio.SeqFeature import SimpleLocation
+    >>> from pydna.utils import trim_location
+    >>> print(trim_location(SimpleLocation(2, 8, 1), 5, 20))
+    [<0:3](+)
+    >>> print(trim_location(SimpleLocation(2, 8, -1) + SimpleLocation(10, 12, -1), 5, 11))
+    join{[<0:3](-), [5:>6](-)}
+    >>> print(trim_location(SimpleLocation(2, 8, 1), 5, 20, partial=False))
+    [0:3](+)
+    >>> print(trim_location(SimpleLocation(2, 8), 8, 20))
+    None
+    """
+    parts = []
+    for part in location.parts:
+        if part.ref or part.ref_db:
+            return None
+        try:
+            if part.end <= start or stop <= part.start:
+                continue
+        except TypeError:
+            # unknown positions
+            return None
+        shifted = part._shift(-start)
+        part_start, part_end = shifted.start, shifted.end
+        if part.start < start:
+            part_start = _BeforePosition(0) if partial else 0
+        if part.end > stop:
+            part_end = _AfterPosition(stop - start) if partial else stop - start
+        parts.append(_sl(part_start, part_end, part.strand))
+    if not parts:
+        return None
+    if len(parts) == 1:
+        return parts[0]
+    return _cl(parts, location.operator)
+
+
+def trim_feature(feature, start, stop):
+    """Return a new feature with the location trimmed to start:stop, or None.
+
+    See :func:`trim_location`. Cut ends are marked as partial except for
+    source features, as in Genbank. If the 5' end of a CDS is cut, the
+    codon_start qualifier is changed to keep the reading frame. The
+    translation qualifier is removed from features that were cut.
+    """
+    location = trim_location(feature.location, start, stop, partial=feature.type != "source")
+    if location is None:
+        return None
+    new_feature = copy_feature(feature, location)
+    if len(location) < len(feature.location):
+        new_feature.qualifiers.pop("translation", None)
+        if "codon_start" in feature.qualifiers:
+            # bases removed from the 5' end of the feature
+            if feature.location.strand == -1:
+                cut = sum(max(0, part.end - max(part.start, stop)) for part in feature.location.parts)
+            else:
+                cut = sum(max(0, min(part.end, start) - part.start) for part in feature.location.parts)
+            codon_start = int(feature.qualifiers["codon_start"][0])
+            new_feature.qualifiers["codon_start"] = [str((codon_start - 1 - cut) % 3 + 1)]
     return new_feature
 
 
@@ -159,6 +256,115 @@ def smallest_rotation(s):
     return s[k:] + s[:k]
 
 
+def seam(s, size: int):
+    """The region around the origin of a circular sequence.
+
+    Returns the position in s where the region starts and the region,
+    which is the last size - 1 characters of s followed by the first
+    size - 1 characters (or s twice, if s is shorter). Every substring of
+    length size or shorter that spans the origin is found in the region,
+    without making a copy of the whole sequence.
+
+    Examples
+    --------
+    >>> from pydna.utils import seam
+    >>> seam("GAATTCaaaaaaaaaaaaa", 4)
+    (16, 'aaaGAA')
+    """
+    tail = min(max(size - 1, 0), len(s))
+    return len(s) - tail, s[len(s) - tail :] + s[:tail]
+
+
+def circular_find(s, sub, start=0, end=None):
+    """Lowest index where sub is found in a circular sequence.
+
+    The result is the same as for (s + s).find(sub, start, end), but only
+    the region around the origin is copied.
+
+    Examples
+    --------
+    >>> from pydna.utils import circular_find
+    >>> circular_find("TTCaaaaGAA", "GAATTC")
+    7
+    >>> circular_find("TTCaaaaGAA", "aa", 5)
+    5
+    """
+    length, size = len(s), len(sub)
+    if size > length or not size:
+        return (s + s).find(sub, start, end)
+    start, end, step = slice(start, end).indices(2 * length)
+    found = s.find(sub, start, min(end, length))
+    if found != -1:
+        return found
+    offset, region = seam(s, size)
+    found = region.find(sub, max(start - offset, 0), max(min(end - offset, len(region)), 0))
+    if found != -1:
+        return offset + found
+    found = s.find(sub, max(start - length, 0), max(end - length, 0))
+    return found if found == -1 else found + length
+
+
+def circular_finditer(pattern, s, size: int):
+    """Matches of a regular expression in a circular sequence.
+
+    Generator of (offset, match) tuples, where offset + match.start() is
+    the position of the match in s. Matches start in s and can span the
+    origin. Matches have to be at most size characters long, which is the
+    case for lookahead patterns like the ones used for restriction enzymes
+    and Cas9 guides.
+
+    Examples
+    --------
+    >>> import re
+    >>> from pydna.utils import circular_finditer
+    >>> [offset + m.start() for offset, m in circular_finditer(re.compile("(?=GAATTC)"), "TTCaaGAATTCaGAA", 6)]
+    [5, 12]
+    """
+    length = len(s)
+    if size > length:
+        # Short sequences, matches can go more than once around
+        for match in pattern.finditer(s * (size // max(length, 1) + 2)):
+            if match.start() >= length:
+                break
+            yield 0, match
+        return
+    last = length - size
+    for match in pattern.finditer(s):
+        if match.start() > last:
+            break
+        yield 0, match
+    offset, region = seam(s, size)
+    for match in pattern.finditer(region, max(last + 1 - offset, 0)):
+        if offset + match.start() >= length:
+            break
+        yield offset, match
+
+
+def common_prefix_length(a, b, a_start=0, b_start=0):
+    """Length of the common prefix of a[a_start:] and b[b_start:].
+
+    The strings are compared in blocks, so that only small slices are made.
+
+    Examples
+    --------
+    >>> from pydna.utils import common_prefix_length
+    >>> common_prefix_length("GAATTCaa", "tGAATTCcc", 0, 1)
+    6
+    """
+    block = 1024
+    length = min(len(a) - a_start, len(b) - b_start)
+    position = 0
+    while position < length:
+        size = min(block, length - position)
+        x = a[a_start + position : a_start + position + size]
+        y = b[b_start + position : b_start + position + size]
+        if x == y:
+            position += size
+        else:
+            return position + next(i for i, (c, d) in enumerate(zip(x, y)) if c != d)
+    return position
+
+
 def cai(seq: str, organism: str = "sce", weights: dict = _weights):
     """docstring."""
     from cai2 import CAI as _CAI
@@ -239,6 +445,12 @@ def complement(sequence: str):
 def memorize(filename):
     """Cache functions and classes.
 
+    Results are stored in a :class:`pydna.cache.Cache` in the cache.sqlite file
+    in the pydna_data_dir directory if filename is among the names in the
+    pydna_cached_funcs environment variable. The size and age of the cache
+    are limited by the pydna_cache_max_size and pydna_cache_max_age
+    environment variables.
+
     see pydna.download
     """
 
@@ -253,27 +465,19 @@ def memorize(filename):
             if filename not in _os.getenv("pydna_cached_funcs", ""):
                 _module_logger.info("cache filename not among cached functions, made it new!")
                 return f(*args, **kwargs)
-            key = _base64.urlsafe_b64encode(_hashlib.sha1(_pickle.dumps((args, kwargs))).digest()).decode("ascii")
+            key = _memorize_key(filename, args, kwargs)
             _module_logger.info("key = %s", key)
-            cache = _shelve.open(
-                _os.path.join(_os.environ["pydna_data_dir"], identifier_from_string(filename)),
-                writeback=False,
-            )
+            cache = _memorize_cache()
             try:
                 result = cache[key]
             except KeyError:
-                _module_logger.info(
-                    "no result for key %s in shelve %s",
-                    key,
-                    identifier_from_string(filename),
-                )
+                _module_logger.info("no result for key %s in %s", key, cache.path)
                 result = f(*args, **kwargs)
                 _module_logger.info("made it new!")
                 cache[key] = result
                 _module_logger.info("saved result under key %s", key)
             else:
                 _module_logger.info("found %s in cache", key)
-            cache.close()
             return result
 
         return wrappee
@@ -281,6 +485,17 @@ def memorize(filename):
     return decorator
 
 
+def _memorize_key(filename, args, kwargs):
+    """Key of the result of a memorized function called with args and kwargs (PRIVATE)."""
+    key = _base64.urlsafe_b64encode(_hashlib.sha1(_pickle.dumps((args, kwargs))).digest()).decode("ascii")
+    return f"{identifier_from_string(filename)}/{key}"
+
+
+def _memorize_cache():
+    """The cache used by memorize (PRIVATE)."""
+    return _cache(_os.path.join(_os.environ["pydna_data_dir"], "cache.sqlite"))
+
+
 def identifier_from_string(s: str) -> str:
     """Return a valid python identifier.
 
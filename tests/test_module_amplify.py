@@ -769,5 +769,22 @@ def test_shifts():
     f = pcr(f, r, t)
 
 
+def test_annealing_positions_circular():
+    import random
+    from pydna.amplify import _annealing_positions
+
+    random.seed(23)
+    for i in range(500):
+        template = "".join(random.choice("ac") for i in range(random.randint(1, 30)))
+        primer = "".join(random.choice("gt") for i in range(random.randint(4, 20)))
+        limit = random.randint(1, 4)
+        expected = [
+            (position, footprint)
+            for position, footprint in _annealing_positions(primer, template + template, limit)
+            if position < len(template)
+        ]
+        assert _annealing_positions(primer, template, limit, circular=True) == expected
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-vv", "-s"])
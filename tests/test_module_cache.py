@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def write_keys(path, worker, n):
+    from pydna.cache import Cache
+
+    cache = Cache(path)
+    for i in range(n):
+        cache[f"{worker}/{i}"] = [worker, i]
+    result = [cache[f"{worker}/{i}"] for i in range(n)]
+    cache.close()
+    return result
+
+
+def test_cache(tmp_path):
+    from pydna.cache import Cache
+
+    path = str(tmp_path / "cache.sqlite")
+    cache = Cache(path, lru_size=2)
+    with pytest.raises(KeyError):
+        cache["a"]
+    assert cache.get("a", 1) == 1
+    value = {"x": [1, 2]}
+    cache["a"] = value
+    result = cache["a"]
+    assert result == value
+    assert result is not cache["a"]
+    result["x"].append(3)
+    assert cache["a"] == value
+
+    for key in "bcd":
+        cache[key] = key
+    assert len(cache._lru) == 2
+    assert len(cache) == 4
+
+    other = Cache(path)
+    assert other["a"] == value and other["d"] == "d"
+    del other["a"]
+    assert "a" not in other
+    with pytest.raises(KeyError):
+        del other["a"]
+    other.clear()
+    assert len(other) == 0
+    other.close()
+    cache.close()
+
+
+def test_cache_eviction(tmp_path, monkeypatch):
+    import pickle
+    from pydna import cache as cache_module
+    from pydna.cache import Cache
+
+    path = str(tmp_path / "cache.sqlite")
+    size = len(pickle.dumps("x" * 100, protocol=pickle.HIGHEST_PROTOCOL))
+    cache = Cache(path, max_size=3 * size)
+    now = 1000.0
+    monkeypatch.setattr(cache_module._time, "time", lambda: now)
+    for key in "abc":
+        now += 100
+        cache[key] = "x" * 100
+    now += 100
+    cache["a"]
+    now += 100
+    cache["d"] = "x" * 100
+    assert sorted(key for key in "abcd" if key in cache) == ["a", "c", "d"]
+    assert "b" not in cache._lru
+
+    cache.max_age = 400
+    assert "a" in cache
+    now += 1
+    assert "a" not in cache
+    assert len(cache) == 3
+    cache.evict()
+    assert len(cache) == 2
+    cache.close()
+
+
+def test_cache_processes(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+    from pydna.cache import Cache
+
+    path = str(tmp_path / "cache.sqlite")
+    cache = Cache(path)
+    cache["parent"] = 1
+    with ProcessPoolExecutor(2) as executor:
+        results = list(executor.map(write_keys, [path] * 4, range(4), [25] * 4))
+    assert results == [[[worker, i] for i in range(25)] for worker in range(4)]
+    assert len(cache) == 101
+    assert cache["3/24"] == [3, 24]
+    assert cache._connect().execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    cache.close()
+
+
+def test_shared_cache(tmp_path, monkeypatch):
+    from pydna.cache import cache
+
+    path = str(tmp_path / "cache.sqlite")
+    monkeypatch.setenv("pydna_cache_max_size", "1e6")
+    monkeypatch.setenv("pydna_cache_max_age", "0")
+    first = cache(path)
+    assert (first.max_size, first.max_age) == (1000000, None)
+    monkeypatch.setenv("pydna_cache_max_size", "0")
+    assert cache(path) is first
+    assert first.max_size is None
+    first.close()
+
+
+def test_memorize(tmp_path, monkeypatch):
+    from pydna.utils import memorize
+
+    calls = []
+
+    @memorize("pydna.test.f")
+    def f(x):
+        calls.append(x)
+        return [x]
+
+    monkeypatch.setenv("pydna_data_dir", str(tmp_path))
+    monkeypatch.setenv("pydna_cached_funcs", "pydna.test.f")
+    assert f(1) == [1]
+    assert f(1) == [1]
+    assert calls == [1]
+    assert (tmp_path / "cache.sqlite").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
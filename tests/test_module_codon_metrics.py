@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def _random_cds(random, codons):
+    return "ATG" + "".join(random.choice(codons) for i in range(random.randint(1, 100))) + "TAA"
+
+
+def test_same_as_one_at_a_time():
+    pytest.importorskip("cai2")
+    import random
+    from pydna import codon_metrics
+    from pydna.seq import Seq
+    from pydna.utils import cai, rarecodons
+
+    random.seed(8)
+    seqs = [_random_cds(random, codon_metrics.CODONS).lower() for i in range(200)]
+    for organism in ("sce",):
+        assert codon_metrics.cai(seqs, organism).tolist() == [cai(s, organism) for s in seqs]
+    for organism in ("sce", "eco"):
+        counts = codon_metrics.rare_codon_counts(seqs, organism)
+        assert counts.sum(axis=1).tolist() == [len(rarecodons(s, organism)) for s in seqs]
+    table = codon_metrics.express([Seq(s) for s in seqs[:20]])
+    assert table.lol()[1:] == [Seq(s).express().lol()[1] for s in seqs[:20]]
+
+
+def test_codon_counts():
+    import numpy as np
+    from pydna.codon_metrics import CODONS, codon_counts, encode, gc
+    from pydna.dseqrecord import Dseqrecord
+
+    counts = codon_counts(["atgatgNNNt", Dseqrecord("TTTaaa"), ""])
+    assert counts.shape == (3, 64)
+    assert counts[0, CODONS.index("ATG")] == 2
+    assert counts[1, CODONS.index("TTT")] == counts[1, CODONS.index("AAA")] == 1
+    assert counts.sum(axis=1).tolist() == [2, 2, 0]
+    assert encode("atgNNN").tolist() == [CODONS.index("ATG"), 64]
+    assert np.array_equal(gc(["GGcc", "atNN", "", "gcsw"]), [1.0, 0.0, 0.0, 0.75])
+
+
+def test_errors():
+    from pydna.codon_metrics import cai
+
+    with pytest.raises(ValueError):
+        cai(["ATGAA"])
+    with pytest.raises(ValueError):
+        cai(["ATGTAA", ""])
+    with pytest.raises(KeyError):
+        cai(["ATGNNNTAA"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
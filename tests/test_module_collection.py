@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def test_round_trip(tmp_path):
+    import copy
+    from Bio.Restriction import BamHI, EcoRI
+    from pydna.collection import Collection, read_collection, write_collection
+    from pydna.dseq import Dseq
+    from pydna.dseqrecord import Dseqrecord
+    from pydna.readers import read
+
+    records = [read("pAG25.gb"), read("pUC19.gb")]
+    for crick_ovhg, watson_ovhg in ((2, 2), (-2, 2), (2, -2), (-2, -2), (0, 3), (-3, 0)):
+        records.append(Dseqrecord(Dseq.from_full_sequence_and_overhangs("AAAcgtgGCCC", crick_ovhg, watson_ovhg)))
+    records.extend(records[1].cut(EcoRI, BamHI))
+    records.append(Dseqrecord(""))
+    path = tmp_path / "records.pydna"
+    write_collection(records, path)
+
+    result = read_collection(path)
+    assert len(result) == len(records)
+    for a, b in zip(records, result):
+        assert (a.seq.watson, a.seq.crick, a.seq.ovhg, a.circular) == (
+            b.seq.watson,
+            b.seq.crick,
+            b.seq.ovhg,
+            b.circular,
+        )
+        assert (a.id, a.name, a.description, a.dbxrefs) == (b.id, b.name, b.description, b.dbxrefs)
+        assert "references" not in b.annotations
+        a = copy.copy(a)
+        a.annotations = {k: v for k, v in a.annotations.items() if k != "references"}
+        assert a.format("gb").splitlines()[1:] == b.format("gb").splitlines()[1:]
+
+    with Collection(path) as collection:
+        assert len(collection) == len(records)
+        assert collection[-1].seq.watson == ""
+        assert collection[1].seguid() == records[1].seguid()
+        seguids = collection.seguids()
+        assert seguids[:-1] == [r.seguid() for r in records[:-1]]
+        assert collection.index(records[3].seguid()) == 3
+        assert collection[records[3].seguid()].seq.watson == records[3].seq.watson
+        with pytest.raises(KeyError):
+            collection["ldseguid=AAAAAAAAAAAAAAAAAAAAAAAAAAA"]
+        with pytest.raises(IndexError):
+            collection[len(records)]
+        assert [r.seguid() for r in collection[0:2]] == [r.seguid() for r in records[0:2]]
+        assert [r.seguid() for r in collection[-4:-1:2]] == [r.seguid() for r in records[-4:-1:2]]
+        assert collection[5:3] == []
+
+
+def test_features(tmp_path):
+    from Bio.SeqFeature import AfterPosition, BeforePosition, CompoundLocation, SeqFeature, SimpleLocation
+    from pydna.collection import read_collection, write_collection
+    from pydna.dseqrecord import Dseqrecord
+
+    record = Dseqrecord("a" * 100, circular=True)
+    record.features = [
+        SeqFeature(SimpleLocation(BeforePosition(0), AfterPosition(10), None), type="gene", qualifiers={"x": ["ü"]}),
+        SeqFeature(CompoundLocation([SimpleLocation(90, 100, -1), SimpleLocation(0, 5, -1)]), type="CDS"),
+        SeqFeature(CompoundLocation([SimpleLocation(1, 2, 1), SimpleLocation(5, 6, 1)], "order"), type="misc"),
+    ]
+    record.annotations["comment"] = "text"
+    record.annotations["not json"] = object()
+    path = tmp_path / "features.pydna"
+    write_collection([record, Dseqrecord("ccc")], path)
+    result, empty = read_collection(path)
+    assert [(str(f.location), f.type, f.qualifiers) for f in result.features] == [
+        (str(f.location), f.type, f.qualifiers) for f in record.features
+    ]
+    assert type(result.features[0].location.start) is BeforePosition
+    assert result.features[2].location.operator == "order"
+    assert result.annotations["comment"] == "text"
+    assert "not json" not in result.annotations
+    assert empty.features == []
+
+
+def test_errors(tmp_path):
+    import struct
+    from pydna.collection import MAGIC, Collection, write_collection
+
+    path = tmp_path / "text.pydna"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        Collection(path)
+
+    path = tmp_path / "new.pydna"
+    write_collection([], path)
+    with Collection(path) as collection:
+        assert len(collection) == 0
+        assert list(collection) == []
+        with pytest.raises(KeyError):
+            collection.index("ldseguid=AAAAAAAAAAAAAAAAAAAAAAAAAAA")
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<8sI", data, 0, MAGIC, 99)
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        Collection(path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
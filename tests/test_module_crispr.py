@@ -36,5 +36,20 @@ def test_crispr():
     ]
 
 
+def test_crispr_circular():
+    from pydna.crispr import cas9
+    from pydna.dseq import Dseq
+
+    guide = "GTTACTTTACCCGACGTCCC"
+    site = guide + "aGG"
+    enzyme = cas9(guide)
+    assert enzyme.search(Dseq(site + "tttt")) == [18]
+    # Sites spanning the origin, also when it is in the PAM or close to the start
+    for i in range(len(site) + 4):
+        seq = (site + "tttt")[i:] + (site + "tttt")[:i]
+        assert enzyme.search(Dseq(seq), linear=False) == [(18 - i - 1) % len(seq) + 1]
+        assert enzyme.search(Dseq(seq).rc(), linear=False) == [(len(seq) - 17 + i) % len(seq) + 1]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-vv", "-s"])
@@ -1112,5 +1112,144 @@ def test_checksums():
     assert cdseguid("AACGT", "ACGTT") == truth == Dseq("AACGT", "ACGTT", circular=True).seguid()
 
 
+def test_lazy_crick_and_cache():
+    import copy
+    import pickle
+    from pydna.dseq import Dseq
+
+    s = Dseq.from_string("GGATCCa")
+    assert s._crick is None
+    assert s.crick == "tGGATCC"
+    assert Dseq("aaa")._crick is None
+    assert Dseq("aaa") == Dseq("aaa", "ttt", 0)
+
+    seguid = s.seguid()
+    assert s.seguid() is seguid
+    assert s.lower() == Dseq("ggatcca")
+    assert s.upper() == Dseq("GGATCCA")
+
+    # setting a strand, ovhg or the topology drops derived values
+    t = copy.deepcopy(s)
+    t.crick = t.crick[1:]
+    assert t.seguid() == Dseq("GGATCCa", "GGATCC", 0).seguid() != seguid
+    t.circular = True
+    assert t.find("AG") == -1
+    u = Dseq("GGATCCa", circular=True)
+    assert u.find("aG") == 6
+    u.watson = "GGATCCc"
+    assert u.find("aG") == -1
+
+    # the cache is not pickled, older pickles without private attributes can be loaded
+    assert "_cache" not in pickle.dumps(s).decode("latin1")
+    assert pickle.loads(pickle.dumps(s)) == s
+    old = Dseq.__new__(Dseq)
+    old.__setstate__(
+        ({"watson": "aa", "crick": "tt", "ovhg": 0, "circular": False, "length": 2, "pos": 0}, {"_data": b"aa"})
+    )
+    assert old == Dseq("aa")
+
+
+def test_restriction_search_cache():
+    from unittest import mock
+    from Bio.Restriction import CommOnly, EcoRI, BamHI, RestrictionBatch
+    from pydna.dseq import Dseq
+
+    seq = Dseq("GGATCCaaGAATTCaaGAATTCaaaGGATCCaaaa", circular=True)
+    assert seq.restriction_search(CommOnly, linear=True) == CommOnly.search(seq, linear=True)
+    assert seq.restriction_search(CommOnly) == CommOnly.search(seq, linear=False)
+
+    # All queries are answered from the cache, without searching again
+    with mock.patch.object(RestrictionBatch, "search") as batch_search:
+        with mock.patch("pydna.dseq._scanner") as scanner:
+            assert EcoRI in seq.twice_cutters()
+            assert BamHI in seq.n_cutters(2)
+            assert EcoRI in seq.cutters()
+            assert EcoRI not in seq.unique_cutters()
+            assert EcoRI not in seq.no_cutters()
+            assert seq.get_cutsites(EcoRI) == [((9, -4), EcoRI), ((17, -4), EcoRI)]
+            assert seq.get_cutsites(CommOnly) == sorted(c for e in CommOnly for c in seq.get_cutsites(e))
+    batch_search.assert_not_called()
+    scanner.assert_not_called()
+
+    # Results are copies, the cache can not be changed by the caller
+    seq.restriction_search([EcoRI])[EcoRI].append(1)
+    assert seq.restriction_search([EcoRI])[EcoRI] == [10, 18]
+
+    # The cache is reset when the sequence is changed
+    seq = Dseq("AATTCaaaaG", circular=True)
+    assert seq.restriction_search([EcoRI]) == {EcoRI: [1]}
+    seq.circular = False
+    assert seq.restriction_search([EcoRI]) == {EcoRI: []}
+    assert seq.restriction_search([]) == {}
+
+
+def test_cutsites_are_valid():
+    import random
+    from Bio.Restriction import CommOnly, BaeI, EcoRI
+    from pydna.dseq import Dseq
+    from pydna.crispr import cas9
+
+    random.seed(1)
+    enzymes = list(CommOnly) + [cas9("GTTACTTTACCCGACGTCCC")]
+    for i in range(40):
+        length = random.randint(1, 120)
+        watson = "".join(random.choice("GATC") for i in range(length))
+        crick = "".join(random.choice("GATC") for i in range(length))
+        ovhg = random.randint(-4, 4)
+        for seq in (Dseq(watson, crick, ovhg=ovhg), Dseq(watson, circular=True)):
+            cutsites = [
+                ((random.randint(0, len(seq) + 3), random.randint(-6, 6)), random.choice(enzymes)) for i in range(200)
+            ]
+            search = CommOnly.search(seq, linear=not seq.circular)
+            cutsites += [((c - 1, e.ovhg), e) for e, cs in search.items() for c in cs]
+            expected = [seq._cutsite_is_valid_by_slicing(c) for c in cutsites]
+            assert seq.cutsites_are_valid(cutsites).tolist() == expected
+            assert [seq.cutsite_is_valid(c) for c in cutsites] == expected
+
+    # Negative positions are checked by slicing
+    seq = Dseq("GAATTCaaaa")
+    assert seq.cutsites_are_valid([((-3, -4), EcoRI), ((1, -4), EcoRI)]).tolist() == [
+        seq._cutsite_is_valid_by_slicing(((-3, -4), EcoRI)),
+        True,
+    ]
+    # Enzymes that cut twice
+    assert BaeI.scd5 is not None
+    seq = Dseq("ttttttttttttttACAAAAGTACCtttttttttttttttt")
+    cutsites = [((c - 1, BaeI.ovhg), BaeI) for c in BaeI.search(seq)]
+    assert len(cutsites) == 2
+    assert seq.get_cutsites(BaeI) == [c for c in cutsites if seq._cutsite_is_valid_by_slicing(c)]
+    assert seq.cutsites_are_valid([]).tolist() == []
+
+
+def test_join():
+    import functools
+    from Bio.Restriction import EcoRI, KpnI, SmaI
+    from pydna.dseq import Dseq
+
+    seq = Dseq("aaGAATTCaaGGTACCaaCCCGGGaaGAATTCaa")
+    fragments = seq.cut(EcoRI, KpnI, SmaI)
+    assert len(fragments) == 5
+    assert Dseq.join(fragments) == seq
+    assert Dseq.join(fragments) == functools.reduce(lambda a, b: a + b, fragments)
+    assert Dseq.join([Dseq(""), fragments[0], Dseq("")]) == fragments[0]
+    assert Dseq.join([]) == Dseq("")
+    assert Dseq.join([Dseq("")]) == Dseq("")
+
+    with pytest.raises(TypeError):
+        Dseq.join([fragments[1], fragments[0]])
+    with pytest.raises(TypeError):
+        Dseq.join([Dseq("aa"), Dseq("aa", circular=True)])
+
+    unit = fragments[2]
+    assert unit.five_prime_end() == ("3'", "gtac")
+    with pytest.raises(TypeError):
+        unit * 2
+    repeat = Dseq("GATCaaaa", "GATCtttt", ovhg=-4)
+    assert (repeat * 3) == repeat + repeat + repeat
+    assert (repeat * 3).watson == "GATCaaaa" * 3
+    assert repeat * 1 == repeat
+    assert repeat * 0 == Dseq("")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-vv", "-s"])
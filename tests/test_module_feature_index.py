@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def _random_location(random, length, circular):
+    from Bio.SeqFeature import CompoundLocation, SimpleLocation
+
+    strand = random.choice([1, -1, None])
+    if circular and random.random() < 0.3:
+        # origin spanning
+        start = random.randrange(1, length)
+        parts = [SimpleLocation(start, length, strand), SimpleLocation(0, random.randrange(1, start + 1), strand)]
+        return CompoundLocation(parts[::-1] if strand == -1 else parts)
+    start = random.randrange(length)
+    return SimpleLocation(start, random.randint(start, length), strand)
+
+
+def test_queries():
+    import random
+    from pydna.feature_index import FeatureIndex
+    from pydna.utils import location_boundaries
+
+    random.seed(42)
+    for i in range(200):
+        length = random.randint(1, 300)
+        circular = random.random() < 0.5
+        locations = [_random_location(random, length, circular) for i in range(random.randint(0, 40))]
+        index = FeatureIndex(locations, length, circular)
+
+        def extent(location):
+            start, end = location_boundaries(location)
+            if circular and len(location.parts) > 1 and end <= start:
+                return start, end + length
+            return int(location.start), int(location.end)
+
+        for j in range(20):
+            start, stop = sorted(random.randint(0, length) for i in range(2))
+            if circular and random.random() < 0.5:
+                start, stop = stop, start
+            shifts = (0, length, -length) if circular else (0,)
+            wrapped = stop + length if circular and stop < start else stop
+
+            def expected(predicate):
+                return [
+                    i
+                    for i, location in enumerate(locations)
+                    if any(predicate(extent(location)[0] + s, extent(location)[1] + s) for s in shifts)
+                ]
+
+            assert list(index.inside(start, stop)) == expected(lambda s, e: start <= s and e <= wrapped)
+            assert list(index.overlapping(start, stop)) == expected(lambda s, e: s <= wrapped and e >= start)
+            assert list(index.spanning(start, stop)) == expected(lambda s, e: s <= start and e >= wrapped)
+
+
+def test_unknown_positions():
+    from Bio.SeqFeature import SimpleLocation, UnknownPosition
+    from pydna.feature_index import FeatureIndex
+
+    index = FeatureIndex([SimpleLocation(UnknownPosition(), 5), SimpleLocation(1, 4)], 10)
+    assert list(index.unindexed) == [0]
+    assert list(index.inside(0, 10)) == [1]
+
+
+def test_slicing_uses_index():
+    import random
+    from Bio.SeqFeature import SeqFeature
+    from pydna.dseqrecord import Dseqrecord
+    from pydna.feature_store import FeatureStore
+
+    random.seed(7)
+    for i in range(100):
+        length = random.randint(5, 60)
+        circular = random.random() < 0.6
+        record = Dseqrecord("".join(random.choice("acgt") for i in range(length)), circular=circular)
+        record.features = [
+            SeqFeature(_random_location(random, length, circular), type=str(i)) for i in range(random.randint(0, 15))
+        ]
+        # Features in a FeatureStore are not indexed
+        unindexed = Dseqrecord(record)
+        unindexed.features = FeatureStore(record.features)
+        for j in range(20):
+            start, stop = random.randint(-length, length), random.randint(-length, length)
+            if not circular and start > stop:
+                continue
+            assert [(str(f.location), f.type) for f in record[start:stop].features] == [
+                (str(f.location), f.type) for f in unindexed[start:stop].features
+            ]
+        assert record._feature_index(circular) is record._feature_index(circular)
+    # The index is rebuilt when the features change
+    record.features.append(SeqFeature(_random_location(random, length, circular), type="new"))
+    assert "new" in [f.type for f in record[:].features]
+
+
+def test_index_invalidation(monkeypatch):
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna import dseqrecord
+    from pydna.dseqrecord import Dseqrecord
+
+    built = []
+
+    class CountingIndex(dseqrecord._FeatureIndex):
+        def __init__(self, *args):
+            built.append(1)
+            super().__init__(*args)
+
+    monkeypatch.setattr(dseqrecord, "_FeatureIndex", CountingIndex)
+    record = Dseqrecord("a" * 100)
+    record.features = [SeqFeature(SimpleLocation(i, i + 10), type=str(i)) for i in range(0, 80, 5)]
+    for i in range(20):
+        record[i : i + 30]
+    # built once, not checked against the features on each slice
+    assert len(built) == 1
+    features = record.features
+    assert [f.type for f in record[0:12].features] == ["0"]
+    # changed through the list
+    features[0].location = SimpleLocation(50, 55)
+    features.append(SeqFeature(SimpleLocation(1, 3), type="new"))
+    assert [f.type for f in record[0:12].features] == ["new"]
+    assert "0" in [f.type for f in record[50:60].features]
+    # changed through the property
+    record.features[0].location = SimpleLocation(2, 4)
+    assert [f.type for f in record[0:12].features] == ["0", "new"]
+    assert len(built) == 3
+
+
+def test_index_list_changed_after_slicing():
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna.dseqrecord import Dseqrecord
+
+    record = Dseqrecord("a" * 200)
+    record.features = [
+        SeqFeature(SimpleLocation(10, 20, 1), type="a"),
+        SeqFeature(SimpleLocation(30, 40, 1), type="b"),
+    ]
+    features = record.features
+    record[0:50]
+    features[0].location = SimpleLocation(150, 160, 1)
+    assert [f.type for f in record[140:170].features] == ["a"]
+    record[0:50]
+    features[1] = SeqFeature(SimpleLocation(100, 110, 1), type="c")
+    assert [f.type for f in record[90:120].features] == ["c"]
+    assert [f.type for f in record[0:50].features] == []
+
+
+def test_assembly_features():
+    from pydna.assembly import Assembly
+    from pydna.dseqrecord import Dseqrecord
+
+    a = Dseqrecord("acgatgctatactgCCCCCtgtgctgtgctctaTTTTTtattctggctgtatc")
+    a.add_feature(0, 10, type_="a1")
+    a.add_feature(20, 30, type_="a2")
+    b = Dseqrecord("tgtgctgtgctctaTTTTTtattctggctgtatcGGGGGtacgatgctatactg")
+    b.add_feature(16, 25, type_="b1")
+    product = Assembly((a, b), limit=14).assemble_circular()[0]
+    assert sorted(f.type for f in product.features) == ["a1", "a2", "b1"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def _locations(record):
+    return [(str(f.location), f.type, f.qualifiers) for f in record.features]
+
+
+def test_same_features_as_copying():
+    import copy
+    import operator
+    from pydna.readers import read
+    from pydna.utils import shift_location
+
+    pUC19 = read("pUC19_MarkBudde.gb")
+    ln = len(pUC19)
+    for shift in (0, 1, 395, ln - 1, ln + 7):
+        # How the features were made before they were shared
+        features = copy.deepcopy(pUC19.features)
+        if shift % ln:
+            for feature in features:
+                feature.location = shift_location(feature.location, -(shift % ln), ln)
+            features.sort(key=operator.attrgetter("location.start"))
+        shifted = pUC19.shifted(shift)
+        assert [(str(f.location), f.qualifiers) for f in features] == [
+            (str(f.location), f.qualifiers) for f in shifted.features
+        ]
+
+    linear = pUC19[:]
+    for start, stop in ((0, 100), (100, 2000), (1500, ln)):
+        sliced = linear[start:stop]
+        expected = super(type(linear), linear).__getitem__(slice(start, stop))
+        assert _locations(sliced) == _locations(expected)
+
+    rc = pUC19.rc()
+    assert _locations(rc) == _locations(super(type(pUC19), pUC19).reverse_complement())
+
+
+def test_features_are_copied_on_first_use():
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna.dseqrecord import Dseqrecord
+    from pydna.feature_store import FeatureStore
+
+    a = Dseqrecord("GGATCCaaaGAATTC", circular=True)
+    a.features.append(SeqFeature(SimpleLocation(3, 9, 1), type="misc", qualifiers={"label": ["x"]}))
+    b = a.shifted(5)
+    assert isinstance(b.__dict__["features"], FeatureStore)
+    (feature,) = b.features
+    assert isinstance(b.__dict__["features"], list)
+    assert b.features[0] is feature
+    assert str(feature.extract(b).seq) == str(a.features[0].extract(a).seq) == "TCCaaa"
+    # The original feature is not changed
+    feature.qualifiers["label"].append("y")
+    assert a.features[0].qualifiers == {"label": ["x"]}
+    assert a.features[0].location == SimpleLocation(3, 9, 1)
+
+    # Records derived from records with shared features
+    c = (a.shifted(2)[:] + Dseqrecord("tttt")).rc()[2:]
+    assert [(str(f.extract(c).seq), f.location.strand) for f in c.features] == [("TCCaaa", -1)]
+
+
+def test_parent_changed_after_deriving():
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna.dseqrecord import Dseqrecord
+    from pydna.feature_store import LazyFeatureStore
+
+    for circular in (True, False):
+        a = Dseqrecord("GGATCCaaaGAATTCccc", circular=circular)
+        a.features.append(SeqFeature(SimpleLocation(3, 9, 1), type="misc", qualifiers={"label": ["x"]}))
+        a.features.append(SeqFeature(SimpleLocation(10, 14, 1), type="misc", qualifiers={"label": ["z"]}))
+        if circular:
+            derived = [a.shifted(1), a.shifted(1)[1:], a[10:4]]
+        else:
+            derived = [a[2:12], a.rc(), a + a, a[1:][:15]]
+        a.features[0].qualifiers["label"] = ["CHANGED"]
+        a.features[0].location = SimpleLocation(0, 2, 1)
+        a.features[1].qualifiers["label"].append("CHANGED")
+        for record in derived:
+            assert record.features
+            for feature in record.features:
+                assert "CHANGED" not in feature.qualifiers["label"]
+                assert len(feature) in (4, 6)
+
+    # features loaded from a LazyFeatureStore
+    b = Dseqrecord("GGATCCaaaGAATTCccc")
+    b.features = LazyFeatureStore(lambda: [SeqFeature(SimpleLocation(3, 9, 1), qualifiers={"label": ["x"]})])
+    c = b[1:]
+    b.features[0].qualifiers["label"].append("CHANGED")
+    assert c.features[0].qualifiers == {"label": ["x"]}
+
+
+def test_join_and_cut():
+    from Bio.Restriction import BamHI, EcoRI
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna.dseqrecord import Dseqrecord
+
+    a = Dseqrecord("cccGGATCCaaaGAATTCccc")
+    a.add_feature(3, 9, type_="BamHI")
+    a.add_feature(12, 18, type_="EcoRI")
+    b = Dseqrecord("GAATTCttt")
+    b.features.append(SeqFeature(SimpleLocation(6, 9, -1), type="b"))
+    left, middle, right = a.cut(BamHI, EcoRI)
+    product = middle + b.cut(EcoRI)[1]
+    assert [(f.type, str(f.extract(product).seq)) for f in product.features] == [("b", "aaa")]
+    assert [f.type for f in (left + middle).features] == []
+    assert [f.type for f in a.cut(EcoRI)[0].features] == ["BamHI"]
+
+
+def test_concatenate():
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna.feature_store import FeatureStore
+
+    a = FeatureStore([SeqFeature(SimpleLocation(0, 2), type="a")])
+    b = FeatureStore([SeqFeature(SimpleLocation(5, 6), type="b")]).shifted(2)
+    store = FeatureStore.concatenate([a, FeatureStore(), b])
+    assert [(f.type, int(f.location.start)) for f in store.features()] == [("a", 0), ("b", 7)]
+    assert [(f.type, int(f.location.start)) for f in store.flipped(10).sorted().features()] == [("b", 2), ("a", 8)]
+    assert FeatureStore.concatenate([a]) is a
+
+
+def test_lazy():
+    import pickle
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna.feature_store import FeatureStore, LazyFeatureStore
+
+    calls = []
+
+    def load():
+        calls.append(1)
+        return [SeqFeature(SimpleLocation(0, 2), type="a"), SeqFeature(SimpleLocation(4, 8), type="b")]
+
+    store = LazyFeatureStore(load)
+    derived = FeatureStore.concatenate([store.shifted(1).window(0, 4), FeatureStore()])
+    assert calls == []
+    assert [(f.type, int(f.location.start)) for f in derived.features()] == [("a", 1)]
+    features = store.features()
+    assert [f.type for f in features] == ["a", "b"]
+    # copies, as the derived store refers to the features of this store
+    assert features[0] is not store.features()[0]
+    assert calls == [1]
+    assert repr(store) == "LazyFeatureStore(2 features)"
+    unshared = LazyFeatureStore(load)
+    assert unshared.features()[0] is unshared.features()[0]
+
+    empty = LazyFeatureStore(list)
+    assert empty.features() == []
+    assert empty.shifted(3) is empty
+    assert FeatureStore.concatenate([empty, FeatureStore()]).features() == []
+
+    lazy = LazyFeatureStore(sorted, [3, 1])
+    assert pickle.loads(pickle.dumps(lazy)).features() == [1, 3]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
@@ -71,6 +71,25 @@ def test_pydna_Genbank_fresh(urlopenMock, monkeypatch):
     assert str(result.seq) == str(canned.seq)
 
 
+def test_api_key(monkeypatch):
+    import io
+    from Bio import Entrez
+    from pydna.genbank import Genbank
+
+    with open("X60065.gb") as f:
+        text = f.read()
+    monkeypatch.setenv("pydna_cached_funcs", "")
+    monkeypatch.setattr(Entrez, "api_key", "global")
+    efetch = mock.MagicMock(side_effect=lambda **params: io.StringIO(text))
+    monkeypatch.setattr("pydna.genbank._Entrez.efetch", efetch)
+    Genbank("bjornjobb@gmail.com").nucleotide("X60065.1")
+    assert Entrez.api_key == "global"
+    assert "api_key" not in efetch.call_args.kwargs
+    Genbank("bjornjobb@gmail.com", api_key="key").nucleotide("X60065.1")
+    assert Entrez.api_key == "global"
+    assert efetch.call_args.kwargs["api_key"] == "key"
+
+
 @mock.patch("Bio.Entrez.urlopen")
 def test_pydna_Genbank_from_cache(urlopenMock, monkeypatch):
     from pydna.genbank import Genbank
@@ -198,5 +217,208 @@ def test_pydna_Genbank_set_strand_antisense(urlopenMock, monkeypatch):
     assert str(result.seq) == str(canned.seq)
 
 
+def start_server(failures=0):
+    """Stand-in for the NCBI efetch endpoint, serving records from files."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+
+    files = {"X60065.1": "X60065.gb", "L09137.2": "pUC19.gb", "AJ515744": "AJ515744.gb"}
+    requests = []
+    state = {"failures": failures}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            params = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+            requests.append(params)
+            ids = params["id"].split(",")
+            if state["failures"]:
+                state["failures"] -= 1
+                status, body = 503, b"busy"
+            elif any(i not in files for i in ids):
+                status, body = 400, b"invalid id"
+            elif "seq_start" in params:
+                assert (params["id"], params["seq_start"], params["seq_stop"]) == ("X60065.1", "100", "110")
+                status, body = 200, open("X60065-100-110.gb", "rb").read()
+            else:
+                status, body = 200, b"\n".join(open(files[i], "rb").read() for i in ids)
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests
+
+
+def test_nucleotides(monkeypatch):
+    from Bio import SeqIO
+    from pydna import genbank
+    from pydna.genbank import Genbank
+
+    monkeypatch.setenv("pydna_cached_funcs", "")
+    monkeypatch.setattr(genbank, "sleep_between_tries", 0.01)
+    server, requests = start_server(failures=1)
+    gb = Genbank("bjornjobb@gmail.com", api_key="key", endpoint="http://127.0.0.1:%s/" % server.server_port)
+    items = ["X60065.1", "L09137.2", "AJ515744", "X60065.1 REGION: 100..110", "X60065.1"]
+    result = gb.nucleotides(items, batch_size=2)
+    server.shutdown()
+
+    assert [r.item for r in result] == ["X60065.1", "L09137.2", "AJ515744", "X60065.1 ", "X60065.1"]
+    assert str(result[0].seq) == str(SeqIO.read("X60065.gb", "genbank").seq)
+    assert str(result[1].seq) == str(SeqIO.read("pUC19.gb", "genbank").seq)
+    assert result[1].circular
+    assert str(result[3].seq).lower() == "ctgaaacggac"
+    assert result[3].start == 100 and result[3].stop == 110
+    # one failed request and two batches, the region is cut from the whole record
+    assert len(requests) == 3
+    assert sorted(r["id"] for r in requests[-2:]) == ["AJ515744", "X60065.1,L09137.2"]
+    assert all(r["api_key"] == "key" and r["email"] == "bjornjobb@gmail.com" for r in requests)
+
+
+def test_nucleotide_endpoint(monkeypatch):
+    from Bio import SeqIO
+    from pydna import genbank
+    from pydna.genbank import Genbank
+
+    monkeypatch.setenv("pydna_cached_funcs", "")
+    monkeypatch.setattr("pydna.genbank._Entrez.efetch", mock.MagicMock(side_effect=AssertionError))
+    server, requests = start_server()
+    gb = Genbank("bjornjobb@gmail.com", endpoint="http://127.0.0.1:%s/" % server.server_port)
+    whole = gb.nucleotide("X60065.1")
+    region = gb.nucleotide("X60065.1 REGION: 100..110")
+    server.shutdown()
+    # the connection kept open by this thread
+    for connection in genbank._connections.__dict__.pop("connections").values():
+        connection.close()
+    assert str(whole.seq) == str(SeqIO.read("X60065.gb", "genbank").seq)
+    assert str(region.seq).lower() == "ctgaaacggac"
+    assert [(r["id"], r.get("seq_start"), r["strand"]) for r in requests] == [
+        ("X60065.1", None, "1"),
+        ("X60065.1", "100", "1"),
+    ]
+
+
+def test_nucleotides_invalid(monkeypatch):
+    from urllib.error import HTTPError
+    from pydna import genbank
+    from pydna.genbank import Genbank
+
+    monkeypatch.setenv("pydna_cached_funcs", "")
+    monkeypatch.setattr(genbank, "sleep_between_tries", 0.01)
+    server, requests = start_server()
+    gb = Genbank("bjornjobb@gmail.com", endpoint="http://127.0.0.1:%s" % server.server_port)
+    with pytest.raises(HTTPError):
+        gb.nucleotides(["X60065.1", "AJ515744", "invalid"])
+    # the rejected batch is split into single requests
+    assert sorted(r["id"] for r in requests[1:]) == ["AJ515744", "X60065.1", "invalid"]
+    server.shutdown()
+    server.server_close()
+    monkeypatch.setattr(genbank, "max_tries", 2)
+    with pytest.raises(OSError):
+        gb.nucleotides(["X60065.1"])
+
+
+def test_nucleotides_cache(monkeypatch, tmp_path):
+    from pydna.genbank import Genbank
+
+    monkeypatch.setenv("pydna_data_dir", str(tmp_path))
+    monkeypatch.setenv("pydna_cached_funcs", "pydna.genbank.Genbank.nucleotide")
+    monkeypatch.setattr("pydna.genbank._Entrez.efetch", mock.MagicMock(side_effect=AssertionError))
+    server, requests = start_server()
+    gb = Genbank("bjornjobb@gmail.com", endpoint="http://127.0.0.1:%s/" % server.server_port)
+    first = gb.nucleotides(["X60065.1", "L09137.2"])
+    assert len(requests) == 1
+    assert str(gb.nucleotide("L09137.2").seq) == str(first[1].seq)
+    second = gb.nucleotides(["L09137.2", "X60065.1", "AJ515744"])
+    server.shutdown()
+    assert len(requests) == 2 and requests[1]["id"] == "AJ515744"
+    assert [str(r.seq) for r in second[:2]] == [str(r.seq) for r in first[::-1]]
+
+
+def test_nucleotide_regions(monkeypatch, tmp_path):
+    from Bio import SeqIO
+    from pydna.genbank import Genbank
+
+    monkeypatch.setenv("pydna_data_dir", str(tmp_path))
+    monkeypatch.setenv("pydna_cached_funcs", "pydna.genbank.Genbank.nucleotide")
+    mock_efetch = mock.MagicMock(name="mock_efetch")
+    mock_efetch().read.side_effect = open("X60065.gb", "r").read
+    mock_efetch.reset_mock()
+    monkeypatch.setattr("pydna.genbank._Entrez.efetch", mock_efetch)
+    gb = Genbank("bjornjobb@gmail.com")
+    whole = gb.nucleotide("X60065.1")
+    region = gb.nucleotide("X60065.1 REGION: 100..110")
+    antisense = gb.nucleotide("X60065.1", seq_start=100, seq_stop=110, strand="-")
+    assert mock_efetch.call_count == 1
+    assert mock_efetch.call_args.kwargs["strand"] == 1
+
+    canned = SeqIO.read("X60065-100-110.gb", "genbank")
+    assert str(region.seq) == str(canned.seq)
+    assert (region.item, region.start, region.stop, region.strand) == ("X60065.1 ", 100, 110, 1)
+    assert region.name == whole.name
+    assert [(f.type, str(f.location)) for f in region.features] == [(f.type, str(f.location)) for f in canned.features]
+    cds = region.features[2]
+    assert cds.qualifiers["codon_start"] == ["1"] and "translation" not in cds.qualifiers
+    assert str(antisense.seq) == str(canned.seq.reverse_complement())
+    assert (antisense.start, antisense.stop, antisense.strand) == (100, 110, 2)
+    assert str(gb.nucleotide("X60065.1", strand=2).seq) == str(whole.seq.reverse_complement())
+    assert mock_efetch.call_count == 1
+
+
+def test_nucleotide_enclosing_region(monkeypatch, tmp_path):
+    from pydna.genbank import Genbank
+
+    monkeypatch.setenv("pydna_data_dir", str(tmp_path))
+    monkeypatch.setenv("pydna_cached_funcs", "pydna.genbank.Genbank.nucleotide")
+    mock_efetch = mock.MagicMock(name="mock_efetch")
+    mock_efetch().read.side_effect = lambda: open("X60065-100-110.gb", "r").read()
+    mock_efetch.reset_mock()
+    monkeypatch.setattr("pydna.genbank._Entrez.efetch", mock_efetch)
+    gb = Genbank("bjornjobb@gmail.com")
+    assert str(gb.nucleotide("X60065.1 REGION: complement(100..110)").seq).lower() == "gtccgtttcag"
+    assert mock_efetch.call_args.kwargs == dict(
+        db="nuccore", id="X60065.1", rettype="gbwithparts", seq_start=100, seq_stop=110, strand=1, retmode="text"
+    )
+    part = gb.nucleotide("X60065.1:102-105")
+    assert str(part.seq).lower() == "gaaa"
+    assert [str(f.location) for f in part.features][:2] == ["[0:4](+)", "[<0:>4](+)"]
+    assert str(gb.nucleotide("X60065.1 c105-102").seq).lower() == "tttc"
+    assert mock_efetch.call_count == 1
+    # not covered by the cached interval
+    gb.nucleotide("X60065.1 REGION: 90..105")
+    assert mock_efetch.call_count == 2
+
+
+def test_nucleotides_regions(monkeypatch, tmp_path):
+    from pydna.genbank import Genbank
+
+    monkeypatch.setenv("pydna_data_dir", str(tmp_path))
+    monkeypatch.setenv("pydna_cached_funcs", "pydna.genbank.Genbank.nucleotide")
+    monkeypatch.setattr("pydna.genbank._Entrez.efetch", mock.MagicMock(side_effect=AssertionError))
+    server, requests = start_server()
+    gb = Genbank("bjornjobb@gmail.com", endpoint="http://127.0.0.1:%s/" % server.server_port)
+    # a single interval of an accession is downloaded as such
+    (region,) = gb.nucleotides(["X60065.1 REGION: 100..110"])
+    assert requests[-1]["seq_start"] == "100"
+    items = ["X60065.1 REGION: %s..%s" % (i, i + 20) for i in range(1, 1001, 20)]
+    items.append("X60065.1 REGION: complement(100..110)")
+    loci = gb.nucleotides(items)
+    assert len(requests) == 2 and requests[-1]["id"] == "X60065.1"
+    whole = gb.nucleotide("X60065.1")
+    assert [str(locus.seq) for locus in loci[:-1]] == [str(whole[i - 1 : i + 20].seq) for i in range(1, 1001, 20)]
+    assert str(loci[-1].seq) == str(region.seq.reverse_complement())
+    gb.nucleotides(["X60065.1 REGION: 5..10", "X60065.1 REGION: 105..109"])
+    server.shutdown()
+    assert len(requests) == 2
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-vv", "-s"])
@@ -34,6 +34,57 @@ def test_pydna_gbtext_clean():
             assert read(gbtext_clean(infile).gbtext).seguid() == seg
 
 
+def test_toJSON():
+    pytest.importorskip("pyparsing")
+
+    import glob
+    from pydna import genbankfixer
+
+    for path in glob.glob("broken_genbank_files/*"):
+        with open(path, "r") as f:
+            infile = f.read()
+        try:
+            expected = genbankfixer.parseGB(infile)
+        except Exception as error:
+            with pytest.raises(type(error)):
+                genbankfixer.toJSON(infile)
+        else:
+            assert genbankfixer.toJSON(infile) == expected
+
+    # the LOCUS line and the second feature are parsed with the pyparsing grammar
+    text = """LOCUS       name 6 bp DNA SYN
+DEFINITION  .
+FEATURES             Location/Qualifiers
+     misc_feature    complement(join(1..2,<4..>5))
+                     /label=first label
+                     /note="multi
+                     line"
+                     /codon_start="1"
+                     /pseudo
+     CDS             1..6
+                     /label= second
+ORIGIN
+        1 aaacCc
+//
+"""
+    (jseq,) = genbankfixer.toJSON(text)
+    assert jseq == genbankfixer.parseGB(text)[0]
+    assert (jseq["name"], jseq["size"], jseq["topology"], jseq["divcode"]) == ("name", "6", "linear", "SYN")
+    assert jseq["sequence"] == "aaacCc"
+    assert jseq["features"] == [
+        {
+            "type": "misc_feature",
+            "location": [[1, 2], [4, 5]],
+            "strand": -1,
+            "label": "first label",
+            "note": "multi line",
+            "codon_start": 1,
+            "pseudo": True,
+        },
+        {"type": "CDS", "location": [[1, 6]], "strand": 1, "label": "second"},
+    ]
+
+
 def test_wrapstring():
     pytest.importorskip("pyparsing")
 
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def _write_fasta(path, records, width=60, newline="\n"):
+    with open(path, "w", newline="") as f:
+        for name, seq in records:
+            f.write(f">{name} description of {name}{newline}")
+            for i in range(0, len(seq), width):
+                f.write(seq[i : i + width] + newline)
+
+
+def test_index(tmp_path):
+    import random
+    from pydna.indexed_fasta import build_index, index, read_index
+
+    random.seed(3)
+    records = [("chr1", "".join(random.choice("ACGTacgtN") for i in range(1000))), ("chr2", "ACGT" * 15), ("e", "")]
+    path = tmp_path / "genome.fa"
+    _write_fasta(path, records)
+    expected = [("chr1", 1000, 26, 60, 61), ("chr2", 60, 1069, 60, 61), ("e", 0, 1150, 0, 0)]
+    assert [record[:5] for record in build_index(path)] == expected
+    assert [record.header for record in build_index(path)] == [0, 1043, 1130]
+    assert [record[:5] for record in index(path)] == expected
+    # The index is saved in the same format as samtools faidx
+    assert (tmp_path / "genome.fa.fai").read_text().splitlines()[0] == "chr1\t1000\t26\t60\t61"
+    assert [record[:5] for record in read_index(tmp_path / "genome.fa.fai")] == expected
+
+
+def test_lines_of_different_length(tmp_path):
+    from pydna.indexed_fasta import build_index
+
+    path = tmp_path / "bad.fa"
+    path.write_text(">a\nACGT\nAC\nACGT\n")
+    with pytest.raises(ValueError):
+        build_index(path)
+    path.write_text(">a\nACGT\nACGTA\n")
+    with pytest.raises(ValueError):
+        build_index(path)
+    path.write_text(">a\nACGT\nAC\n\n>b\nA")
+    assert [r.length for r in build_index(path)] == [6, 1]
+    path.write_text("\nACGT\n>a\nACGT\n")
+    with pytest.raises(ValueError, match="before the first header"):
+        build_index(path)
+
+
+def test_description(tmp_path):
+    import os
+    from pydna.indexed_fasta import MappedFasta
+
+    path = tmp_path / "genome.fa"
+    path.write_text(">a x>y\nACGT\n>b c > d\r\nAC\r\n")
+    for fresh in (True, False):
+        # the second time, the index is read from the .fai file
+        assert os.path.exists(f"{path}.fai") != fresh
+        with MappedFasta(path) as genome:
+            assert [genome[name].description for name in genome] == ["a x>y", "b c > d"]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_slice_and_find(tmp_path, monkeypatch, newline):
+    import random
+    from pydna import indexed_fasta
+    from pydna.indexed_fasta import MappedFasta
+
+    # Small parts, so that searches have to combine several of them
+    monkeypatch.setattr(indexed_fasta, "chunk_size", 97)
+    random.seed(5)
+    records = [
+        (f"chr{i}", "".join(random.choice("ACGTacgt") for i in range(random.randint(1, 700)))) for i in range(4)
+    ]
+    path = tmp_path / "genome.fa"
+    _write_fasta(path, records, width=50, newline=newline)
+
+    with MappedFasta(path) as genome:
+        assert list(genome) == [name for name, seq in records]
+        for name, seq in records:
+            record = genome[name]
+            assert len(record) == len(seq)
+            assert record.description == f"{name} description of {name}"
+            assert str(record.seq) == seq
+            for i in range(20):
+                start, stop = sorted(random.randint(-len(seq), len(seq)) for i in range(2))
+                assert str(record[start:stop].seq) == seq[start:stop]
+                assert str(record.seq[start:stop:3]) == seq[start:stop:3]
+                assert str(record.seq[stop:start:-2]) == seq[stop:start:-2]
+                sub = seq[start : start + 12]
+                assert record.find(sub.swapcase()) == seq.upper().find(sub.upper())
+                assert record.seq.find(sub, 5) == seq.find(sub, 5)
+            assert record[len(seq) - 1] == seq[-1]
+            assert record.find("N") == -1
+            region = record[10:30]
+            assert region.id == f"{name}:11-30"
+
+
+def test_pcr(tmp_path):
+    import random
+    from pydna.amplify import pcr
+    from pydna.dseqrecord import Dseqrecord
+    from pydna.indexed_fasta import MappedFasta
+    from pydna.primer import Primer
+    from pydna.utils import rc
+
+    random.seed(11)
+    seq = "".join(random.choice("ACGT") for i in range(20000))
+    path = tmp_path / "genome.fa"
+    _write_fasta(path, [("chr1", seq)])
+
+    fp = Primer("ccccc" + seq[12000:12020], name="fp")
+    rp = Primer(rc(seq[12500:12520]), name="rp")
+
+    with MappedFasta(path) as genome:
+        amplicon = genome["chr1"].pcr(fp, rp)
+        assert str(amplicon.seq) == str(pcr(fp, rp, Dseqrecord(seq)).seq)
+        assert str(amplicon.seq).upper() == "CCCCC" + seq[12000:12520]
+        assert genome["chr1"].products(fp, rp, max_size=400) == []
+        with pytest.raises(ValueError):
+            genome["chr1"].pcr(fp, fp)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
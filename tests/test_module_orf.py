@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def _brute_force(seq, minsize, starts, stops, circular):
+    """All ORFs on the forward strand, found by reading from every start codon."""
+    length = len(seq)
+    text = seq * 4 if circular else seq
+    result = set()
+    for start in range(length):
+        if text[start : start + 3].upper() not in starts:
+            continue
+        for pos in range(start + 3, len(text) - 2, 3):
+            if text[pos : pos + 3].upper() in stops:
+                stop = pos + 3
+                if (pos - start) // 3 - 1 >= minsize and (not circular or stop - start <= 3 * length):
+                    result.add((start, stop))
+                break
+    return result
+
+
+def test_same_result_as_brute_force():
+    import random
+    from Bio.Data.CodonTable import unambiguous_dna_by_id
+    from pydna.orf import find_orfs
+    from pydna.utils import rc
+
+    random.seed(7)
+    for i in range(60):
+        seq = "".join(random.choice("ACGTacgtN") for i in range(random.randint(0, 90)))
+        circular = bool(i % 2)
+        table = random.choice((1, 2, 11))
+        code = unambiguous_dna_by_id[table]
+        start_codons = random.choice((("ATG",), None))
+        starts = start_codons or code.start_codons
+        minsize = random.randint(0, 3)
+
+        orfs = find_orfs(seq, minsize=minsize, table=table, start_codons=start_codons, circular=circular, nested=True)
+        expected = {(st, sp, 1) for st, sp in _brute_force(seq, minsize, starts, code.stop_codons, circular)}
+        length = len(seq)
+        for st, sp in _brute_force(rc(seq), minsize, starts, code.stop_codons, circular):
+            st, sp = length - sp, length - st
+            if circular:
+                st, sp = st % length, sp + st % length - st
+            expected.add((st, sp, -1))
+        assert sorted(orfs) == sorted(expected)
+        assert list(orfs.lengths) == sorted(orfs.lengths, reverse=True)
+
+        for index, (st, sp, strand) in enumerate(orfs):
+            orf = orfs.seq(index)
+            assert len(orf) == sp - st
+            assert str(orf[:3]).upper() in starts
+            assert str(orf[-3:]).upper() in code.stop_codons
+
+
+def test_longest_orf_per_stop():
+    from pydna.orf import find_orfs
+
+    seq = "ATGATGaaaTAAcccATGcccTAA"
+    assert list(find_orfs(seq, minsize=1, strand=1, nested=True)) == [(0, 12, 1), (3, 12, 1), (15, 24, 1)]
+    assert list(find_orfs(seq, minsize=1, strand=1)) == [(0, 12, 1), (15, 24, 1)]
+    assert list(find_orfs(seq, minsize=2, strand=1)) == [(0, 12, 1)]
+
+    # A start codon upstream of the origin and one downstream, in the same frame
+    seq = "aaaTAAcccATGccc"
+    assert list(find_orfs(seq, minsize=1, circular=True, strand=1, nested=True)) == [(9, 21, 1)]
+    seq = "ATGcccTAAATG"
+    assert list(find_orfs(seq, minsize=1, circular=True, strand=1)) == [(9, 21, 1)]
+    assert list(find_orfs(seq, minsize=1, circular=True, strand=1, nested=True)) == [(9, 21, 1), (0, 9, 1)]
+
+
+def test_alternative_genetic_code():
+    from pydna.orf import find_orfs
+
+    # TGA is a stop codon in the standard code, but codes for tryptophan in the
+    # mitochondrial code of yeast (table 3)
+    seq = "ATGaaaTGAaaaTAA"
+    assert list(find_orfs(seq, minsize=1, strand=1)) == [(0, 9, 1)]
+    assert list(find_orfs(seq, minsize=1, table=3, strand=1)) == [(0, 15, 1)]
+    assert [str(p) for p in find_orfs(seq, minsize=1, table=3, strand=1).translations(table=3)] == ["MKWK"]
+    # Alternative start codons
+    assert len(find_orfs("TTGaaaTAA", minsize=1, strand=1)) == 0
+    assert list(find_orfs("TTGaaaTAA", minsize=1, strand=1, start_codons=None)) == [(0, 9, 1)]
+
+
+def test_records():
+    from pydna.readers import read
+    from pydna.orf import find_orfs
+
+    pUC19 = read("pUC19_MarkBudde.gb")
+    orfs = find_orfs(pUC19, minsize=100)
+    assert orfs.circular
+    # The beta-lactamase gene is on the crick strand
+    (bla,) = [f for f in pUC19.features if f.type == "CDS" and f.qualifiers.get("gene") == ["bla"]]
+    assert (int(bla.location.start), int(bla.location.end), -1) in list(orfs)
+    index = list(orfs).index((int(bla.location.start), int(bla.location.end), -1))
+    assert str(orfs.seq(index)) == str(bla.extract(pUC19).seq)
+    assert all(str(s).upper().startswith("ATG") for s in orfs.seqs())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
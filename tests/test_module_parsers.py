@@ -198,6 +198,240 @@ def test_misc_parse():
     assert "".join(b.format("gb").strip().splitlines()[4:]) == "".join(y.format("gb").splitlines()[4:])
 
 
+def test_iparse(tmp_path):
+    import bz2
+    import gzip
+    import io
+    from pydna.parsers import iparse, parse
+
+    for name in ("pth1.txt", "read1.gb", "read3.fasta", "dna2943.gb"):
+        expected = parse(name)
+        result = list(iparse(name))
+        assert [r.seguid() for r in result] == [r.seguid() for r in expected]
+        assert [r.path for r in result] == [r.path for r in expected]
+
+    with open("pth1.txt", "rb") as f:
+        raw = f.read()
+    expected = [r.seguid() for r in parse("pth1.txt")]
+    (tmp_path / "pth1.txt.gz").write_bytes(gzip.compress(raw))
+    (tmp_path / "pth1.txt.bz2").write_bytes(bz2.compress(raw))
+    for path in (tmp_path / "pth1.txt.gz", tmp_path / "pth1.txt.bz2"):
+        assert [r.seguid() for r in iparse(path)] == expected
+        assert [r.seguid() for r in parse(path)] == expected
+
+    assert [r.seguid() for r in iparse(io.BytesIO(raw))] == expected
+    assert [r.seguid() for r in iparse(io.BufferedReader(io.BytesIO(gzip.compress(raw))))] == expected
+    assert [r.seguid() for r in iparse(io.StringIO(raw.decode("utf-8")))] == expected
+
+    # handles without peek, which are not closed
+    for data in (raw, gzip.compress(raw), bz2.compress(raw)):
+        handle = io.BytesIO(data)
+        assert [r.seguid() for r in iparse(handle)] == expected
+        assert not handle.closed
+        handle = io.BufferedReader(io.BytesIO(data))
+        records = iparse(handle)
+        next(records)
+        records.close()
+        assert not handle.closed
+
+    text = ">a\naaa\n\nsome text\n>b\nccc\n"
+    assert [str(r.seq) for r in iparse(text)] == ["aaa", "ccc"]
+    assert [str(r.seq) for r in iparse([text, ">c\nggg"])] == ["aaa", "ccc", "ggg"]
+    assert all(hasattr(r, "circular") for r in iparse(text))
+    assert not any(hasattr(r, "circular") for r in iparse(text, ds=False))
+
+    # Records are parsed when they are reached
+    def lines():
+        yield ">a\n"
+        yield "aaa\n"
+        yield ">b\n"
+        raise AssertionError("read too far")
+
+    from pydna.parsers import split_records
+
+    assert next(split_records(lines())) == ">a\naaa\n"
+    assert list(iparse(io.StringIO(""))) == []
+
+
+def test_sniff_format():
+    from pydna import parsers
+
+    assert parsers.sniff_format(">a\naaa") == "fasta"
+    assert parsers.sniff_format("ID   X; SV 1; linear; DNA; STD; SYN; 3 BP.") == "embl"
+    assert parsers.sniff_format("LOCUS       X  3 bp") == "genbank"
+    assert parsers.sniff_format("acgt") is None
+
+    parsers.format_counts.clear()
+    (gb,) = parsers.parse("read1.gb")
+    (fasta,) = parsers.parse(">a\naaa")
+    (embl,) = parsers.parse(gb.format("embl"))
+    assert str(embl.seq) == str(gb.seq)
+    assert parsers.format_counts == {"genbank": 1, "fasta": 1, "embl": 1}
+
+    # A record that is not in the sniffed format is parsed by trying all formats
+    parsers.format_counts.clear()
+    assert parsers._read_chunk("LOCUS\n>a\naaa\n")[1] == "fasta"
+    assert parsers.format_counts == {"fallback": 1}
+
+
+def test_parse_many(tmp_path):
+    import os
+    import gzip
+    import shutil
+    from pydna import parsers
+    from pydna.parsers import parse, parse_many
+
+    names = ["read1.gb", "pth1.txt", "read3.fasta"]
+    for name in names:
+        shutil.copy(name, tmp_path)
+    (tmp_path / "sub").mkdir()
+    with open("dna2943.gb", "rb") as f:
+        (tmp_path / "sub" / "dna2943.gb.gz").write_bytes(gzip.compress(f.read()))
+    (tmp_path / "notes.doc").write_text(">a\naaa\n")
+
+    expected = {name: [r.seguid() for r in parse(name)] for name in names + ["dna2943.gb"]}
+
+    parsers.format_counts.clear()
+    list(parse_many(tmp_path, workers=1))
+    counts = parsers.format_counts.copy()
+    assert sum(counts.values()) > 0
+
+    for workers in (1, 2):
+        parsers.format_counts.clear()
+        results = list(parse_many(tmp_path, workers=workers))
+        assert parsers.format_counts == counts
+        assert [r.path for r in results] == [
+            str(tmp_path / "pth1.txt"),
+            str(tmp_path / "read1.gb"),
+            str(tmp_path / "read3.fasta"),
+            str(tmp_path / "sub" / "dna2943.gb.gz"),
+        ]
+        for result in results:
+            name = os.path.basename(result.path).replace(".gz", "")
+            assert result.error is None
+            assert [r.seguid() for r in result.records] == expected[name]
+            assert all(r.path == result.path for r in result.records)
+
+    paths = [tmp_path / name for name in names] + [tmp_path / "missing.gb"]
+    results = list(parse_many(paths, workers=2, ordered=False))
+    assert sorted(r.path for r in results) == sorted(paths)
+    (missing,) = [r for r in results if r.path == tmp_path / "missing.gb"]
+    assert isinstance(missing.error, FileNotFoundError)
+    assert missing.records == []
+    assert sum(len(r.records) for r in results) == sum(len(v) for k, v in expected.items() if k in names)
+
+    (result,) = parse_many([tmp_path / "read1.gb"], ds=False)
+    assert not hasattr(result.records[0], "circular")
+
+
+def test_parse_cache(tmp_path, monkeypatch):
+    import os
+    import shutil
+    from pydna import parsers
+
+    (expected,) = parsers.parse("read1.gb")
+    (fasta,) = parsers.parse("read3.fasta")
+    monkeypatch.setenv("pydna_data_dir", str(tmp_path / "data"))
+    monkeypatch.setenv("pydna_cached_funcs", "pydna.parsers.parse")
+    path = tmp_path / "read1.gb"
+    shutil.copy("read1.gb", path)
+
+    (first,) = parsers.parse(path)
+    assert os.listdir(tmp_path / "data" / "parsed") == [os.path.basename(parsers._cache_file(path))]
+
+    def fail(text):
+        raise AssertionError("parsed again")
+
+    with monkeypatch.context() as m:
+        m.setattr(parsers, "_seqrecords", fail)
+        (cached,) = parsers.parse(path)
+        (result,) = parsers.parse_many([path], workers=1)
+    assert cached.format("gb") == first.format("gb") == expected.format("gb")
+    assert cached.path == path
+    assert cached.features is not first.features
+    assert result.records[0].seguid() == expected.seguid()
+
+    # The file changes
+    shutil.copy("read3.fasta", path)
+    (changed,) = parsers.parse(path)
+    assert str(changed.seq) == str(fasta.seq)
+
+    # A damaged cache file is replaced
+    with open(parsers._cache_file(path), "wb") as f:
+        f.write(b"damaged")
+    assert str(parsers.parse(path)[0].seq) == str(fasta.seq)
+    assert str(parsers.parse(path)[0].seq) == str(fasta.seq)
+
+    # Text is not cached
+    assert str(parsers.parse(">a\naaa")[0].seq) == "aaa"
+    assert len(os.listdir(tmp_path / "data" / "parsed")) == 1
+
+
+def test_parse_cache_not_writable(tmp_path, monkeypatch, caplog):
+    import os
+    from pydna import parsers
+
+    (expected,) = parsers.parse("read1.gb")
+    # The cache directory can not be made
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "parsed").write_text("not a directory")
+    monkeypatch.setenv("pydna_data_dir", str(tmp_path / "data"))
+    monkeypatch.setenv("pydna_cached_funcs", "pydna.parsers.parse")
+
+    (record,) = parsers.parse("read1.gb")
+    assert record.format("gb") == expected.format("gb")
+    assert "Could not write the cache file" in caplog.text
+    records, error, counts = parsers._parse_file("read1.gb")
+    assert error is None
+    assert len(records) == 1
+    for workers in (1, 2):
+        first, second = parsers.parse_many(["read1.gb", "read3.fasta"], workers=workers)
+        assert first.error is second.error is None
+        assert [r.seguid() for r in first.records] == [expected.seguid()]
+        assert len(second.records) == 1
+
+    # The temporary file is removed if the cache file can not be replaced
+    os.remove(tmp_path / "data" / "parsed")
+    (tmp_path / "data" / "parsed").mkdir()
+    (tmp_path / "data" / "parsed" / os.path.basename(parsers._cache_file("read1.gb"))).mkdir()
+    (record,) = parsers.parse("read1.gb")
+    assert record.format("gb") == expected.format("gb")
+    assert os.listdir(tmp_path / "data" / "parsed") == [os.path.basename(parsers._cache_file("read1.gb"))]
+
+
+def test_parse_features():
+    from pydna.parsers import parse
+    from pydna.readers import read
+
+    full = read("pAG25.gb")
+    assert full.features
+
+    none = read("pAG25.gb", features=False)
+    assert none.features == []
+    assert str(none.seq) == str(full.seq)
+    assert none.circular == full.circular
+    assert none.annotations == full.annotations
+    assert read("pAG25.gb", ds=False, features=False).features == []
+
+    lazy = read("pAG25.gb", features="lazy")
+    assert repr(lazy.__dict__["features"]) == "LazyFeatureStore(not loaded)"
+    assert lazy.format("gb") == full.format("gb")
+
+    lazy = read("pAG25.gb", features="lazy")
+    assert lazy[100:2000].format("gb") == full[100:2000].format("gb")
+    assert lazy.shifted(5).rc().format("gb") == full.shifted(5).rc().format("gb")
+
+    (seqrecord,) = parse("pAG25.gb", ds=False, features="lazy")
+    assert isinstance(seqrecord.features, list)
+    assert len(seqrecord.features) == len(full.features)
+
+    # Only GenBank feature tables are parsed lazily
+    embl = full.format("embl")
+    assert read(embl, features="lazy").features
+    assert read(embl, features=False).features == []
+    assert parse(">a\naaa", features="lazy")[0].features == []
+
+
 def test_dna2949():
     from pydna.parsers import parse
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def test_same_result_as_biopython():
+    import random
+    from Bio.Restriction import AllEnzymes
+    from Bio.Seq import Seq
+    from pydna.restriction_scanner import RestrictionScanner
+
+    random.seed(42)
+    scanner = RestrictionScanner(AllEnzymes)
+
+    for length in (0, 1, 7, 50, 400, 2000):
+        seq = Seq("".join(random.choice("ACGTACGTACGTACGTNRYacgt") for i in range(length)))
+        for linear in (True, False):
+            assert scanner.search(seq, linear=linear) == {e: e.search(seq, linear=linear) for e in AllEnzymes}
+
+
+def test_plasmid():
+    from Bio.Restriction import CommOnly
+    from pydna.readers import read
+    from pydna.restriction_scanner import scanner
+
+    pUC19 = read("pUC19.gb")
+    assert pUC19.circular
+
+    result = scanner(CommOnly).search(pUC19.seq, linear=False)
+    assert result == {e: e.search(pUC19.seq, linear=False) for e in CommOnly}
+
+    fwd, rev = scanner(CommOnly).sites(pUC19.seq, linear=False)
+    assert len(fwd) == len(rev) == len(CommOnly)
+
+
+def test_cutsites_over_origin():
+    from Bio.Restriction import CommOnly, EcoRI, BsaI
+    from pydna.dseq import Dseq
+
+    seq = Dseq("TTCaaGAGACCaaGAATTCaaaaGAA", circular=True)
+    assert seq.get_cutsites(CommOnly) == sorted(cutsite for e in CommOnly for cutsite in seq.get_cutsites(e))
+    assert seq.get_cutsites(EcoRI, BsaI) == [((0, -4), BsaI), ((14, -4), EcoRI), ((24, -4), EcoRI)]
+
+
+def test_scanner_is_reused():
+    from Bio.Restriction import BamHI, EcoRI, RestrictionBatch
+    from pydna.restriction_scanner import scanner
+
+    assert scanner(RestrictionBatch([BamHI, EcoRI])) is scanner([EcoRI, BamHI, EcoRI])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
@@ -100,6 +100,10 @@ def test_orfs():
     for orf, ln in zip(s.orfs(), lens):
         assert len(orf) == ln
 
+    lens = (1581, 1521, 1494, 1185, 1002, 756, 750)
+    for orf, ln in zip(s.orfs(all_starts=True), lens):
+        assert len(orf) == ln
+
 
 if __name__ == "__main__":
     args = [
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def test_seeds_and_z_algorithm_agree(monkeypatch):
+    import random
+    from pydna import sync
+
+    random.seed(17)
+    for i in range(300):
+        s = "".join(random.choice("ac") for i in range(random.randint(1, 40)))
+        start = random.randrange(len(s))
+        r = (s[start:] + s[:start]) * random.randint(1, 2) + "".join(random.choice("act") for i in range(5))
+        r = r[: random.randint(1, len(r))]
+        limit = random.randint(1, 6)
+        expected = sync.longest_circular_match(s, r, limit)
+        monkeypatch.setattr(sync, "max_seeds", 0)
+        assert sync.longest_circular_match(s, r, limit) == expected
+        monkeypatch.undo()
+
+
+def test_sync_all():
+    from pydna.dseqrecord import Dseqrecord
+    from pydna.sync import Synchronizer, sync_all
+
+    ref = Dseqrecord("tcgcgcgtttcggtgatgacggtgaaaacc" + "a" * 30, circular=True)
+    plasmids = [ref.shifted(7), ref.rc().shifted(40), ref.shifted(59)]
+    assert [str(p.seq) for p in sync_all(plasmids, ref)] == [str(ref.seq)] * 3
+    synchronizer = Synchronizer("tcgcgcgtttcggtgatgacggtgaaaacc")
+    assert synchronizer.offset(plasmids[0]) == (len(ref) - 7, False)
+    assert synchronizer.offset(plasmids[1])[1] is True
+    with pytest.raises(TypeError):
+        synchronizer(Dseqrecord("ggggggggggggggggggggggggggggggg", circular=True))
+    with pytest.raises(TypeError):
+        synchronizer(ref[:])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
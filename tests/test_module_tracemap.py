@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+
+def test_map_traces():
+    from pydna.readers import read
+    from pydna.tracemap import trace_table
+
+    pCR_MCT1_HA46 = read("pCR_MCT1_HA46.gb")
+    matches = pCR_MCT1_HA46.map_traces("*.ab1", workers=2)
+    assert [m.read for m in matches] == sorted(m.read for m in matches)
+    mapped = {m.read: m for m in matches if m.location is not None}
+    # The same traces as with map_trace_files
+    assert set(mapped) == set(read("pCR_MCT1_HA46.gb").map_trace_files("*.ab1"))
+    assert str(mapped["28-1rev_D04_026.ab1"].location) == "[265:1189](+)"
+    assert all(m.identity > 0.99 and m.strand == 1 for m in mapped.values())
+    # Features are only added when asked for
+    assert not [f for f in pCR_MCT1_HA46.features if f.type == "trace"]
+    pCR_MCT1_HA46.map_traces("*.ab1", workers=1, add_features=True)
+    assert sorted(f.qualifiers["label"][0] for f in pCR_MCT1_HA46.features if f.type == "trace") == sorted(mapped)
+    row = str(trace_table(matches)).splitlines()[3]
+    assert [cell.strip() for cell in row.split("|")[1:-1]] == ["02-G1_B01_013.ab1", "-", "0.000", "---"]
+
+
+def test_reference_index():
+    import random
+    from Bio.Seq import Seq
+    from Bio.SeqRecord import SeqRecord
+    from pydna.dseqrecord import Dseqrecord
+    from pydna.tracemap import ReferenceIndex, map_traces
+    from pydna.utils import rc
+
+    random.seed(3)
+    plasmid = Dseqrecord("".join(random.choice("acgt") for i in range(3000)), circular=True)
+    index = ReferenceIndex(plasmid, k=20)
+    reads = []
+    for i in range(40):
+        start, size = random.randrange(3000), random.randint(300, 900)
+        read = list(str(plasmid.shifted(start).seq)[:size])
+        # sequencing errors
+        read[size // 2] = "n"
+        strand = random.choice([1, -1])
+        sequence = "".join(read) if strand == 1 else rc("".join(read))
+        reads.append((SeqRecord(Seq(sequence), id=f"r{i}"), start, size, strand))
+
+    for match, (read, start, size, strand) in zip(map_traces(index, [r[0] for r in reads]), reads):
+        assert match.read == read.id
+        assert match.strand == match.location.strand == strand
+        region = str(plasmid.shifted(start).seq)[:size]
+        # The extracted sequence is the sequence of the read
+        assert str(match.location.extract(plasmid).seq) == (region if strand == 1 else rc(region))
+        assert match.identity == pytest.approx((size - 1) / size)
+
+    assert index.map(SeqRecord(Seq("n" * 50))).location is None
+    linear = ReferenceIndex(plasmid[:], k=20)
+    assert linear.map(SeqRecord(Seq(str(plasmid.seq)[2990:] + str(plasmid.seq)[:100]))).location.start == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-vv", "-s"])
@@ -433,20 +433,18 @@ def test_memorize(monkeypatch):
 
     assert key == "6pHTTwgXP8xcXoEMEzdKSzN6EeM=" or "ux_W9TiWkWBAkQD_FgZTO-pXuYk="
 
-    class Fakedict(dict):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
+    key = "mf/" + key
 
-        def close(self):
-            pass
+    class Fakedict(dict):
+        path = "cache.sqlite"
 
     cache = Fakedict()
     cache[key] = "saved!"
-    mockshelve_open = mock.MagicMock()
-    mockshelve_open.return_value = cache
+    mockcache = mock.MagicMock()
+    mockcache.return_value = cache
 
     monkeypatch.setenv("pydna_cached_funcs", "mf")
-    monkeypatch.setattr("pydna.utils._shelve.open", mockshelve_open)
+    monkeypatch.setattr("pydna.utils._cache", mockcache)
 
     monkeypatch.setenv("pydna_cached_funcs", "mf")
 
@@ -475,5 +473,46 @@ def test_shift_location():
         assert shift_location(shift_location(loc, 1, 6), -1, 6) == loc
 
 
+def test_circular_find():
+    import random
+    import re
+    from pydna.utils import circular_find, circular_finditer
+
+    random.seed(17)
+    for i in range(2000):
+        s = "".join(random.choice("ac") for i in range(random.randint(0, 12)))
+        sub = "".join(random.choice("ac") for i in range(random.randint(0, 6)))
+        start = random.randint(-30, 30)
+        end = random.choice((None, random.randint(-30, 30)))
+        assert circular_find(s, sub, start, end) == (s + s).find(sub, start, end)
+        if s and sub:
+            pattern = re.compile(f"(?={sub})")
+            text = s * (len(sub) // len(s) + 2)
+            expected = [m.start() for m in pattern.finditer(text) if m.start() < len(s)]
+            assert [offset + m.start() for offset, m in circular_finditer(pattern, s, len(sub))] == expected
+
+
+def test_trim_feature():
+    from Bio.Seq import Seq
+    from Bio.SeqFeature import SeqFeature, SimpleLocation
+    from pydna.utils import trim_feature
+
+    seq = Seq("ATGAAACCCGGGTAA")
+    for strand, start, stop in ((1, 4, 15), (-1, 0, 11)):
+        feature = SeqFeature(
+            SimpleLocation(0, 15, strand), type="CDS", qualifiers={"codon_start": ["1"], "translation": ["MKPG"]}
+        )
+        protein = feature.extract(seq).translate()
+        trimmed = trim_feature(feature, start, stop)
+        assert trimmed.qualifiers == {"codon_start": ["3"]}
+        assert feature.qualifiers["translation"] == ["MKPG"]
+        part = trimmed.extract(seq[start:stop])[int(trimmed.qualifiers["codon_start"][0]) - 1 :]
+        assert str(part.translate()) in str(protein)
+        assert len(part) == 9
+    source = SeqFeature(SimpleLocation(0, 15), type="source")
+    assert str(trim_feature(source, 4, 6).location) == "[0:2]"
+    assert trim_feature(source, 15, 20) is None
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-vv", "-s"])